@@ -1,7 +1,11 @@
 import ast
+import asyncio
+import hashlib
 import json
-from collections.abc import Sequence
-from typing import Any
+import re
+from collections.abc import Awaitable, Callable, Sequence
+from functools import lru_cache
+from typing import Any, cast
 
 import tiktoken
 import yaml
@@ -28,11 +32,23 @@ from agents.common.constants import (
 from agents.common.data import Message
 from agents.common.state import SubTask, UserInput
 from services.k8s import IK8sClient
+from utils.cache import TTLCache
 from utils.logging import get_logger
+from utils.settings import (
+    K8S_OVERVIEW_SOURCE_TIMEOUT,
+    MESSAGE_TOKEN_COUNT_CACHE_MAX_SIZE,
+    MESSAGE_TOKEN_COUNT_CACHE_TTL,
+)
 from utils.utils import is_empty_str, is_non_empty_str
 
 logger = get_logger(__name__)
 
+# Characters encoded at once by compute_bounded_string_token_count, before checking the limit.
+TOKEN_COUNT_CHUNK_SIZE = 4096
+# A space between two non-space characters. The tokenizer starts a new token there, so the tokens of
+# strings split before it add up to the tokens of the whole string.
+_TOKEN_BOUNDARY_PATTERN = re.compile(r"(?<=\S) (?=\S)")
+
 
 def filter_messages(
     messages: Sequence[BaseMessage],
@@ -108,20 +124,79 @@ def create_node_output(
     }
 
 
-def compute_string_token_count(text: str, model_type: str) -> int:
-    """Returns the token count of the string."""
+# The content hash and the token count of the messages, by model and message id or content hash.
+_message_token_counts = TTLCache(maxsize=MESSAGE_TOKEN_COUNT_CACHE_MAX_SIZE, ttl=MESSAGE_TOKEN_COUNT_CACHE_TTL)
+
+
+@lru_cache(maxsize=32)
+def get_encoding_for_model(model_type: str) -> tiktoken.Encoding:
+    """Returns the tiktoken encoding of the model, which is only looked up once per model."""
     try:
-        encoding = tiktoken.encoding_for_model(model_type)
+        return tiktoken.encoding_for_model(model_type)
     except KeyError:
         logger.warning(f"Model '{model_type}' not recognized by tiktoken, using cl100k_base encoding")
         # "cl100k_base" is used by the tiktoken library for many OpenAI models.
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text=text))
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=32)
+def get_max_token_byte_count(model_type: str) -> int:
+    """Returns the byte length of the longest token of the encoding of the model."""
+    return max(len(token) for token in get_encoding_for_model(model_type).token_byte_values())
+
+
+def warm_up_tokenizer(model_type: str) -> None:
+    """Load the encoding of the model, so that the first request does not pay for loading it."""
+    try:
+        get_max_token_byte_count(model_type)
+    except Exception:
+        logger.exception(f"Failed to load the tokenizer of model '{model_type}'.")
+
+
+def compute_string_token_count(text: str, model_type: str) -> int:
+    """Returns the token count of the string."""
+    return len(get_encoding_for_model(model_type).encode(text=text))
+
+
+def compute_bounded_string_token_count(
+    text: str, model_type: str, limit: int, chunk_size: int = TOKEN_COUNT_CHUNK_SIZE
+) -> int:
+    """Returns the token count of the string, or the token count of a prefix of it once that exceeds the limit.
+
+    The string is encoded in chunks of about chunk_size characters, which are split before a space between
+    words, so that only about one chunk beyond the limit is encoded. Strings without such spaces are encoded
+    at once, so callers should bound their length.
+    """
+    encoding = get_encoding_for_model(model_type)
+    token_count = 0
+    start = 0
+    while start < len(text) and token_count <= limit:
+        boundary = _TOKEN_BOUNDARY_PATTERN.search(text, start + chunk_size)
+        end = boundary.start() if boundary else len(text)
+        token_count += len(encoding.encode(text=text[start:end]))
+        start = end
+    return token_count
+
+
+def compute_message_token_count(msg: BaseMessage, model_type: str) -> int:
+    """Returns the token count of the message content.
+    The count is cached by message id, and recomputed if the content of the message changed.
+    Messages without id, like the summary of the conversation, are cached by their content.
+    Only a hash of the content is kept, so that the cache does not hold on to large tool outputs."""
+    content = str(msg.content)
+    content_hash = hashlib.sha256(content.encode()).digest()
+    key = (model_type, msg.id or content_hash)
+    entry: tuple[bytes, int] | None = _message_token_counts.get(key)
+    if entry is not None and entry[0] == content_hash:
+        return entry[1]
+    token_count = compute_string_token_count(content, model_type)
+    _message_token_counts.set(key, (content_hash, token_count))
+    return token_count
 
 
 def compute_messages_token_count(msgs: Messages, model_type: str) -> int:
     """Returns the token count of the messages."""
-    tokens_per_msg = (compute_string_token_count(str(msg.content), model_type) for msg in msgs)
+    tokens_per_msg = (compute_message_token_count(cast(BaseMessage, msg), model_type) for msg in msgs)
     return sum(tokens_per_msg)
 
 
@@ -149,6 +224,56 @@ def get_resource_context_message(user_input: UserInput) -> SystemMessage | None:
     return None
 
 
+async def _afetch_context_source(fetch: Callable[[], Awaitable[list[dict]]], timeout: float) -> str:
+    """Fetch a source of the context with a timeout and dump it as YAML."""
+    result = await asyncio.wait_for(fetch(), timeout=timeout)
+    # dump in a thread, as dumping large lists would block the event loop.
+    return await asyncio.to_thread(yaml.dump_all, result)
+
+
+async def afetch_overview_context(
+    sources: dict[str, Callable[[], Awaitable[list[dict]]]],
+    timeout: float = K8S_OVERVIEW_SOURCE_TIMEOUT,
+) -> str:
+    """Fetch the sources of an overview context concurrently.
+
+    Sources which fail or time out are left out of the context, so that the context is returned
+    as soon as the slowest source finished or timed out.
+
+    Args:
+        sources: The functions fetching the sources, by the name of the source.
+        timeout: Seconds after which fetching a source is abandoned.
+
+    Returns:
+        The YAML dumps of the fetched sources, separated by new lines.
+
+    Raises:
+        Exception: The error of the first source, if all sources failed.
+    """
+    results = await asyncio.gather(
+        *(_afetch_context_source(fetch, timeout) for fetch in sources.values()),
+        return_exceptions=True,
+    )
+
+    contexts: list[str] = []
+    errors: list[Exception] = []
+    for name, result in zip(sources, results, strict=True):
+        if isinstance(result, Exception):
+            if isinstance(result, TimeoutError):
+                logger.warning(f"Fetching {name} for the overview context timed out after {timeout} seconds")
+            else:
+                logger.warning(f"Failed to fetch {name} for the overview context: {result}")
+            errors.append(result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            contexts.append(result)
+
+    if errors and not contexts:
+        raise errors[0]
+    return "\n".join(contexts)
+
+
 async def get_relevant_context_from_k8s_cluster(message: Message, k8s_client: IK8sClient) -> str:
     """Fetch the relevant data from Kubernetes cluster based on specified K8s resource in message."""
 
@@ -167,24 +292,28 @@ async def get_relevant_context_from_k8s_cluster(message: Message, k8s_client: IK
         # by fetching all not running pods, all K8s Nodes metrics,
         # and all K8s events with warning type.
         logger.info("Fetching all not running Pods, Node metrics, and K8s Events with warning type")
-        pods = yaml.dump_all(k8s_client.list_not_running_pods(namespace=namespace))
-        metrics = yaml.dump_all(await k8s_client.list_nodes_metrics())
-        events = yaml.dump_all(k8s_client.list_k8s_warning_events(namespace=namespace))
-
-        context = f"{pods}\n{metrics}\n{events}"
+        context = await afetch_overview_context(
+            {
+                "not running Pods": lambda: k8s_client.alist_not_running_pods(namespace=namespace),
+                "Node metrics": k8s_client.list_nodes_metrics,
+                "K8s Events with warning type": lambda: k8s_client.alist_k8s_warning_events(namespace=namespace),
+            }
+        )
 
     elif is_non_empty_str(namespace) and kind.lower() == "namespace":
         # Get an overview of the namespace
         # by fetching all K8s events with warning type.
         logger.debug("Fetching all K8s Events with warning type")
-        context = yaml.dump_all(k8s_client.list_k8s_warning_events(namespace=namespace))
+        context = await afetch_overview_context(
+            {"K8s Events with warning type": lambda: k8s_client.alist_k8s_warning_events(namespace=namespace)}
+        )
 
     elif is_non_empty_str(kind) and is_non_empty_str(api_version):
         # Describe a specific resource. Not-namespaced resources need the namespace
         # field to be empty. Finally, get all events related to given resource.
         logger.info(f"Fetching all entities of Kind {kind} with API version {api_version}")
         resources = yaml.dump(
-            k8s_client.describe_resource(
+            await k8s_client.adescribe_resource(
                 api_version=api_version,
                 kind=kind,
                 name=name,
@@ -192,7 +321,7 @@ async def get_relevant_context_from_k8s_cluster(message: Message, k8s_client: IK
             )
         )
         events = yaml.dump_all(
-            k8s_client.list_k8s_events_for_resource(
+            await k8s_client.alist_k8s_events_for_resource(
                 kind=kind,
                 name=name,
                 namespace=namespace,
@@ -71,6 +71,7 @@ from utils.settings import (
     MAIN_MODEL_MINI_NAME,
     MAIN_MODEL_NAME,
     MAIN_MODEL_NANO_NAME,
+    SUMMARIZATION_ROLLING_ENABLED,
     SUMMARIZATION_TOKEN_LOWER_LIMIT,
     SUMMARIZATION_TOKEN_UPPER_LIMIT,
 )
@@ -148,10 +149,13 @@ class CompanionGraph:
         models: dict[str, IModel | Embeddings],
         memory: BaseCheckpointSaver,
         handler: Any = None,
+        usage_memory: IUsageMemory | None = None,
     ):
         self.models = models
         self.memory = memory
         self.handler = handler
+        # the token usage is written to the checkpointer, unless a separate usage memory is given.
+        self.usage_memory = usage_memory or cast(IUsageMemory, memory)
 
         main_model_mini = models[MAIN_MODEL_MINI_NAME]
         main_model = models[MAIN_MODEL_NAME]
@@ -171,6 +175,7 @@ class CompanionGraph:
             token_upper_limit=SUMMARIZATION_TOKEN_UPPER_LIMIT,
             messages_key=MESSAGES,
             messages_summary_key=MESSAGES_SUMMARY,
+            rolling=SUMMARIZATION_ROLLING_ENABLED,
         )
 
         self.members = [self.kyma_agent.name, self.k8s_agent.name, COMMON]
@@ -451,7 +456,7 @@ class CompanionGraph:
             },
             callbacks=[
                 self.handler,
-                UsageTrackerCallback(cluster_id, cast(IUsageMemory, self.memory)),
+                UsageTrackerCallback(cluster_id, self.usage_memory),
             ],
             tags=[cluster_id],
             metadata=get_langfuse_metadata(
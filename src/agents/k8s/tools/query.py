@@ -11,6 +11,7 @@ from agents.common.utils import (
 )
 from services.k8s import IK8sClient
 from utils.exceptions import K8sClientError
+from utils.settings import K8S_QUERY_TOOL_MAX_RESPONSE_BYTES
 
 
 class K8sQueryToolArgs(BaseModel):
@@ -28,9 +29,10 @@ async def k8s_query_tool(uri: str, k8s_client: Annotated[IK8sClient, InjectedSta
     """Query the state of objects in Kubernetes using the provided URI.
     The URI must follow the format of Kubernetes API.
     The returned data is sanitized to remove any sensitive information.
-    For example, it will always remove the `data` field of a `Secret` object."""
+    For example, it will always remove the `data` field of a `Secret` object.
+    Large lists are truncated, which is indicated by the `truncated` field of the result."""
     try:
-        return await k8s_client.execute_get_api_request(uri)
+        return await k8s_client.execute_get_api_request(uri, max_bytes=K8S_QUERY_TOOL_MAX_RESPONSE_BYTES)
     except K8sClientError as e:
         # Add tool name if not already set
         if not e.tool_name:
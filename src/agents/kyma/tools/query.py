@@ -7,6 +7,7 @@ from pydantic.config import ConfigDict
 
 from services.k8s import IK8sClient
 from utils.exceptions import K8sClientError
+from utils.settings import K8S_QUERY_TOOL_MAX_RESPONSE_BYTES
 
 
 class KymaQueryToolArgs(BaseModel):
@@ -34,7 +35,7 @@ async def kyma_query_tool(
     - /apis/serverless.kyma-project.io/v1alpha2/namespaces/default/functions
     - /apis/gateway.kyma-project.io/v1beta1/namespaces/default/apirules"""
     try:
-        return await k8s_client.execute_get_api_request(uri)
+        return await k8s_client.execute_get_api_request(uri, max_bytes=K8S_QUERY_TOOL_MAX_RESPONSE_BYTES)
     except K8sClientError as e:
         # Add tool name if not already set
         if not e.tool_name:
@@ -63,7 +64,7 @@ class KymaResourceVersionToolArgs(BaseModel):
 
 
 @tool(infer_schema=False, args_schema=KymaResourceVersionToolArgs)
-def fetch_kyma_resource_version(
+async def fetch_kyma_resource_version(
     resource_kind: str,
     k8s_client: Annotated[IK8sClient, InjectedState("k8s_client")],
 ) -> str:
@@ -74,7 +75,7 @@ def fetch_kyma_resource_version(
     to be verified or kyma_query_tool returns 404 not found.
     """
     try:
-        return k8s_client.get_resource_version(resource_kind)
+        return await k8s_client.aget_resource_version(resource_kind)
     except Exception as e:
         raise K8sClientError.from_exception(
             exception=e,
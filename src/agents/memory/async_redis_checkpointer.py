@@ -1,8 +1,12 @@
 """Implementation of a langgraph checkpoint saver using Redis."""
 
+import asyncio
 import json
+import re
 import ssl
 import time
+import uuid
+from collections import defaultdict
 from collections.abc import AsyncGenerator, Awaitable, Sequence
 from typing import (
     Any,
@@ -24,14 +28,39 @@ from langgraph.checkpoint.base import (
 from langgraph.checkpoint.serde.base import SerializerProtocol
 from redis.asyncio import Redis as AsyncRedis
 
+from agents.memory.serializer import CompressedSerializer
 from services.redis import Redis
 from utils.logging import get_logger
-from utils.settings import REDIS_SSL_ENABLED, REDIS_TTL
+from utils.settings import (
+    REDIS_CHECKPOINT_COMPRESSION_THRESHOLD,
+    REDIS_CHECKPOINT_DELTA_MODE,
+    REDIS_CHECKPOINT_RETENTION_COUNT,
+    REDIS_SSL_ENABLED,
+    REDIS_TTL,
+    TOKEN_USAGE_BUCKET_SECONDS,
+)
 
 logger = get_logger(__name__)
 
 REDIS_KEY_SEPARATOR = "$"
 
+# Token counters stored per time bucket of LLM usage.
+LLM_USAGE_COUNTERS = ("input", "output", "total")
+
+# Number of keys deleted per round trip when pruning checkpoints.
+PRUNE_BATCH_SIZE = 100
+
+# Marks that the indexes were backfilled, and guards the backfill so that only one replica runs it.
+INDEX_BACKFILL_DONE_KEY = "checkpoint_index_backfill$done"
+INDEX_BACKFILL_LOCK_KEY = "checkpoint_index_backfill$lock"
+# The lock expires, so that a replica which stopped during the backfill does not block it forever.
+# It is extended while the backfill runs.
+INDEX_BACKFILL_LOCK_TTL = 600
+# Seconds between the backfill passes, which repeat until a pass finds no keys without index entries.
+INDEX_BACKFILL_INTERVAL = 300
+# Number of keys Redis inspects per SCAN iteration, when the keys of a thread are looked up without the indexes.
+INDEX_FALLBACK_SCAN_COUNT = 10000
+
 T = TypeVar("T")
 
 
@@ -82,6 +111,37 @@ def _make_redis_checkpoint_writes_key(
     return REDIS_KEY_SEPARATOR.join(["writes", thread_id, checkpoint_ns, checkpoint_id, task_id, str(idx)])
 
 
+def _make_redis_checkpoint_index_key(thread_id: str, checkpoint_ns: str) -> str:
+    """Create a Redis key for the per-thread checkpoint index.
+
+    The index is a sorted set whose members are the checkpoint IDs of the thread, all stored with the
+    same score so that they are ordered lexicographically (i.e. chronologically for uuid6 based IDs).
+
+    Returns a Redis key string in the format "checkpoint_index$thread_id$namespace".
+    """
+    return REDIS_KEY_SEPARATOR.join(["checkpoint_index", thread_id, checkpoint_ns])
+
+
+def _make_redis_checkpoint_writes_index_key(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+    """Create a Redis key for the per-checkpoint writes index.
+
+    The index is a sorted set whose members are the writes keys of the checkpoint, scored by the write index.
+
+    Returns a Redis key string in the format "writes_index$thread_id$namespace$checkpoint_id".
+    """
+    return REDIS_KEY_SEPARATOR.join(["writes_index", thread_id, checkpoint_ns, checkpoint_id])
+
+
+def _make_redis_checkpoint_blob_key(
+    thread_id: str, checkpoint_ns: str, channel: str, version: str | int | float
+) -> str:
+    """Create a Redis key for storing the value of a channel at a given version (used by delta checkpoints).
+
+    Returns a Redis key string in the format "checkpoint_blob$thread_id$namespace$channel$version".
+    """
+    return REDIS_KEY_SEPARATOR.join(["checkpoint_blob", thread_id, checkpoint_ns, channel, str(version)])
+
+
 def _parse_redis_checkpoint_key(redis_key: str) -> dict:
     """Parse a Redis checkpoint key.
 
@@ -121,26 +181,9 @@ def _safe_decode(key: str | bytes) -> str:
     return key.decode() if isinstance(key, bytes) else key
 
 
-def _filter_keys(keys: list[str | bytes], before: RunnableConfig | None, limit: int | None) -> list[str | bytes]:
-    """
-    Filter and sort Redis keys based on optional criteria.
-    Returns list of filtered and sorted Redis keys.
-    """
-    if before:
-        keys = [
-            k
-            for k in keys
-            if _parse_redis_checkpoint_key(_safe_decode(k))["checkpoint_id"] < before["configurable"]["checkpoint_id"]
-        ]
-
-    keys = sorted(
-        keys,
-        key=lambda k: _parse_redis_checkpoint_key(_safe_decode(k))["checkpoint_id"],
-        reverse=True,
-    )
-    if limit:
-        keys = keys[:limit]
-    return keys
+def _escape_glob_pattern(value: str) -> str:
+    """Escape the characters of the value, which have a special meaning in the patterns of SCAN."""
+    return re.sub(r"([*?\[\]\\])", r"\\\1", value)
 
 
 def _load_writes(serde: SerializerProtocol, task_id_to_data: dict[tuple[str, str], dict]) -> list[PendingWrite]:
@@ -156,6 +199,34 @@ def _load_writes(serde: SerializerProtocol, task_id_to_data: dict[tuple[str, str
     return writes
 
 
+def _dump_blobs(
+    serde: SerializerProtocol,
+    thread_id: str,
+    checkpoint_ns: str,
+    channel_values: dict[str, Any],
+    new_versions: ChannelVersions,
+) -> dict[str, dict[str, Any]]:
+    """Serialize the values of the channels updated in this step, keyed by their versioned blob key."""
+    blobs = {}
+    for channel, version in new_versions.items():
+        # channels without a value (e.g. cleared channels) are stored as "empty".
+        type_, value = serde.dumps_typed(channel_values[channel]) if channel in channel_values else ("empty", b"")
+        blobs[_make_redis_checkpoint_blob_key(thread_id, checkpoint_ns, channel, version)] = {
+            "type": type_,
+            "value": value,
+        }
+    return blobs
+
+
+def _load_blobs(serde: SerializerProtocol, blobs: dict[str, dict]) -> dict[str, Any]:
+    """Deserialize the channel values of a delta checkpoint."""
+    return {
+        channel: serde.loads_typed((data[b"type"].decode(), data[b"value"]))
+        for channel, data in blobs.items()
+        if data[b"type"] != b"empty"
+    }
+
+
 def _parse_redis_checkpoint_data(
     serde: SerializerProtocol,
     key: str,
@@ -212,18 +283,22 @@ def _get_llm_usage_key_prefix(cluster_id: str) -> str:
 
 
 def _make_llm_usage_key(cluster_id: str) -> str:
-    """Create a Redis key for storing LLM usage data."""
-    return f"{_get_llm_usage_key_prefix(cluster_id)}_{time.time()}"
+    """Create the Redis key of the hash storing the bucketed LLM usage counters of a cluster."""
+    return f"{_get_llm_usage_key_prefix(cluster_id)}_buckets"
 
 
-def _get_llm_usage_key_filter(cluster_id: str) -> str:
-    """Get the Redis key filter for LLM usage data."""
-    return f"{_get_llm_usage_key_prefix(cluster_id)}_*"
+def _make_llm_usage_field(bucket: int, counter: str) -> str:
+    """Create the hash field of a usage counter in a time bucket, e.g. "1633036800:total"."""
+    return f"{bucket}:{counter}"
 
 
-def _extract_time_from_llm_usage_key(key: str) -> float:
-    """Extract the timestamp from an LLM usage key."""
-    return float(key.split("_")[-1])
+def _parse_llm_usage_buckets(data: dict) -> dict[int, dict[str, float]]:
+    """Group the fields of the LLM usage hash by their time bucket."""
+    buckets: dict[int, dict[str, float]] = defaultdict(dict)
+    for field, value in data.items():
+        bucket, counter = _safe_decode(field).split(":", 1)
+        buckets[int(bucket)][counter] = float(value)
+    return buckets
 
 
 class AsyncRedisSaver(BaseCheckpointSaver):
@@ -231,9 +306,30 @@ class AsyncRedisSaver(BaseCheckpointSaver):
 
     conn: AsyncRedis
 
-    def __init__(self, conn: AsyncRedis):
-        super().__init__()
+    def __init__(
+        self,
+        conn: AsyncRedis,
+        serde: SerializerProtocol | None = None,
+        delta_mode: bool = False,
+        max_checkpoints_per_thread: int = 0,
+    ):
+        """
+        Args:
+            conn: The async Redis connection.
+            serde: The serializer for checkpoints and writes. Defaults to the langgraph serializer.
+            delta_mode: If enabled, each channel value is stored once per version under its own key and
+                checkpoints only reference the channel versions, instead of embedding all channel values.
+            max_checkpoints_per_thread: If greater than zero, only the latest N checkpoints of a thread are kept.
+                Older checkpoints and their writes are deleted in the background after a new checkpoint is stored.
+                A value of 1 keeps only the latest state, which is the only one read by the graph.
+        """
+        super().__init__(serde=serde)
         self.conn = conn
+        self.delta_mode = delta_mode
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self._prune_tasks: dict[tuple[str, str], asyncio.Task] = {}
+        # whether all keys are known to be indexed, see abackfill_indexes_until_complete.
+        self._indexes_complete = False
 
     @classmethod
     def from_conn_info(cls, *, host: str, port: int, db: int, password: str) -> "AsyncRedisSaver":
@@ -292,6 +388,12 @@ class AsyncRedisSaver(BaseCheckpointSaver):
         parent_checkpoint_id = config["configurable"].get("checkpoint_id")
         key = _make_redis_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
 
+        blobs: dict[str, dict[str, Any]] = {}
+        if self.delta_mode:
+            # Only the channels updated in this step are written, the others are referenced by their version.
+            blobs = _dump_blobs(self.serde, thread_id, checkpoint_ns, checkpoint["channel_values"], new_versions)
+            checkpoint = {**checkpoint, "channel_values": {}}
+
         type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
         metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
         data = {
@@ -301,11 +403,30 @@ class AsyncRedisSaver(BaseCheckpointSaver):
             "metadata": serialized_metadata,
             "metadata_type": metadata_type,
             "parent_checkpoint_id": (parent_checkpoint_id if parent_checkpoint_id else ""),
+            "delta": "1" if self.delta_mode else "",
         }
 
-        await self._redis_call(self.conn.hset(key, mapping=data))
-        # Set TTL for each checkpoint
-        await self._redis_call(self.conn.expire(key, redis_ttl))
+        index_key = _make_redis_checkpoint_index_key(thread_id, checkpoint_ns)
+        # Store the checkpoint, its TTL and the thread index entry in a single round trip.
+        async with self.conn.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=data)
+            # Set TTL for each checkpoint
+            pipe.expire(key, redis_ttl)
+            # Register the checkpoint in the thread index, so that lookups do not need to scan the keyspace.
+            pipe.zadd(index_key, {checkpoint_id: 0})
+            pipe.expire(index_key, redis_ttl)
+            for blob_key, blob in blobs.items():
+                pipe.hset(blob_key, mapping=blob)
+            if self.delta_mode:
+                # The channel values referenced by this checkpoint must live as long as the checkpoint itself.
+                for channel, version in checkpoint["channel_versions"].items():
+                    pipe.expire(_make_redis_checkpoint_blob_key(thread_id, checkpoint_ns, channel, version), redis_ttl)
+            if self.max_checkpoints_per_thread > 0:
+                pipe.zcard(index_key)
+            results = await pipe.execute()
+
+        if self.max_checkpoints_per_thread > 0 and results[-1] > self.max_checkpoints_per_thread:
+            self._schedule_prune(thread_id, checkpoint_ns)
         return {
             "configurable": {
                 "thread_id": thread_id,
@@ -335,26 +456,36 @@ class AsyncRedisSaver(BaseCheckpointSaver):
         thread_id = config["configurable"]["thread_id"]
         checkpoint_ns = config["configurable"]["checkpoint_ns"]
         checkpoint_id = config["configurable"]["checkpoint_id"]
-
-        for idx, (channel, value) in enumerate(writes):
-            key = _make_redis_checkpoint_writes_key(
-                thread_id,
-                checkpoint_ns,
-                checkpoint_id,
-                task_id,
-                WRITES_IDX_MAP.get(channel, idx),
-            )
-            type_, serialized_value = self.serde.dumps_typed(value)
-            data = {"channel": channel, "type": type_, "value": serialized_value}
-            if all(w[0] in WRITES_IDX_MAP for w in writes):
-                # Use HSET which will overwrite existing values
-                await self._redis_call(self.conn.hset(key, mapping=data))
-            else:
-                # Use HSETNX which will not overwrite existing values
-                for field, item_value in data.items():
-                    await self._redis_call(self.conn.hsetnx(key, field, item_value))  # type: ignore[arg-type]
-            # Set TTL for each write
-            await self._redis_call(self.conn.expire(key, redis_ttl))
+        writes_index_key = _make_redis_checkpoint_writes_index_key(thread_id, checkpoint_ns, checkpoint_id)
+        overwrite = all(w[0] in WRITES_IDX_MAP for w in writes)
+
+        # Store all writes, their TTLs and the writes index entries in a single round trip.
+        async with self.conn.pipeline(transaction=True) as pipe:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                key = _make_redis_checkpoint_writes_key(
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    write_idx,
+                )
+                type_, serialized_value = self.serde.dumps_typed(value)
+                data = {"channel": channel, "type": type_, "value": serialized_value}
+                if overwrite:
+                    # Use HSET which will overwrite existing values
+                    pipe.hset(key, mapping=data)
+                else:
+                    # Use HSETNX which will not overwrite existing values
+                    for field, item_value in data.items():
+                        pipe.hsetnx(key, field, item_value)  # type: ignore[arg-type]
+                # Set TTL for each write
+                pipe.expire(key, redis_ttl)
+                # Register the write in the checkpoint writes index.
+                pipe.zadd(writes_index_key, {key: write_idx})
+            if writes:
+                pipe.expire(writes_index_key, redis_ttl)
+                await pipe.execute()
 
     async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
         """Get a checkpoint tuple from Redis asynchronously.
@@ -373,16 +504,26 @@ class AsyncRedisSaver(BaseCheckpointSaver):
         thread_id = config["configurable"]["thread_id"]
         checkpoint_id = get_checkpoint_id(config)
         checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        await self._aindex_thread_keys(thread_id, checkpoint_ns)
 
         checkpoint_key = await self._aget_checkpoint_key(self.conn, thread_id, checkpoint_ns, checkpoint_id)
         if not checkpoint_key:
             return None
-        checkpoint_data = await self._redis_call(self.conn.hgetall(checkpoint_key))
 
-        # load pending writes
+        # load the checkpoint and the keys of its pending writes in a single round trip.
         checkpoint_id = checkpoint_id or _parse_redis_checkpoint_key(checkpoint_key)["checkpoint_id"]
-        pending_writes = await self._aload_pending_writes(thread_id, checkpoint_ns, checkpoint_id)
-        return _parse_redis_checkpoint_data(self.serde, checkpoint_key, checkpoint_data, pending_writes=pending_writes)
+        writes_index_key = _make_redis_checkpoint_writes_index_key(thread_id, checkpoint_ns, checkpoint_id)
+        async with self.conn.pipeline(transaction=False) as pipe:
+            pipe.hgetall(checkpoint_key)
+            pipe.zrange(writes_index_key, 0, -1)
+            checkpoint_data, writes_keys = await pipe.execute()
+        if not checkpoint_data:
+            return None
+
+        checkpoint_tuples = await self._aload_checkpoint_tuples(
+            thread_id, checkpoint_ns, [(checkpoint_id, checkpoint_data, writes_keys)]
+        )
+        return checkpoint_tuples[0] if checkpoint_tuples else None
 
     async def alist(
         self,
@@ -411,33 +552,167 @@ class AsyncRedisSaver(BaseCheckpointSaver):
             raise ValueError("Config is required")
         thread_id = config["configurable"]["thread_id"]
         checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
-        pattern = _make_redis_checkpoint_key(thread_id, checkpoint_ns, "*")
-        keys = _filter_keys(await self.conn.keys(pattern), before, limit)
-        for key in keys:
-            data = await self._redis_call(self.conn.hgetall(_safe_decode(key)))
-            if data and b"checkpoint" in data and b"metadata" in data:
-                checkpoint_id = _parse_redis_checkpoint_key(_safe_decode(key))["checkpoint_id"]
-                pending_writes = await self._aload_pending_writes(thread_id, checkpoint_ns, checkpoint_id)
-                if result := _parse_redis_checkpoint_data(
-                    self.serde, key.decode(), data, pending_writes=pending_writes
-                ):
-                    yield result
+        await self._aindex_thread_keys(thread_id, checkpoint_ns)
+        index_key = _make_redis_checkpoint_index_key(thread_id, checkpoint_ns)
+        if before:
+            checkpoint_ids = await self._redis_call(
+                self.conn.zrevrangebylex(
+                    index_key,
+                    f"({before['configurable']['checkpoint_id']}",
+                    "-",
+                    start=0 if limit else None,
+                    num=limit if limit else None,
+                )
+            )
+        else:
+            checkpoint_ids = await self._redis_call(self.conn.zrevrange(index_key, 0, limit - 1 if limit else -1))
+        checkpoint_ids = [_safe_decode(checkpoint_id) for checkpoint_id in checkpoint_ids]
+        if not checkpoint_ids:
+            return
+
+        # Load all checkpoints and the keys of their pending writes in a single round trip.
+        async with self.conn.pipeline(transaction=False) as pipe:
+            for checkpoint_id in checkpoint_ids:
+                pipe.hgetall(_make_redis_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id))
+                pipe.zrange(_make_redis_checkpoint_writes_index_key(thread_id, checkpoint_ns, checkpoint_id), 0, -1)
+            results = await pipe.execute()
+        checkpoints_data = results[::2]
+        writes_keys_per_checkpoint = results[1::2]
+
+        # The checkpoints which have expired are dropped from the index.
+        expired_checkpoint_ids = [
+            checkpoint_id for checkpoint_id, data in zip(checkpoint_ids, checkpoints_data, strict=True) if not data
+        ]
+        if expired_checkpoint_ids:
+            await self._redis_call(self.conn.zrem(index_key, *expired_checkpoint_ids))
 
-    async def _aload_pending_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[PendingWrite]:
-        writes_key = _make_redis_checkpoint_writes_key(thread_id, checkpoint_ns, checkpoint_id, "*", None)
-        matching_keys = await self.conn.keys(pattern=writes_key)
-        parsed_keys = [_parse_redis_checkpoint_writes_key(key.decode()) for key in matching_keys]
-        pending_writes = _load_writes(
-            self.serde,
-            {
-                (parsed_key["task_id"], parsed_key["idx"]): await self._redis_call(self.conn.hgetall(key))
-                for key, parsed_key in sorted(
-                    zip(matching_keys, parsed_keys, strict=False),
-                    key=lambda x: x[1]["idx"],
+        checkpoints = [
+            (checkpoint_id, data, writes_keys)
+            for checkpoint_id, data, writes_keys in zip(
+                checkpoint_ids, checkpoints_data, writes_keys_per_checkpoint, strict=True
+            )
+            if data and b"checkpoint" in data and b"metadata" in data
+        ]
+        for checkpoint_tuple in await self._aload_checkpoint_tuples(thread_id, checkpoint_ns, checkpoints):
+            yield checkpoint_tuple
+
+    async def _aload_checkpoint_tuples(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoints: list[tuple[str, dict[bytes, bytes], list[str | bytes]]],
+    ) -> list[CheckpointTuple]:
+        """Build the checkpoint tuples from the raw checkpoints data and the keys of their pending writes.
+
+        The pending writes and the channel values of delta checkpoints are fetched in a single round trip.
+        """
+        checkpoint_tuples: list[CheckpointTuple] = []
+        blob_channels: list[tuple[int, str, str]] = []
+        for checkpoint_id, data, _ in checkpoints:
+            key = _make_redis_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+            checkpoint_tuple = _parse_redis_checkpoint_data(self.serde, key, data)
+            if checkpoint_tuple is None:
+                continue
+            if data.get(b"delta") == b"1":
+                blob_channels.extend(
+                    (len(checkpoint_tuples), channel, str(version))
+                    for channel, version in checkpoint_tuple.checkpoint["channel_versions"].items()
                 )
-            },
-        )
-        return pending_writes
+            checkpoint_tuples.append(checkpoint_tuple)
+
+        writes_keys = [key for _, _, keys in checkpoints for key in keys]
+        blob_keys = [
+            _make_redis_checkpoint_blob_key(thread_id, checkpoint_ns, channel, version)
+            for _, channel, version in blob_channels
+        ]
+        results = await self._ahgetall_many([_safe_decode(key) for key in writes_keys] + blob_keys)
+        pending_writes = self._parse_writes(writes_keys, results[: len(writes_keys)])
+
+        blobs: dict[int, dict[str, dict]] = {}
+        missing_versions: dict[int, dict[str, str]] = {}
+        for (idx, channel, version), blob in zip(blob_channels, results[len(writes_keys) :], strict=True):
+            if blob:
+                blobs.setdefault(idx, {})[channel] = blob
+            else:
+                missing_versions.setdefault(idx, {})[channel] = version
+
+        for idx, checkpoint_tuple in enumerate(checkpoint_tuples):
+            checkpoint_tuple.checkpoint["channel_values"].update(_load_blobs(self.serde, blobs.get(idx, {})))
+            if idx in missing_versions:
+                checkpoint_tuple.checkpoint["channel_values"].update(
+                    await self._arecover_channel_values(checkpoint_tuple, missing_versions[idx])
+                )
+            checkpoint_id = checkpoint_tuple.config["configurable"]["checkpoint_id"]
+            checkpoint_tuples[idx] = checkpoint_tuple._replace(pending_writes=pending_writes.get(checkpoint_id, []))
+        return checkpoint_tuples
+
+    async def _arecover_channel_values(
+        self, checkpoint_tuple: CheckpointTuple, missing_versions: dict[str, str]
+    ) -> dict[str, Any]:
+        """Recover channel values which are not stored as blobs from the full checkpoints of the ancestors.
+
+        This happens for threads which were started before delta mode was enabled. The recovered values are
+        stored as blobs, so that they are found directly by the next lookups.
+        """
+        thread_id = checkpoint_tuple.config["configurable"]["thread_id"]
+        checkpoint_ns = checkpoint_tuple.config["configurable"]["checkpoint_ns"]
+        missing_versions = dict(missing_versions)
+        recovered: dict[str, Any] = {}
+        parent_config = checkpoint_tuple.parent_config
+        while missing_versions and parent_config:
+            parent_key = _make_redis_checkpoint_key(
+                thread_id, checkpoint_ns, parent_config["configurable"]["checkpoint_id"]
+            )
+            parent_data = await self._redis_call(self.conn.hgetall(parent_key))
+            parent = _parse_redis_checkpoint_data(self.serde, parent_key, parent_data)
+            if parent is None:
+                break
+            if parent_data.get(b"delta") != b"1":
+                for channel, version in list(missing_versions.items()):
+                    if str(parent.checkpoint["channel_versions"].get(channel)) != version:
+                        continue
+                    if channel in parent.checkpoint["channel_values"]:
+                        recovered[channel] = parent.checkpoint["channel_values"][channel]
+                    del missing_versions[channel]
+            parent_config = parent.parent_config
+
+        if missing_versions:
+            logger.warning(f"Channel values {list(missing_versions)} of thread {thread_id} could not be recovered.")
+        if recovered:
+            async with self.conn.pipeline(transaction=False) as pipe:
+                versions = {channel: checkpoint_tuple.checkpoint["channel_versions"][channel] for channel in recovered}
+                for blob_key, blob in _dump_blobs(self.serde, thread_id, checkpoint_ns, recovered, versions).items():
+                    pipe.hset(blob_key, mapping=blob)
+                    pipe.expire(blob_key, REDIS_TTL)
+                await pipe.execute()
+        return recovered
+
+    async def _aload_pending_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[PendingWrite]:
+        writes_index_key = _make_redis_checkpoint_writes_index_key(thread_id, checkpoint_ns, checkpoint_id)
+        # The index is ordered by the write index, so no sorting is needed here.
+        writes_keys = await self._redis_call(self.conn.zrange(writes_index_key, 0, -1))
+        writes_data = await self._ahgetall_many([_safe_decode(key) for key in writes_keys])
+        return self._parse_writes(writes_keys, writes_data).get(checkpoint_id, [])
+
+    async def _ahgetall_many(self, keys: list[str]) -> list[dict]:
+        """Fetch the given hashes in a single round trip."""
+        if not keys:
+            return []
+        async with self.conn.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            return await pipe.execute()
+
+    def _parse_writes(self, writes_keys: list[str | bytes], writes_data: list[dict]) -> dict[str, list[PendingWrite]]:
+        """Deserialize the pending writes, grouped by the checkpoint ID they belong to, in the order of the keys."""
+        grouped: dict[str, dict[tuple[str, str], dict]] = {}
+        for key, data in zip(writes_keys, writes_data, strict=True):
+            if not data:
+                continue
+            parsed_key = _parse_redis_checkpoint_writes_key(_safe_decode(key))
+            grouped.setdefault(parsed_key["checkpoint_id"], {})[(parsed_key["task_id"], parsed_key["idx"])] = data
+
+        return {checkpoint_id: _load_writes(self.serde, data) for checkpoint_id, data in grouped.items()}
 
     async def _aget_checkpoint_key(
         self,
@@ -450,46 +725,277 @@ class AsyncRedisSaver(BaseCheckpointSaver):
         if checkpoint_id:
             return _make_redis_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
 
-        all_keys = await conn.keys(_make_redis_checkpoint_key(thread_id, checkpoint_ns, "*"))
-        if not all_keys:
+        # The index members are ordered lexicographically, so the last member is the latest checkpoint.
+        index_key = _make_redis_checkpoint_index_key(thread_id, checkpoint_ns)
+        latest = await self._redis_call(conn.zrevrange(index_key, 0, 0))
+        if not latest:
             return None
 
-        latest_key = max(
-            all_keys,
-            key=lambda k: _parse_redis_checkpoint_key(_safe_decode(k))["checkpoint_id"],
+        return _make_redis_checkpoint_key(thread_id, checkpoint_ns, _safe_decode(latest[0]))
+
+    def _schedule_prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Prune the old checkpoints of the thread in a background task, unless one is already running."""
+        thread_key = (thread_id, checkpoint_ns)
+        if thread_key in self._prune_tasks:
+            return
+        task = asyncio.create_task(self._aprune_in_background(thread_id, checkpoint_ns))
+        self._prune_tasks[thread_key] = task
+        task.add_done_callback(lambda _: self._prune_tasks.pop(thread_key, None))
+
+    async def _aprune_in_background(self, thread_id: str, checkpoint_ns: str) -> None:
+        try:
+            await self.aprune_checkpoints(thread_id, checkpoint_ns, self.max_checkpoints_per_thread)
+        except Exception:
+            # The pruned keys expire with their TTL anyway, so a failure must not affect the conversation.
+            logger.exception(f"Failed to prune checkpoints of thread {thread_id}.")
+
+    async def aprune_checkpoints(self, thread_id: str, checkpoint_ns: str, keep_last: int) -> int:
+        """Delete all but the latest checkpoints of a thread, together with their pending writes.
+
+        The keys are deleted with UNLINK in batches of PRUNE_BATCH_SIZE keys per round trip, so that
+        Redis frees the memory without blocking. In delta mode, the channel values are only deleted
+        if none of the kept checkpoints references them.
+
+        Args:
+            thread_id (str): The thread to prune.
+            checkpoint_ns (str): The checkpoint namespace to prune.
+            keep_last (int): The number of latest checkpoints to keep. Must be at least 1.
+
+        Returns:
+            int: The number of pruned checkpoints.
+        """
+        if keep_last < 1:
+            raise ValueError("At least one checkpoint must be kept.")
+        index_key = _make_redis_checkpoint_index_key(thread_id, checkpoint_ns)
+        # The index members are ordered from the oldest to the latest checkpoint.
+        async with self.conn.pipeline(transaction=False) as pipe:
+            pipe.zrange(index_key, 0, -(keep_last + 1))
+            pipe.zrange(index_key, -keep_last, -1)
+            pruned_ids, kept_ids = await pipe.execute()
+        pruned_ids = [_safe_decode(checkpoint_id) for checkpoint_id in pruned_ids]
+        kept_ids = [_safe_decode(checkpoint_id) for checkpoint_id in kept_ids]
+        if not pruned_ids:
+            return 0
+
+        # Remove the checkpoints from the index first, so that they are not read while being deleted.
+        await self._redis_call(self.conn.zrem(index_key, *pruned_ids))
+
+        checkpoint_keys = [_make_redis_checkpoint_key(thread_id, checkpoint_ns, i) for i in pruned_ids]
+        writes_index_keys = [_make_redis_checkpoint_writes_index_key(thread_id, checkpoint_ns, i) for i in pruned_ids]
+        async with self.conn.pipeline(transaction=False) as pipe:
+            for writes_index_key in writes_index_keys:
+                pipe.zrange(writes_index_key, 0, -1)
+            writes_keys = [_safe_decode(key) for keys in await pipe.execute() for key in keys]
+
+        keys_to_delete = checkpoint_keys + writes_index_keys + writes_keys
+        if self.delta_mode:
+            keys_to_delete += await self._aget_unreferenced_blob_keys(thread_id, checkpoint_ns, pruned_ids, kept_ids)
+
+        for start in range(0, len(keys_to_delete), PRUNE_BATCH_SIZE):
+            await self._redis_call(self.conn.unlink(*keys_to_delete[start : start + PRUNE_BATCH_SIZE]))
+        logger.debug(f"Pruned {len(pruned_ids)} checkpoints of thread {thread_id}.")
+        return len(pruned_ids)
+
+    async def _aget_unreferenced_blob_keys(
+        self, thread_id: str, checkpoint_ns: str, pruned_ids: list[str], kept_ids: list[str]
+    ) -> list[str]:
+        """Get the keys of the channel values referenced by the pruned checkpoints but not by the kept ones."""
+        async with self.conn.pipeline(transaction=False) as pipe:
+            for checkpoint_id in pruned_ids + kept_ids:
+                pipe.hmget(_make_redis_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id), ["type", "checkpoint"])
+            results = await pipe.execute()
+
+        def blob_keys(checkpoints_data: list) -> set[str]:
+            keys: set[str] = set()
+            for type_, serialized_checkpoint in checkpoints_data:
+                if type_ is None or serialized_checkpoint is None:
+                    continue
+                checkpoint = self.serde.loads_typed((type_.decode(), serialized_checkpoint))
+                keys.update(
+                    _make_redis_checkpoint_blob_key(thread_id, checkpoint_ns, channel, version)
+                    for channel, version in checkpoint["channel_versions"].items()
+                )
+            return keys
+
+        return sorted(blob_keys(results[: len(pruned_ids)]) - blob_keys(results[len(pruned_ids) :]))
+
+    async def abackfill_indexes(self, redis_ttl: int = REDIS_TTL, scan_count: int = 1000) -> int:
+        """Build the checkpoint and writes indexes for keys written before the indexes existed.
+
+        This is a one-time migration path. It uses SCAN instead of KEYS so that Redis is not blocked
+        while the keyspace is traversed, and indexes the keys of each SCAN page in a single round trip.
+
+        Args:
+            redis_ttl (Int): Time to live for the created index keys.
+            scan_count (Int): Number of keys Redis should inspect per SCAN iteration.
+
+        Returns:
+            int: The number of checkpoint and writes keys that were added to the indexes.
+        """
+        indexed = 0
+        for pattern in (f"checkpoint{REDIS_KEY_SEPARATOR}*", f"writes{REDIS_KEY_SEPARATOR}*"):
+            cursor = 0
+            while True:
+                cursor, keys = await self._redis_call(self.conn.scan(cursor, match=pattern, count=scan_count))
+                indexed += await self._aindex_keys([_safe_decode(key) for key in keys], redis_ttl)
+                if not cursor:
+                    break
+        logger.info(f"Backfilled checkpoint indexes for {indexed} keys.")
+        return indexed
+
+    async def _aindex_keys(self, keys: list[str], redis_ttl: int) -> int:
+        """Add the checkpoint and writes keys to their indexes in a single round trip. Other keys are ignored.
+
+        Returns:
+            int: The number of keys which were not indexed yet.
+        """
+        index_keys: set[str] = set()
+        async with self.conn.pipeline(transaction=False) as pipe:
+            for key in keys:
+                if key.startswith(f"checkpoint{REDIS_KEY_SEPARATOR}"):
+                    parsed_key = _parse_redis_checkpoint_key(key)
+                    index_key = _make_redis_checkpoint_index_key(parsed_key["thread_id"], parsed_key["checkpoint_ns"])
+                    pipe.zadd(index_key, {parsed_key["checkpoint_id"]: 0})
+                elif key.startswith(f"writes{REDIS_KEY_SEPARATOR}"):
+                    parsed_key = _parse_redis_checkpoint_writes_key(key)
+                    index_key = _make_redis_checkpoint_writes_index_key(
+                        parsed_key["thread_id"], parsed_key["checkpoint_ns"], parsed_key["checkpoint_id"]
+                    )
+                    pipe.zadd(index_key, {key: int(parsed_key["idx"])})
+                else:
+                    continue
+                index_keys.add(index_key)
+            if not index_keys:
+                return 0
+            added_count = len(pipe)
+            for index_key in index_keys:
+                pipe.expire(index_key, redis_ttl)
+            results = await pipe.execute()
+        return sum(results[:added_count])
+
+    async def abackfill_indexes_until_complete(
+        self, interval: float = INDEX_BACKFILL_INTERVAL, lock_ttl: int = INDEX_BACKFILL_LOCK_TTL
+    ) -> None:
+        """Backfill the indexes in passes, until a pass finds no keys without index entries.
+
+        Replicas of versions without the indexes write keys without index entries until they are stopped,
+        e.g. during a rolling deployment. Until the indexes are complete, the lookups of each thread also
+        scan for its keys, so that no conversation resumes from an outdated checkpoint.
+        """
+        while True:
+            try:
+                await self.abackfill_indexes_once(lock_ttl)
+                if await self._aindexes_complete():
+                    return
+            except Exception:
+                logger.exception("Failed to backfill the checkpoint indexes.")
+            await asyncio.sleep(interval)
+
+    async def abackfill_indexes_once(self, lock_ttl: int = INDEX_BACKFILL_LOCK_TTL) -> bool:
+        """Run a backfill pass, unless the indexes are complete or another replica is backfilling them.
+        The indexes are marked complete, if the pass found no keys without index entries.
+
+        The lock is extended while the backfill runs, so that no other replica takes it over.
+
+        Returns:
+            bool: Whether the indexes were backfilled by this call.
+        """
+        if await self._aindexes_complete():
+            return False
+        token = str(uuid.uuid4())
+        if not await self._redis_call(self.conn.set(INDEX_BACKFILL_LOCK_KEY, token, nx=True, ex=lock_ttl)):
+            logger.info("Checkpoint indexes are backfilled by another replica.")
+            return False
+        refresh_task = asyncio.create_task(self._arefresh_backfill_lock(token, lock_ttl))
+        try:
+            if await self.abackfill_indexes() == 0:
+                await self._redis_call(self.conn.set(INDEX_BACKFILL_DONE_KEY, "1"))
+                self._indexes_complete = True
+        finally:
+            refresh_task.cancel()
+            # the lock is only released, if it was not taken over after it expired.
+            if _safe_decode(await self._redis_call(self.conn.get(INDEX_BACKFILL_LOCK_KEY))) == token:
+                await self._redis_call(self.conn.delete(INDEX_BACKFILL_LOCK_KEY))
+        return True
+
+    async def _aindexes_complete(self) -> bool:
+        """Whether a backfill pass found all keys indexed. Once it did, it is not looked up again."""
+        if not self._indexes_complete:
+            self._indexes_complete = bool(await self._redis_call(self.conn.exists(INDEX_BACKFILL_DONE_KEY)))
+        return self._indexes_complete
+
+    async def _aindex_thread_keys(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Index the keys of the thread, which were written without index entries, until the indexes are complete.
+
+        The keyspace is scanned for the keys of the thread, like the lookups did before the indexes existed.
+        """
+        if await self._aindexes_complete():
+            return
+        pattern = REDIS_KEY_SEPARATOR.join(
+            ["*", _escape_glob_pattern(thread_id), _escape_glob_pattern(checkpoint_ns), "*"]
         )
-        return _safe_decode(latest_key)
+        cursor = 0
+        while True:
+            cursor, keys = await self._redis_call(
+                self.conn.scan(cursor, match=pattern, count=INDEX_FALLBACK_SCAN_COUNT)
+            )
+            await self._aindex_keys([_safe_decode(key) for key in keys], REDIS_TTL)
+            if not cursor:
+                return
+
+    async def _arefresh_backfill_lock(self, token: str, lock_ttl: int) -> None:
+        """Extend the backfill lock periodically, as long as it is held with the token."""
+        while True:
+            await asyncio.sleep(lock_ttl / 3)
+            if _safe_decode(await self._redis_call(self.conn.get(INDEX_BACKFILL_LOCK_KEY))) != token:
+                logger.warning("The checkpoint index backfill lock was lost.")
+                return
+            await self._redis_call(self.conn.expire(INDEX_BACKFILL_LOCK_KEY, lock_ttl))
 
     async def awrite_llm_usage(self, cluster_id: str, data: dict, ttl: int = 0) -> str:
-        """Write LLM usage data to Redis. Return the key."""
+        """Add the LLM usage to the counters of the current time bucket. Return the key.
+
+        The usage of all calls within the same TOKEN_USAGE_BUCKET_SECONDS interval is summed up,
+        so the number of counters depends on the time window and not on the number of LLM calls.
+        """
         key = _make_llm_usage_key(cluster_id)
-        if ttl > 0:
-            await self.conn.set(key, json.dumps(data), ex=ttl)
-        else:
-            await self.conn.set(key, json.dumps(data))
+        now = time.time()
+        bucket = int(now // TOKEN_USAGE_BUCKET_SECONDS * TOKEN_USAGE_BUCKET_SECONDS)
+        async with self.conn.pipeline(transaction=True) as pipe:
+            for counter in LLM_USAGE_COUNTERS:
+                pipe.hincrby(key, _make_llm_usage_field(bucket, counter), int(data.get(counter, 0)))
+            # the time of the latest call in the bucket.
+            pipe.hset(key, _make_llm_usage_field(bucket, "epoch"), str(now))
+            if ttl > 0:
+                # the hash expires when no usage was written within the ttl.
+                pipe.expire(key, ttl)
+            await pipe.execute()
         return key
 
     async def adelete_expired_llm_usage_records(self, cluster_id: str, ttl: int) -> None:
-        """Delete expired LLM usage records."""
-        keys = await self.conn.keys(_get_llm_usage_key_filter(cluster_id))
-        keys_to_delete = []
-        for key in keys:
-            old_time = _extract_time_from_llm_usage_key(_safe_decode(key))
-            if time.time() - old_time > ttl:
-                keys_to_delete.append(key)
-        if len(keys_to_delete) > 0:
-            await self.conn.delete(*keys_to_delete)
+        """Delete the usage counters of the time buckets without any usage within the ttl."""
+        key = _make_llm_usage_key(cluster_id)
+        buckets = _parse_llm_usage_buckets(await self._redis_call(self.conn.hgetall(key)))
+        expired_fields = [
+            _make_llm_usage_field(bucket, counter)
+            for bucket, counters in buckets.items()
+            if time.time() - counters.get("epoch", 0) > ttl
+            for counter in counters
+        ]
+        if len(expired_fields) > 0:
+            await self._redis_call(self.conn.hdel(key, *expired_fields))
 
     async def alist_llm_usage_records(self, cluster_id: str, ttl: int) -> list[dict]:
-        """List non-expired LLM usage records."""
-        keys = await self.conn.keys(_get_llm_usage_key_filter(cluster_id))
-        latest_keys = []
-        for key in keys:
-            old_time = _extract_time_from_llm_usage_key(_safe_decode(key))
-            if time.time() - old_time < ttl:
-                latest_keys.append(key)
-        records = await self.conn.mget(latest_keys)
-        return [json.loads(record) for record in records if record]
+        """List the usage of the time buckets with usage within the ttl, one record per bucket."""
+        buckets = _parse_llm_usage_buckets(await self._redis_call(self.conn.hgetall(_make_llm_usage_key(cluster_id))))
+        return [
+            {
+                **{counter: int(counters.get(counter, 0)) for counter in LLM_USAGE_COUNTERS},
+                "epoch": counters.get("epoch", 0),
+            }
+            for counters in buckets.values()
+            if time.time() - counters.get("epoch", 0) < ttl
+        ]
 
 
 def get_async_redis_saver() -> AsyncRedisSaver:
@@ -497,4 +1003,9 @@ def get_async_redis_saver() -> AsyncRedisSaver:
     Returns an instance of AsyncRedisSaver with a async redis connection as defined in the config files.
     """
     connection = Redis().get_connection()
-    return AsyncRedisSaver(connection)
+    return AsyncRedisSaver(
+        connection,
+        serde=CompressedSerializer(compression_threshold=REDIS_CHECKPOINT_COMPRESSION_THRESHOLD),
+        delta_mode=REDIS_CHECKPOINT_DELTA_MODE,
+        max_checkpoints_per_thread=REDIS_CHECKPOINT_RETENTION_COUNT,
+    )
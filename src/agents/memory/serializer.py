@@ -0,0 +1,53 @@
+"""Serializers used by the Redis checkpoint saver."""
+
+from typing import Any
+
+import zstandard
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Suffix appended to the type of the wrapped serializer when the payload is compressed.
+ZSTD_TYPE_SUFFIX = "+zstd"
+
+
+class CompressedSerializer(SerializerProtocol):
+    """Serializer which compresses the payloads of another serializer with zstd.
+
+    Only payloads larger than the compression threshold are compressed, so that small values
+    (e.g. metadata or pending writes) do not pay the compression overhead. Compressed payloads are
+    marked by suffixing the type with "+zstd", so values written by the wrapped serializer alone
+    (e.g. "msgpack" or "json") can still be read.
+    """
+
+    def __init__(
+        self,
+        serde: SerializerProtocol | None = None,
+        compression_threshold: int = 1024,
+        compression_level: int = 3,
+    ):
+        """
+        Args:
+            serde: The serializer to wrap. Defaults to the msgpack based JsonPlusSerializer.
+            compression_threshold: Minimum payload size in bytes to compress. A negative value disables compression.
+            compression_level: The zstd compression level.
+        """
+        self.serde = serde or JsonPlusSerializer()
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        """Serialize the object and compress the payload if it exceeds the threshold."""
+        type_, data = self.serde.dumps_typed(obj)
+        if self.compression_threshold < 0 or len(data) < self.compression_threshold:
+            return type_, data
+        # zstd compressor objects are not safe for concurrent use, so a new one is created per call.
+        compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        return f"{type_}{ZSTD_TYPE_SUFFIX}", compressed
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        """Decompress the payload if needed and deserialize it with the wrapped serializer."""
+        type_, payload = data
+        if type_.endswith(ZSTD_TYPE_SUFFIX):
+            type_ = type_.removesuffix(ZSTD_TYPE_SUFFIX)
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        return self.serde.loads_typed((type_, payload))
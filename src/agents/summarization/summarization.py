@@ -1,5 +1,5 @@
-import copy
-from typing import Any
+import asyncio
+from typing import Any, cast
 
 from langchain_core.embeddings import Embeddings
 from langchain_core.messages import (
@@ -15,15 +15,17 @@ from pydantic import BaseModel
 
 from agents.common.constants import ERROR, NEXT
 from agents.common.utils import (
+    compute_message_token_count,
     compute_messages_token_count,
-    compute_string_token_count,
     filter_valid_messages,
 )
 from agents.summarization.prompts import MESSAGES_SUMMARIZATION_PROMPT
 from agents.supervisor.agent import SUPERVISOR
 from utils import logging
+from utils.cache import TTLCache
 from utils.chain import ainvoke_chain
 from utils.models.factory import IModel
+from utils.settings import ROLLING_SUMMARY_CACHE_MAX_SIZE, ROLLING_SUMMARY_CACHE_TTL
 
 logger = logging.get_logger(__name__)
 
@@ -39,13 +41,27 @@ class MessageSummarizer:
         token_upper_limit: int,
         messages_key: str = "messages",
         messages_summary_key: str = "messages_summary",
+        rolling: bool = False,
     ) -> None:
+        """
+        Args:
+            rolling: Whether to summarize in the background. The evicted messages are folded into the
+                existing summary by a task, whose result is applied by the next run of the node for the
+                conversation, so the summarization does not block the response.
+        """
         self._model = model
         self._tokenizer_model_name = tokenizer_model_name
         self._token_lower_limit = token_lower_limit
         self._token_upper_limit = token_upper_limit
         self._messages_key = messages_key
         self._messages_summary_key = messages_summary_key
+        self._rolling = rolling
+        # the running rolling summary tasks, as the event loop only keeps weak references to them.
+        self._rolling_summary_tasks: set[asyncio.Task] = set()
+        # the latest rolling summary task of each conversation. Evicted tasks are cancelled, as nothing applies them.
+        self._rolling_summaries = TTLCache(
+            maxsize=ROLLING_SUMMARY_CACHE_MAX_SIZE, ttl=ROLLING_SUMMARY_CACHE_TTL, on_evict=_cancel_evicted_task
+        )
 
         # create a chat prompt template for summarization.
         llm_prompt = ChatPromptTemplate.from_messages(
@@ -75,10 +91,11 @@ class MessageSummarizer:
         # iterate the messages in reverse order and keep message if token limit is not exceeded.
         tokens = 0
         for msg in reversed(messages):
-            tokens += compute_string_token_count(str(msg.content), self._tokenizer_model_name)
+            tokens += compute_message_token_count(msg, self._tokenizer_model_name)
             if tokens > self._token_lower_limit:
                 break
-            filtered_messages.insert(0, copy.deepcopy(msg))
+            filtered_messages.append(msg)
+        filtered_messages.reverse()
 
         # remove the tool messages from head of the list,
         # because a tool message must be preceded by a system message.
@@ -108,6 +125,10 @@ class MessageSummarizer:
 
         state_messages_summary = getattr(state, self._messages_summary_key)
 
+        thread_id = config.get("configurable", {}).get("thread_id")
+        if self._rolling and thread_id:
+            return self._rolling_summarization(thread_id, state_messages, state_messages_summary, config)
+
         all_messages = state_messages
         if state_messages_summary != "":
             # if there is a summary, prepend it to the messages.
@@ -149,3 +170,75 @@ class MessageSummarizer:
             self._messages_key: delete_messages,
             NEXT: SUPERVISOR,
         }
+
+    def _rolling_summarization(
+        self,
+        thread_id: str,
+        state_messages: list[BaseMessage],
+        state_messages_summary: str,
+        config: RunnableConfig,
+    ) -> dict[str, Any]:
+        """Apply the finished rolling summary of the conversation, and start folding the messages
+        beyond the token limit into the summary, without waiting for it."""
+        key = (thread_id, self._messages_key)
+        result: dict[str, Any] = {ERROR: None, self._messages_key: []}
+        task: asyncio.Task | None = self._rolling_summaries.get(key)
+        if task is not None:
+            if not task.done():
+                return result
+            self._rolling_summaries.pop(key)
+            applied = self._apply_rolling_summary(task, state_messages, state_messages_summary)
+            if applied is not None:
+                state_messages_summary, evicted_ids = applied
+                state_messages = [m for m in state_messages if str(m.id) not in evicted_ids]
+                result = {
+                    ERROR: None,
+                    self._messages_summary_key: state_messages_summary,
+                    self._messages_key: [RemoveMessage(id=m_id) for m_id in evicted_ids],
+                    NEXT: SUPERVISOR,
+                }
+
+        # the summary is kept outside of the window, as only the evicted messages are folded into it.
+        window: list[BaseMessage] = [SystemMessage(content=state_messages_summary)] if state_messages_summary else []
+        if self.get_messages_token_count(cast(Messages, window + state_messages)) <= self.get_token_upper_limit():
+            return result
+        kept_messages = self.filter_messages_by_token_limit(state_messages)
+        evicted_messages = state_messages[: len(state_messages) - len(kept_messages)]
+        if evicted_messages:
+            task = asyncio.create_task(self._afold_into_summary(evicted_messages, state_messages_summary, config))
+            self._rolling_summary_tasks.add(task)
+            task.add_done_callback(self._rolling_summary_tasks.discard)
+            self._rolling_summaries.set(key, task)
+        return result
+
+    async def _afold_into_summary(
+        self, evicted_messages: list[BaseMessage], messages_summary: str, config: RunnableConfig
+    ) -> tuple[str, str, set[str]]:
+        """Fold the evicted messages into the summary. Returns the summary it was based on,
+        the new summary and the ids of the evicted messages."""
+        messages = list(evicted_messages)
+        if messages_summary:
+            messages.insert(0, SystemMessage(content=messages_summary))
+        summary = await self.get_summary(messages, config)
+        return messages_summary, summary, {str(m.id) for m in evicted_messages}
+
+    @staticmethod
+    def _apply_rolling_summary(
+        task: asyncio.Task, state_messages: list[BaseMessage], state_messages_summary: str
+    ) -> tuple[str, list[str]] | None:
+        """Returns the new summary and the ids of the evicted messages which are still in the state,
+        or None if the task failed or is outdated."""
+        if task.cancelled():
+            return None
+        if task.exception() is not None:
+            logger.error(f"Error while summarizing messages in the background: {task.exception()}")
+            return None
+        base_summary, summary, evicted_ids = task.result()
+        # the summary is outdated, if the conversation was summarized in the meantime.
+        if base_summary != state_messages_summary:
+            return None
+        return summary, [str(m.id) for m in state_messages if m.id in evicted_ids]
+
+
+def _cancel_evicted_task(_key: object, task: asyncio.Task) -> None:
+    task.cancel()
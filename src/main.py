@@ -1,3 +1,6 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 from typing import Any
 
@@ -7,17 +10,52 @@ from fastapi.exceptions import RequestValidationError, ResponseValidationError
 from starlette.responses import JSONResponse
 
 from agents.common.constants import ERROR_RATE_LIMIT_CODE
+from agents.common.utils import warm_up_tokenizer
+from agents.memory.async_redis_checkpointer import get_async_redis_saver
 from routers.conversations import router as conversations_router
 from routers.k8s_tools_api import router as k8s_tools_router
 from routers.kyma_tools_api import router as kyma_tools_router
 from routers.probes import router as probes_router
+from services.conversation import ConversationService
+from services.data_sanitizer import SanitizerProcessPool
+from services.k8s_informers import K8sInformerRegistry
+from services.k8s_sessions import K8sSessionPool
 from services.metrics import CustomMetrics
 from utils.exceptions import K8sClientError
 from utils.logging import get_logger
+from utils.settings import MAIN_MODEL_NAME
+from utils.singleton_meta import SingletonMeta
 
 logger = get_logger(__name__)
+
+
+async def backfill_checkpoint_indexes() -> None:
+    """Backfill the checkpoint indexes until they are complete, logging any failure."""
+    try:
+        await get_async_redis_saver().abackfill_indexes_until_complete()
+    except Exception:
+        logger.exception("Failed to backfill the checkpoint indexes.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
+    """Load the tokenizer and migrate the checkpoints in the background on startup,
+    and close the shared resources on shutdown."""
+    warm_up_tokenizer(MAIN_MODEL_NAME)
+    backfill_task = asyncio.create_task(backfill_checkpoint_indexes())
+    yield
+    backfill_task.cancel()
+    conversation_service = SingletonMeta.get_instance(ConversationService)
+    if isinstance(conversation_service, ConversationService):
+        await conversation_service.aclose()
+    await K8sInformerRegistry().aclose()
+    await K8sSessionPool().aclose()
+    SanitizerProcessPool().shutdown()
+
+
 app = FastAPI(
     title="Joule",
+    lifespan=lifespan,
 )
 
 
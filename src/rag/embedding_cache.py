@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+from services.redis import Redis
+from utils.cache import TTLCache
+from utils.logging import get_logger
+from utils.settings import (
+    QUERY_EMBEDDING_CACHE_MAX_SIZE,
+    QUERY_EMBEDDING_CACHE_REDIS_ENABLED,
+    QUERY_EMBEDDING_CACHE_TTL,
+)
+from utils.singleton_meta import SingletonMeta
+
+logger = get_logger(__name__)
+
+REDIS_KEY_PREFIX = "query_embedding:"
+
+
+def normalize_query(query: str) -> str:
+    """Normalize the whitespace of the query, which does not change its meaning."""
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache(metaclass=SingletonMeta):
+    """Process-wide cache of the embeddings of the search queries, with an optional Redis tier.
+
+    Queries are cached by embedding model and normalized text, as repeated questions like
+    "How to install Kyma?" would otherwise be embedded by the remote model every time.
+    The Redis tier shares the embeddings between replicas and restarts.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = QUERY_EMBEDDING_CACHE_MAX_SIZE,
+        ttl: float = QUERY_EMBEDDING_CACHE_TTL,
+        redis_enabled: bool = QUERY_EMBEDDING_CACHE_REDIS_ENABLED,
+    ):
+        """
+        Args:
+            maxsize: The maximum number of embeddings kept in memory.
+            ttl: Seconds for which an embedding is kept, in memory and in Redis.
+            redis_enabled: Whether to share the embeddings in Redis.
+        """
+        self.ttl = ttl
+        self.redis_enabled = redis_enabled
+        self._embeddings = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def aembed_queries(self, embedding: Embeddings, model_name: str, queries: list[str]) -> list[list[float]]:
+        """Get the embeddings of the queries, in their order.
+        The queries missing in all tiers are embedded with a single call of the embedding model."""
+        texts = [normalize_query(query) for query in queries]
+        embeddings: dict[str, list[float]] = {}
+        for text in texts:
+            cached = self._embeddings.get((model_name, text))
+            if cached is not None:
+                embeddings[text] = cached
+
+        missing = [text for text in dict.fromkeys(texts) if text not in embeddings]
+        if missing and self.redis_enabled:
+            loaded = await self._aload_from_redis(model_name, missing)
+            embeddings.update(loaded)
+            missing = [text for text in missing if text not in loaded]
+
+        if missing:
+            computed = dict(zip(missing, await embedding.aembed_documents(missing), strict=True))
+            embeddings.update(computed)
+            if self.redis_enabled:
+                await self._asave_to_redis(model_name, computed)
+
+        for text in dict.fromkeys(texts):
+            self._embeddings.set((model_name, text), embeddings[text])
+        return [embeddings[text] for text in texts]
+
+    def clear(self) -> None:
+        """Remove all embeddings from memory."""
+        self._embeddings.clear()
+
+    async def _aload_from_redis(self, model_name: str, texts: list[str]) -> dict[str, list[float]]:
+        try:
+            values = await Redis().get_connection().mget([_get_redis_key(model_name, text) for text in texts])
+        except Exception as e:
+            logger.warning(f"Failed to load the query embeddings from Redis: {e}")
+            return {}
+        return {text: _from_bytes(value) for text, value in zip(texts, values, strict=True) if value}
+
+    async def _asave_to_redis(self, model_name: str, embeddings: dict[str, list[float]]) -> None:
+        try:
+            connection = Redis().get_connection()
+            await asyncio.gather(
+                *(
+                    connection.set(_get_redis_key(model_name, text), _to_bytes(vector), ex=int(self.ttl))
+                    for text, vector in embeddings.items()
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Failed to save the query embeddings to Redis: {e}")
+
+    @classmethod
+    def _reset_for_tests(cls) -> None:
+        """Reset the singleton instance. Only use this for testing purpose."""
+        SingletonMeta.reset_instance(cls)
+
+
+def _get_redis_key(model_name: str, text: str) -> str:
+    return REDIS_KEY_PREFIX + hashlib.sha256(f"{model_name}\0{text}".encode()).hexdigest()
+
+
+def _to_bytes(vector: list[float]) -> bytes:
+    # the embeddings are stored as doubles, so that they are restored exactly.
+    return array("d", vector).tobytes()
+
+
+def _from_bytes(value: bytes) -> list[float]:
+    return array("d", value).tolist()
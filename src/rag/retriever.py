@@ -1,3 +1,4 @@
+import asyncio
 import time
 from typing import Protocol
 
@@ -7,8 +8,10 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.runnables import run_in_executor
 from langchain_hana import HanaDB
 
+from rag.embedding_cache import QueryEmbeddingCache
 from services.metrics import CustomMetrics
 from utils.logging import get_logger
+from utils.settings import MAIN_EMBEDDING_MODEL_NAME
 
 logger = get_logger(__name__)
 
@@ -51,6 +54,28 @@ class HanaVectorDB(HanaDB):
         except Exception as e:
             raise e
 
+    async def asimilarity_search_by_vector(  # type: ignore[override]
+        self, embedding: list[float], k: int = 4, filter: dict | None = None
+    ) -> list[Document]:
+        """Return docs most similar to the embedding vector asynchronously
+
+        Args:
+            embedding: Embedding to look up documents similar to.
+            k: Number of Documents to return. Defaults to 4.
+            filter: A dictionary of metadata fields and values to filter by.
+                    Defaults to None.
+
+        Returns:
+            List of Documents most similar to the embedding
+        """
+        return await run_in_executor(
+            None,
+            self.similarity_search_by_vector,
+            embedding,
+            k=k,
+            filter=filter,
+        )
+
 
 class IRetriever(Protocol):
     """Retriever interface."""
@@ -59,22 +84,48 @@ class IRetriever(Protocol):
         """Retrieve relevant documents based on the query."""
         ...
 
+    async def aretrieve_many(self, queries: list[str], top_k: int = 3) -> list[list[Document]]:
+        """Retrieve relevant documents for each of the queries."""
+        ...
+
 
 class HanaDBRetriever:
-    """HANA DB Retriever."""
+    """HANA DB Retriever.
+    The embeddings of the queries are cached by the process-wide query embedding cache."""
 
-    def __init__(self, embedding: Embeddings, connection: dbapi.Connection, table_name: str):
+    def __init__(
+        self,
+        embedding: Embeddings,
+        connection: dbapi.Connection,
+        table_name: str,
+        embedding_model_name: str = MAIN_EMBEDDING_MODEL_NAME,
+    ):
         self.db = HanaVectorDB(
             connection=connection,
             embedding=embedding,
             table_name=table_name,
         )
+        self.embedding = embedding
+        self.embedding_model_name = embedding_model_name
 
     async def aretrieve(self, query: str, top_k: int = 5) -> list[Document]:
         """Retrieve relevant documents based on the query."""
+        return (await self.aretrieve_many([query], top_k))[0]
+
+    async def aretrieve_many(self, queries: list[str], top_k: int = 5) -> list[list[Document]]:
+        """Retrieve relevant documents for each of the queries.
+        The queries are embedded in a single batch, and searched concurrently."""
+        embeddings = await QueryEmbeddingCache().aembed_queries(self.embedding, self.embedding_model_name, queries)
+        return list(
+            await asyncio.gather(
+                *(self._asearch(query, embedding, top_k) for query, embedding in zip(queries, embeddings, strict=True))
+            )
+        )
+
+    async def _asearch(self, query: str, embedding: list[float], top_k: int) -> list[Document]:
         start_time = time.perf_counter()
         try:
-            docs = await self.db.asimilarity_search(query, k=top_k)
+            docs = await self.db.asimilarity_search_by_vector(embedding, k=top_k)
             # record latency.
             await CustomMetrics().record_hanadb_latency(time.perf_counter() - start_time, True)
         except Exception as e:
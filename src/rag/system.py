@@ -1,4 +1,3 @@
-import asyncio
 from typing import Protocol, cast
 
 from langchain_core.documents import Document
@@ -45,6 +44,7 @@ class RAGSystem:
             embedding=cast(Embeddings, models[MAIN_EMBEDDING_MODEL_NAME]),
             connection=Hana().get_connction(),
             table_name=DOCS_TABLE_NAME,
+            embedding_model_name=MAIN_EMBEDDING_MODEL_NAME,
         )
 
         # setup reranker
@@ -61,8 +61,8 @@ class RAGSystem:
         # add original query to the list
         all_queries = [query.text] + alternative_queries.queries
 
-        # retrieve documents for all queries concurrently
-        all_docs = await asyncio.gather(*(self.retriever.aretrieve(q) for q in all_queries))
+        # retrieve documents for all queries concurrently, embedding them in a single batch.
+        all_docs = await self.retriever.aretrieve_many(all_queries)
 
         # rerank documents
         reranked_docs = await self.reranker.arerank(
@@ -302,7 +302,7 @@ def init_k8s_client(
     # Note: K8sClient initialization doesn't immediately validate connection
     # Connection validation is deferred until first API call (lazy initialization)
     # This allows authentication errors to be caught by route handlers
-    return K8sClient(
+    return K8sClient.new(
         k8s_auth_headers=k8s_auth_headers,
         data_sanitizer=data_sanitizer,
     )
@@ -9,7 +9,7 @@ from starlette.responses import JSONResponse, StreamingResponse
 
 from agents.common.constants import CLUSTER, ERROR_RATE_LIMIT_CODE, UNKNOWN
 from agents.common.data import Message
-from agents.common.utils import compute_string_token_count
+from agents.common.utils import compute_bounded_string_token_count, get_max_token_byte_count
 from routers.common import (
     API_PREFIX,
     SESSION_ID_HEADER,
@@ -67,10 +67,20 @@ def enforce_query_token_limit(
         Body(title="The payload which may be either a Message or InitConversationBody"),
     ] = None,
 ) -> None:
-    """Enforce query token limit to input request."""
+    """Enforce query token limit to input request.
+    Every token encodes at least one byte and at most the bytes of the longest token, so the byte length
+    of the request decides without tokenizing, unless it is close to the limit. Otherwise the request is
+    tokenized in chunks until it exceeds the limit, so that only about the limit of tokens is encoded."""
     if message is None:
         return
-    token_count = compute_string_token_count(message.model_dump_json(), MAIN_MODEL_NAME)
+    query = message.model_dump_json()
+    byte_count = len(query.encode())
+    if byte_count <= MAX_TOKEN_LIMIT_INPUT_QUERY:
+        return
+    if byte_count > MAX_TOKEN_LIMIT_INPUT_QUERY * get_max_token_byte_count(MAIN_MODEL_NAME):
+        logger.info(f"Input Query of {byte_count} bytes exceeds the token limit")
+        raise HTTPException(status_code=400, detail="Input Query exceeds the allowed token limit.")
+    token_count = compute_bounded_string_token_count(query, MAIN_MODEL_NAME, MAX_TOKEN_LIMIT_INPUT_QUERY)
     logger.info(f"Input Query Token count is {token_count}")
     if token_count > MAX_TOKEN_LIMIT_INPUT_QUERY:
         raise HTTPException(status_code=400, detail="Input Query exceeds the allowed token limit.")
@@ -117,7 +127,7 @@ async def init_conversation(
 
     # Initialize k8s client for the request.
     try:
-        k8s_client: IK8sClient = K8sClient(
+        k8s_client: IK8sClient = K8sClient.new(
             k8s_auth_headers=k8s_auth_headers,
             data_sanitizer=data_sanitizer,
         )
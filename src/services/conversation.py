@@ -19,7 +19,7 @@ from initial_questions.inital_questions import (
     InitialQuestionsHandler,
 )
 from services.k8s import IK8sClient
-from services.usage import IUsageTracker, UsageExceedReport, UsageTracker
+from services.usage import IUsageTracker, UsageCache, UsageExceedReport, UsageTracker
 from utils.config import Config
 from utils.logging import get_logger
 from utils.models.factory import IModel, IModelFactory, ModelFactory
@@ -94,9 +94,19 @@ class ConversationService(metaclass=SingletonMeta):
 
         # Set up the Kyma Graph which allows access to stored conversation histories.
         checkpointer = get_async_redis_saver()
-        self._usage_limiter = UsageTracker(checkpointer, TOKEN_LIMIT_PER_CLUSTER, TOKEN_USAGE_RESET_INTERVAL)
+        # The token usage is accumulated in-process and synced with Redis in the background.
+        self._usage_cache = UsageCache(checkpointer, TOKEN_USAGE_RESET_INTERVAL)
+        self._usage_limiter = UsageTracker(
+            checkpointer, TOKEN_LIMIT_PER_CLUSTER, TOKEN_USAGE_RESET_INTERVAL, usage_cache=self._usage_cache
+        )
+
+        self._companion_graph = CompanionGraph(
+            models, memory=checkpointer, handler=langfuse_handler, usage_memory=self._usage_cache
+        )
 
-        self._companion_graph = CompanionGraph(models, memory=checkpointer, handler=langfuse_handler)
+    async def aclose(self) -> None:
+        """Flush the token usage which is not yet written to Redis."""
+        await self._usage_cache.aflush_all()
 
     async def new_conversation(self, k8s_client: IK8sClient, message: Message) -> list[str]:
         """Initialize a new conversation."""
@@ -160,7 +170,5 @@ class ConversationService(metaclass=SingletonMeta):
 
     async def is_usage_limit_exceeded(self, cluster_id: str) -> UsageExceedReport | None:
         """Check if the token usage limit is exceeded for the given cluster_id."""
-        # Delete expired records before checking the usage limit.
-        await self._usage_limiter.adelete_expired_records(cluster_id)
-        # Check if the usage limit is exceeded.
+        # Expired records are deleted by the usage cache when it syncs with Redis.
         return await self._usage_limiter.ais_usage_limit_exceeded(cluster_id)
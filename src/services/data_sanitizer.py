@@ -1,12 +1,35 @@
-import json
+import asyncio
+import hashlib
+import math
+import multiprocessing
+import pickle
 import re
-from typing import Any, Protocol
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Protocol, cast
 
 import scrubadub
 
+from services.metrics import CustomMetrics
+from utils import logging
+from utils.cache import TTLCache
 from utils.config import DataSanitizationConfig
+from utils.settings import (
+    DATA_SANITIZER_CACHE_MAX_SIZE,
+    DATA_SANITIZER_CACHE_TTL,
+    DATA_SANITIZER_PROCESS_POOL_CHUNK_SIZE,
+    DATA_SANITIZER_PROCESS_POOL_ENABLED,
+    DATA_SANITIZER_PROCESS_POOL_MIN_BYTES,
+    DATA_SANITIZER_PROCESS_POOL_SIZE,
+)
 from utils.singleton_meta import SingletonMeta
 
+logger = logging.get_logger(__name__)
+
 DEFAULT_SENSITIVE_RESOURCES = [
     "Deployment",
     "DeploymentList",
@@ -75,21 +98,185 @@ DEFAULT_REGEX_PATTERNS = [
     r"(?i)(user_name)\s*[=:]\s*[^\s\n]+",  # Usernames
 ]
 
+# Fields whose values are set by Kubernetes in a known format, like UIDs, timestamps, IPs and enums.
+# Their strings are not scrubbed for personal information, as they often contain enough digits to be
+# checked for phone numbers, which is the most expensive check. The fields are matched by their path
+# from the object, skipping list indices, as the same names may be user-controlled keys elsewhere,
+# e.g. in the data of a ConfigMap, in labels or in the spec of a custom resource.
+_POD_SPEC_SAFE_FIELDS = [
+    ("restartPolicy",),
+    ("dnsPolicy",),
+    *(
+        (containers, field)
+        for containers in ("containers", "initContainers")
+        for field in ("imagePullPolicy", "terminationMessagePath", "terminationMessagePolicy")
+    ),
+    *((containers, "ports", "protocol") for containers in ("containers", "initContainers")),
+]
+_CONTAINER_STATUS_SAFE_FIELDS = [
+    ("containerID",),
+    ("imageID",),
+    ("state", "running", "startedAt"),
+    *(
+        (state, "terminated", field)
+        for state in ("state", "lastState")
+        for field in ("startedAt", "finishedAt", "reason", "containerID")
+    ),
+    *((state, "waiting", "reason") for state in ("state", "lastState")),
+]
+PII_SAFE_FIELD_PATHS = frozenset(
+    [
+        ("apiVersion",),
+        ("kind",),
+        *(("metadata", field) for field in ("uid", "resourceVersion", "creationTimestamp", "deletionTimestamp")),
+        *(("metadata", "ownerReferences", field) for field in ("apiVersion", "kind", "uid")),
+        # events.
+        *((field,) for field in ("type", "reason", "firstTimestamp", "lastTimestamp", "eventTime")),
+        *(("involvedObject", field) for field in ("apiVersion", "kind", "uid", "resourceVersion")),
+        # status.
+        *(("status", field) for field in ("phase", "podIP", "hostIP", "qosClass", "startTime", "observedGeneration")),
+        ("status", "podIPs", "ip"),
+        ("status", "hostIPs", "ip"),
+        *(
+            ("status", "conditions", field)
+            for field in (
+                "type",
+                "status",
+                "reason",
+                "lastProbeTime",
+                "lastTransitionTime",
+                "lastUpdateTime",
+                "lastHeartbeatTime",
+            )
+        ),
+        *(
+            ("status", statuses, *path)
+            for statuses in ("containerStatuses", "initContainerStatuses")
+            for path in _CONTAINER_STATUS_SAFE_FIELDS
+        ),
+        # specs of services, pods and the pod templates of workloads.
+        ("spec", "clusterIP"),
+        ("spec", "clusterIPs"),
+        ("spec", "ports", "protocol"),
+        *(
+            (*prefix, *path)
+            for prefix in (("spec",), ("spec", "template", "spec"), ("spec", "jobTemplate", "spec", "template", "spec"))
+            for path in _POD_SPEC_SAFE_FIELDS
+        ),
+    ]
+)
+
+# Strings without any of these cannot contain the personal information found by the default detectors
+# of scrubadub: credentials need a username keyword, emails and twitter handles an '@' or ' at ', and
+# phone, social security and credit card numbers at least 6 digits.
+MAY_CONTAIN_PERSONAL_INFORMATION = re.compile(r"@|(?i:\sat\s|username|login|u:)|(?:\d\D*){6}")
+
+LAST_APPLIED_CONFIGURATION_ANNOTATION = "kubectl.kubernetes.io/last-applied-configuration"
+
 REDACTED_VALUE = "[REDACTED]"
 SECRET_LIST_KIND_NAME = "SecretList"
 SECRET_KIND_NAME = "Secret"
 
+# Leading global inline flags like '(?i)', which Python only accepts at the start of a whole expression.
+GLOBAL_INLINE_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+# Backreferences, whose group numbers would refer to other patterns in an alternation.
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+# The number of distinct field and variable names, whose sensitivity is remembered by each compiled config.
+SENSITIVE_NAME_CACHE_SIZE = 8192
+COMPILED_CONFIGS_CACHE_SIZE = 8
+
+
+def _scope_inline_flags(pattern: str) -> str:
+    """Turn leading global inline flags into a scoped group, so that the pattern can be part of an alternation."""
+    match = GLOBAL_INLINE_FLAGS.match(pattern)
+    if match is None:
+        return f"(?:{pattern})"
+    return f"(?{match.group(1)}:{pattern[match.end() :]})"
+
+
+def _compile_name_matcher(names: list[str] | None) -> re.Pattern | None:
+    """Compile the names into a single alternation, which finds any of them in a lower-cased name at once."""
+    if not names:
+        return None
+    return re.compile("|".join(re.escape(name) for name in dict.fromkeys(name.lower() for name in names)))
+
+
+class CompiledSanitizationConfig:
+    """The sanitization config compiled into matchers, whose cost per field does not grow with the config.
+
+    The regex patterns are combined into a single alternation, which is only used as a pre-check: texts
+    without any match are returned as they are, while the others are redacted by the single patterns in
+    order, exactly like before. The sensitive names are compiled into one alternation of literals, and the
+    result is remembered per name, as the same field names occur in every Kubernetes object.
+    """
+
+    def __init__(self, config: DataSanitizationConfig):
+        self.credential_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in config.regex_patterns or []]
+        self.credentials_matcher = self._compile_credentials_matcher(config.regex_patterns or [])
+        self.excluded_field_names = frozenset(config.sensitive_field_to_exclude or [])
+        self._sensitive_field_matcher = _compile_name_matcher(config.sensitive_field_names)
+        self._sensitive_env_var_matcher = _compile_name_matcher(config.sensitive_env_vars)
+        self.is_sensitive_field = lru_cache(maxsize=SENSITIVE_NAME_CACHE_SIZE)(self._is_sensitive_field)
+        self.is_sensitive_env_var = lru_cache(maxsize=SENSITIVE_NAME_CACHE_SIZE)(self._is_sensitive_env_var)
+
+    @staticmethod
+    def _compile_credentials_matcher(patterns: list[str]) -> re.Pattern | None:
+        if not patterns or any(BACKREFERENCE.search(pattern) for pattern in patterns):
+            return None
+        try:
+            return re.compile("|".join(_scope_inline_flags(pattern) for pattern in patterns), re.IGNORECASE)
+        except re.error:
+            # patterns which cannot be combined, e.g. because of duplicate group names, are only applied one by one.
+            return None
+
+    def redact_credentials(self, text: str, replacement_text: str) -> str:
+        """Replace the matches of the regex patterns in the text."""
+        if not self.credential_patterns:
+            return text
+        # if no pattern matches the text, none of them can change it.
+        if self.credentials_matcher is not None and not self.credentials_matcher.search(text):
+            return text
+        for pattern in self.credential_patterns:
+            text = pattern.sub(replacement_text, text)
+        return text
+
+    def _is_sensitive_field(self, name: str) -> bool:
+        return (
+            self._sensitive_field_matcher is not None and self._sensitive_field_matcher.search(name.lower()) is not None
+        )
+
+    def _is_sensitive_env_var(self, name: str) -> bool:
+        return (
+            self._sensitive_env_var_matcher is not None
+            and self._sensitive_env_var_matcher.search(name.lower()) is not None
+        )
+
+
+@lru_cache(maxsize=COMPILED_CONFIGS_CACHE_SIZE)
+def _compile_sanitization_config_json(config_json: str) -> CompiledSanitizationConfig:
+    return CompiledSanitizationConfig(DataSanitizationConfig.model_validate_json(config_json))
+
+
+def compile_sanitization_config(config: DataSanitizationConfig) -> CompiledSanitizationConfig:
+    """Get the compiled form of the config, which is shared by all equal configs."""
+    return _compile_sanitization_config_json(config.model_dump_json())
+
 
 class IDataSanitizer(Protocol):
     """A protocol for a data sanitizer."""
 
-    def sanitize(self, data: str | dict | list[dict]) -> dict | list[dict] | Any:
+    def sanitize(self, data: str | dict | list[dict], cluster: str = "") -> dict | list[dict] | Any:
         """Sanitize the data by removing sensitive information."""
         ...
 
 
 class DataSanitizer(metaclass=SingletonMeta):
-    """Implementation of the data sanitizer that processes input dictionaries."""
+    """Implementation of the data sanitizer that processes input dictionaries.
+
+    The same Kubernetes objects are sanitized on every tool call, so the sanitized objects are memoized by
+    their cluster, uid and resourceVersion, which changes with every modification of an object. The items of
+    lists are memoized one by one. Memoized objects are shared between the callers, so they must not be modified.
+    """
 
     def __init__(self, config: DataSanitizationConfig | None = None):
         self.config = config or DataSanitizationConfig(
@@ -99,59 +286,187 @@ class DataSanitizer(metaclass=SingletonMeta):
             sensitive_field_to_exclude=DEFAULT_SENSITIVE_FIELD_TO_EXCLUDE,
             regex_patterns=DEFAULT_REGEX_PATTERNS,
         )
+        self.compiled_config = compile_sanitization_config(self.config)
+        self.config_hash = hashlib.sha256(self.config.model_dump_json().encode()).hexdigest()
         self.scrubber = scrubadub.Scrubber()
         self.scrubber.remove_detector(scrubadub.detectors.UrlDetector)
+        # the sanitized object and the CPU time of its sanitization, by object version.
+        self._sanitized_objects = TTLCache(maxsize=DATA_SANITIZER_CACHE_MAX_SIZE, ttl=DATA_SANITIZER_CACHE_TTL)
 
-    def sanitize(self, data: str | dict | list[dict]) -> dict | list[dict] | Any:
-        """Sanitize the data by removing sensitive information."""
+    def sanitize(self, data: str | dict | list[dict], cluster: str = "") -> dict | list[dict] | Any:
+        """Sanitize the data by removing sensitive information.
+
+        Args:
+            data: The data to sanitize.
+            cluster: The URL of the cluster of the Kubernetes objects in the data, which scopes their memoization.
+        """
         if isinstance(data, str):
             return self._sanitize_raw_string_data(data)
         elif isinstance(data, list):
             return [
-                (self._sanitize_raw_string_data(obj) if isinstance(obj, str) else self._sanitize_object(obj))
+                (self._sanitize_raw_string_data(obj) if isinstance(obj, str) else self._sanitize_object(obj, cluster))
                 for obj in data
             ]
         elif isinstance(data, dict):
-            return self._sanitize_object(data)
+            return self._sanitize_object(data, cluster)
         raise ValueError("Data must be a string or list or dictionary.")
 
+    async def asanitize(
+        self, data: str | dict | list[dict], cluster: str = "", size_bytes: int = 0
+    ) -> dict | list[dict] | Any:
+        """Sanitize the data without blocking the event loop for long.
+
+        If the process pool is enabled, lists whose JSON size is at least DATA_SANITIZER_PROCESS_POOL_MIN_BYTES are
+        sanitized in chunks by worker processes, and their memoized items are taken from the cache. The items
+        are sent to the workers in chunks of pickled bytes, and the results keep the order of the items. Other data is
+        sanitized in the calling thread.
+
+        Args:
+            data: The data to sanitize.
+            cluster: The URL of the cluster of the Kubernetes objects in the data, which scopes their memoization.
+            size_bytes: The JSON size of the data, e.g. the size of the response body it was parsed from.
+        """
+        if (
+            not DATA_SANITIZER_PROCESS_POOL_ENABLED
+            or not isinstance(data, list)
+            or not data
+            or size_bytes < DATA_SANITIZER_PROCESS_POOL_MIN_BYTES
+        ):
+            return self.sanitize(data, cluster)
+
+        results: list[Any] = [self._get_memoized_object(item, cluster) for item in data]
+        pending = [index for index, result in enumerate(results) if result is None]
+        process_pool = SanitizerProcessPool()
+        # pages hold fewer items than a chunk, so they are still spread over all workers.
+        chunk_size = max(
+            1, min(DATA_SANITIZER_PROCESS_POOL_CHUNK_SIZE, math.ceil(len(pending) / process_pool.max_workers))
+        )
+        chunks = [pending[start : start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        config_json = self.config.model_dump_json()
+        executor = process_pool.get_executor(config_json)
+        try:
+            outputs = await asyncio.gather(
+                *(_asanitize_chunk_in_process(executor, [data[index] for index in chunk]) for chunk in chunks)
+            )
+        except BrokenProcessPool as e:
+            logger.warning(f"Sanitizer process pool is broken, sanitizing {len(data)} items in process: {e}")
+            process_pool.discard_executor(config_json, executor)
+            return self.sanitize(data, cluster)
+
+        for chunk, output in zip(chunks, outputs, strict=True):
+            for index, (sanitized, cpu_seconds) in zip(chunk, output, strict=True):
+                results[index] = sanitized
+                self._memoize_object(data[index], sanitized, cpu_seconds, cluster)
+        return results
+
+    def clear_cache(self) -> None:
+        """Remove all memoized objects."""
+        self._sanitized_objects.clear()
+
     def _sanitize_raw_string_data(self, raw_text: str, replacement_text: str = "{{REDACTED}}") -> str:
         """
         Sanitize raw string data by replacing personal information and credentials.
         """
 
         # First pass: Use scrubadub for standard PII
-        sanitized_text = self.scrubber.clean(raw_text)
+        sanitized_text = self._scrub_string(raw_text)
 
         # Second pass: Apply custom credential patterns
-        for pattern in self.config.regex_patterns:
-            sanitized_text = re.sub(pattern, replacement_text, sanitized_text, flags=re.IGNORECASE)
-
-        return str(sanitized_text)
+        return self.compiled_config.redact_credentials(sanitized_text, replacement_text)
 
-    def _sanitize_object(self, obj: dict) -> dict:
-        """Sanitize a single object."""
+    def _sanitize_object(self, obj: dict, cluster: str = "") -> dict:
+        """Sanitize a single object, or the items of a list one by one."""
         if not isinstance(obj, dict):
             return obj
 
-        cleaned_obj = self._clean_personal_information(obj)
-
-        # Create a copy to avoid modifying the original
-        obj = cleaned_obj.copy()
-
         # Handle specific Kubernetes resource types
-        if "kind" in obj:
-            if obj["kind"] == SECRET_KIND_NAME or obj["kind"] == SECRET_LIST_KIND_NAME:
-                return self._sanitize_secret(obj)
-            elif obj["kind"] in (self.config.resources_to_sanitize or []):
-                if "items" in obj:
-                    obj["items"] = [self._sanitize_workload(item) for item in obj["items"]]
-                    return obj
-                else:
-                    return self._sanitize_workload(obj)
-
+        sanitize_scrubbed = self._get_scrubbed_object_sanitizer(obj.get("kind"))
+        items = obj.get("items")
+        # the resource version of a list changes with any of its objects, so only its items are memoized.
+        if isinstance(items, list) and (sanitize_scrubbed != self._sanitize_dict or self._is_plain_field_name("items")):
+            result = cast(dict, self._scrub_personal_information({**obj, "items": None}))
+            if sanitize_scrubbed == self._sanitize_dict:
+                self._sanitize_dict(result)
+            result["items"] = [self._sanitize_memoized(item, obj, sanitize_scrubbed, cluster) for item in items]
+            return result
+        return cast(dict, self._sanitize_memoized(obj, obj, sanitize_scrubbed, cluster))
+
+    def _get_scrubbed_object_sanitizer(self, kind: Any) -> Callable[[dict], dict]:
+        """Get the function which sanitizes a scrubbed object, or a scrubbed item of a list, of the kind."""
+        if kind in (SECRET_KIND_NAME, SECRET_LIST_KIND_NAME):
+            return self._sanitize_secret
+        if kind is not None and kind in (self.config.resources_to_sanitize or []):
+            return self._sanitize_workload
         # Recursively sanitize all dictionary fields
-        return self._sanitize_dict(obj)
+        return self._sanitize_dict
+
+    def _is_plain_field_name(self, name: str) -> bool:
+        return name not in self.compiled_config.excluded_field_names and not self.compiled_config.is_sensitive_field(
+            name
+        )
+
+    def _sanitize_memoized(self, obj: Any, owner: dict, sanitize_scrubbed: Callable[[dict], dict], cluster: str) -> Any:
+        """Sanitize the object, or the item of the owning list, reusing the result for the same object version."""
+        if not isinstance(obj, dict):
+            return self._scrub_personal_information(obj)
+
+        key = self._get_memo_key(obj, owner, cluster)
+        if key is None:
+            # the scrubbed copy is owned by this call, so the following steps modify it in place.
+            return sanitize_scrubbed(cast(dict, self._scrub_personal_information(obj)))
+
+        entry: tuple[dict, float] | None = self._sanitized_objects.get(key)
+        if entry is not None:
+            sanitized, cpu_seconds = entry
+            CustomMetrics().record_sanitizer_cache_hit(cpu_seconds)
+            return sanitized
+
+        start = time.thread_time()
+        sanitized = sanitize_scrubbed(cast(dict, self._scrub_personal_information(obj)))
+        self._sanitized_objects.set(key, (sanitized, time.thread_time() - start))
+        CustomMetrics().record_sanitizer_cache_miss()
+        return sanitized
+
+    def _get_memoized_object(self, obj: Any, cluster: str) -> dict | None:
+        """Get the memoized sanitization of a single object, which is not a list, if any."""
+        if not isinstance(obj, dict) or isinstance(obj.get("items"), list):
+            return None
+        key = self._get_memo_key(obj, obj, cluster)
+        entry: tuple[dict, float] | None = self._sanitized_objects.get(key) if key else None
+        if entry is None:
+            return None
+        sanitized, cpu_seconds = entry
+        CustomMetrics().record_sanitizer_cache_hit(cpu_seconds)
+        return sanitized
+
+    def _memoize_object(self, obj: Any, sanitized: dict, cpu_seconds: float, cluster: str) -> None:
+        """Memoize the sanitization of a single object, which is not a list."""
+        if not isinstance(obj, dict) or isinstance(obj.get("items"), list):
+            return
+        key = self._get_memo_key(obj, obj, cluster)
+        if key is not None:
+            self._sanitized_objects.set(key, (sanitized, cpu_seconds))
+            CustomMetrics().record_sanitizer_cache_miss()
+
+    def _get_memo_key(self, obj: dict, owner: dict, cluster: str) -> tuple | None:
+        """Get the key of the object version, or None if the object has no uid or resourceVersion.
+        The top-level field names are part of the key, so that objects extended by the callers are not mixed up."""
+        metadata = obj.get("metadata")
+        if not isinstance(metadata, dict):
+            return None
+        uid = metadata.get("uid")
+        resource_version = metadata.get("resourceVersion")
+        if not uid or not resource_version or not isinstance(uid, str) or not isinstance(resource_version, str):
+            return None
+        return (
+            cluster,
+            self.config_hash,
+            str(owner.get("apiVersion", "")),
+            str(owner.get("kind", "")),
+            uid,
+            resource_version,
+            tuple(obj),
+        )
 
     def _sanitize_secret(self, obj: dict) -> dict:
         """Sanitize a secret object."""
@@ -196,10 +511,7 @@ class DataSanitizer(metaclass=SingletonMeta):
         filtered_vars = []
         for env_var in env_vars:
             # Skip if the variable name contains any sensitive keywords
-            if any(
-                sensitive_key.lower() in env_var.get("name", "").lower()
-                for sensitive_key in self.config.sensitive_env_vars
-            ):
+            if self.compiled_config.is_sensitive_env_var(env_var.get("name", "")):
                 # Replace the value with a placeholder
                 env_var = env_var.copy()
                 if "value" in env_var:
@@ -209,44 +521,63 @@ class DataSanitizer(metaclass=SingletonMeta):
         return filtered_vars
 
     def _sanitize_dict(self, data: dict) -> dict:
-        """Recursively sanitize a dictionary by looking for sensitive data patterns."""
-        result = data.copy()
-
-        # First remove last-applied-configuration if exists
-        result = self._remove_last_applied_configuration(result)
-        # Then remove managedFields in metadata if exists
-        result = self._remove_managed_fields_in_metadata(result)
-
+        """Recursively sanitize a scrubbed dictionary in place by looking for sensitive data patterns.
+        The last-applied-configuration and managedFields were already dropped while scrubbing."""
         for key, value in data.items():
             # Check if the key should be excluded from sanitization
-            if self.config.sensitive_field_to_exclude and key in self.config.sensitive_field_to_exclude:
-                result[key] = value
+            if key in self.compiled_config.excluded_field_names:
+                continue
             # Check if the key indicates sensitive data
-            elif any(sensitive in key.lower() for sensitive in self.config.sensitive_field_names):
-                result[key] = REDACTED_VALUE
+            if self.compiled_config.is_sensitive_field(key):
+                data[key] = REDACTED_VALUE
             elif isinstance(value, dict):
-                result[key] = self._sanitize_dict(value)
+                self._sanitize_dict(value)
             elif isinstance(value, list):
-                result[key] = [(self._sanitize_dict(item) if isinstance(item, dict) else item) for item in value]
-            else:
-                result[key] = value
+                for item in value:
+                    if isinstance(item, dict):
+                        self._sanitize_dict(item)
 
-        return result
+        return data
 
-    def _clean_personal_information(self, data: dict) -> dict:
-        """Cleans personal information from a string."""
-        data_str = json.dumps(data)
+    def _scrub_personal_information(self, data: Any, path: tuple[str, ...] = ()) -> Any:
+        """Copy the data with the personal information in its keys and strings replaced.
 
-        sanitized_data_str = self.scrubber.clean(data_str)
+        The strings of the fields in PII_SAFE_FIELD_PATHS are copied as they are. The last-applied-configuration
+        annotation and the managedFields of the metadata are dropped instead of scrubbed, as they are removed
+        from the sanitized objects anyway.
+        """
+        if isinstance(data, str):
+            return data if path in PII_SAFE_FIELD_PATHS else self._scrub_string(data)
+        if isinstance(data, list):
+            return [self._scrub_personal_information(item, path) for item in data]
+        if not isinstance(data, dict):
+            return data
+
+        key = path[-1] if path else ""
+        result = {}
+        for child_key, value in data.items():
+            if key == "metadata" and child_key == "managedFields":
+                continue
+            if key == "metadata" and child_key == "annotations" and isinstance(value, dict):
+                value = {name: v for name, v in value.items() if name != LAST_APPLIED_CONFIGURATION_ANNOTATION}
+                # empty annotations are removed like in _remove_last_applied_configuration.
+                if not value:
+                    continue
+            result[self._scrub_string(child_key)] = self._scrub_personal_information(value, (*path, child_key))
+        return result
 
-        return dict(json.loads(sanitized_data_str))
+    def _scrub_string(self, text: str) -> str:
+        """Replace the personal information in the text, skipping texts which cannot contain any."""
+        if not MAY_CONTAIN_PERSONAL_INFORMATION.search(text):
+            return text
+        return str(self.scrubber.clean(text))
 
     @staticmethod
     def _remove_last_applied_configuration(data: dict) -> dict:
         """Remove kubectl.kubernetes.io/last-applied-configuration annotation if it exists."""
         if "metadata" in data and "annotations" in data["metadata"]:
-            if "kubectl.kubernetes.io/last-applied-configuration" in data["metadata"]["annotations"]:
-                del data["metadata"]["annotations"]["kubectl.kubernetes.io/last-applied-configuration"]
+            if LAST_APPLIED_CONFIGURATION_ANNOTATION in data["metadata"]["annotations"]:
+                del data["metadata"]["annotations"][LAST_APPLIED_CONFIGURATION_ANNOTATION]
             # Remove empty annotations dict if it's the last annotation
             if not data["metadata"]["annotations"]:
                 del data["metadata"]["annotations"]
@@ -258,3 +589,88 @@ class DataSanitizer(metaclass=SingletonMeta):
         if "metadata" in data and "managedFields" in data["metadata"]:
             del data["metadata"]["managedFields"]
         return data
+
+
+class SanitizerProcessPool(metaclass=SingletonMeta):
+    """Process-wide pool of worker processes, which sanitize large lists off the event loop.
+
+    The workers are spawned instead of forked, as the server process runs threads and an event loop.
+    Each sanitization config gets its own executor, whose workers create their data sanitizer once.
+    """
+
+    def __init__(self, max_workers: int = DATA_SANITIZER_PROCESS_POOL_SIZE):
+        """
+        Args:
+            max_workers: The number of worker processes of each executor.
+        """
+        self.max_workers = max_workers
+        self._executors: dict[str, ProcessPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def get_executor(self, config_json: str) -> ProcessPoolExecutor:
+        """Get the executor of the sanitization config, starting it if required."""
+        with self._lock:
+            executor = self._executors.get(config_json)
+            if executor is None:
+                executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_sanitizer_process,
+                    initargs=(config_json,),
+                )
+                self._executors[config_json] = executor
+            return executor
+
+    def discard_executor(self, config_json: str, executor: ProcessPoolExecutor) -> None:
+        """Discard a broken executor, so that the next call starts a new one."""
+        with self._lock:
+            if self._executors.get(config_json) is executor:
+                del self._executors[config_json]
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Stop all worker processes."""
+        with self._lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def _reset_for_tests(cls) -> None:
+        """Reset the singleton instance. Only use this for testing purpose."""
+        SingletonMeta.reset_instance(cls)
+
+
+async def asanitize(
+    data_sanitizer: IDataSanitizer, data: str | dict | list[dict], cluster: str = "", size_bytes: int = 0
+) -> Any:
+    """Sanitize the data with the sanitizer, offloading large lists to worker processes if it supports it."""
+    if isinstance(data_sanitizer, DataSanitizer):
+        return await data_sanitizer.asanitize(data, cluster, size_bytes)
+    return data_sanitizer.sanitize(data, cluster)
+
+
+async def _asanitize_chunk_in_process(executor: ProcessPoolExecutor, items: list) -> list[tuple[Any, float]]:
+    """Sanitize the items in a worker process. Each chunk is serialized and deserialized in its own step
+    of the event loop, so that other tasks run in between."""
+    loop = asyncio.get_running_loop()
+    output = await loop.run_in_executor(
+        executor, _sanitize_chunk_in_process, pickle.dumps(items, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+    return cast(list[tuple[Any, float]], pickle.loads(output))  # noqa: S301
+
+
+def _init_sanitizer_process(config_json: str) -> None:
+    """Create the data sanitizer singleton of a worker process with the sanitization config."""
+    DataSanitizer(DataSanitizationConfig.model_validate_json(config_json))
+
+
+def _sanitize_chunk_in_process(payload: bytes) -> bytes:
+    """Sanitize the serialized items in a worker process, and return them with the CPU time of each."""
+    data_sanitizer = DataSanitizer()
+    results = []
+    for item in pickle.loads(payload):  # noqa: S301
+        start = time.process_time()
+        sanitized = data_sanitizer.sanitize([item])[0]
+        results.append((sanitized, time.process_time() - start))
+    return pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
@@ -1,30 +1,57 @@
+import asyncio
 import base64
-import copy
+import hashlib
+import json
 import os
 import ssl
 import tempfile
+import threading
+from collections.abc import AsyncGenerator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
 from enum import Enum
+from functools import partial
 from http import HTTPStatus
-from typing import Any, Protocol, cast, runtime_checkable
-from urllib.parse import urlparse
+from typing import Any, Protocol, TypeVar, cast, runtime_checkable
+from urllib.parse import urlencode, urlparse
 
 import aiohttp
 from kubernetes import client, dynamic
 from pydantic import BaseModel
 
-from services.data_sanitizer import IDataSanitizer
+from services.data_sanitizer import IDataSanitizer, asanitize
+from services.k8s_discovery import APIDiscovery, K8sDiscoveryCache
+from services.k8s_informers import EVENTS, PODS, InformedResource, K8sInformer, K8sInformerRegistry
+from services.k8s_sessions import K8sSessionPool
 from utils import logging
+from utils.cache import TTLCache
 from utils.exceptions import K8sClientError, parse_k8s_error_response
 from utils.settings import (
     ALLOWED_K8S_DOMAINS,
     K8S_API_PAGINATION_LIMIT,
     K8S_API_PAGINATION_MAX_PAGE,
+    K8S_CLIENT_CACHE_MAX_SIZE,
+    K8S_CLIENT_CACHE_TTL,
+    K8S_CLIENT_THREAD_POOL_SIZE,
+    K8S_GET_CACHE_MAX_SIZE,
+    K8S_GET_CACHE_TTL,
+    K8S_INFORMERS_ENABLED,
 )
 
 logger = logging.get_logger(__name__)
 
 GROUP_VERSION_SEPARATOR = "/"
 GROUP_VERSION_PARTS_COUNT = 2
+# Seconds to wait for data of a watch, in addition to its timeout.
+WATCH_READ_TIMEOUT_MARGIN = 10
+# Requests the aggregated discovery documents, and falls back to the legacy documents on older API servers.
+AGGREGATED_DISCOVERY_ACCEPT = (
+    "application/json;g=apidiscovery.k8s.io;v=v2;as=APIGroupDiscoveryList,"
+    "application/json;g=apidiscovery.k8s.io;v=v2beta1;as=APIGroupDiscoveryList,"
+    "application/json"
+)
+
+T = TypeVar("T")
 
 
 class AuthType(str, Enum):
@@ -106,6 +133,10 @@ class K8sAuthHeaders(BaseModel):
             raise ValueError("Client key data is not available.")
         return base64.b64decode(self.x_client_key_data)
 
+    def get_cache_key(self) -> str:
+        """Get a hash of the cluster URL and credentials, which identifies the clients for these headers."""
+        return hashlib.sha256(self.model_dump_json(exclude={"allowed_domains"}).encode()).hexdigest()
+
 
 @runtime_checkable
 class IK8sClient(Protocol):
@@ -119,12 +150,23 @@ class IK8sClient(Protocol):
         """Dump the model without any confidential data."""
         ...
 
-    async def execute_get_api_request(self, uri: str) -> dict | list[dict]:
-        """Execute a GET request to the Kubernetes API."""
+    async def execute_get_api_request(self, uri: str, max_bytes: int | None = None) -> dict | list[dict]:
+        """Execute a GET request to the Kubernetes API. Lists exceeding max_bytes are truncated."""
         ...
 
-    def list_resources(self, api_version: str, kind: str, namespace: str) -> list:
-        """List resources of a specific kind in a namespace."""
+    def aiter_api_request_pages(self, uri: str) -> AsyncGenerator[dict | list[dict]]:
+        """Iterate the sanitized pages of a GET request to the Kubernetes API."""
+        ...
+
+    def list_resources(
+        self,
+        api_version: str,
+        kind: str,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list:
+        """List resources of a specific kind in a namespace, filtered by the API server with the selectors."""
         ...
 
     def get_resource(
@@ -159,8 +201,13 @@ class IK8sClient(Protocol):
         """List all node metrics."""
         ...
 
-    def list_k8s_events(self, namespace: str) -> list[dict]:
-        """List all Kubernetes events."""
+    def list_k8s_events(
+        self,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list[dict]:
+        """List all Kubernetes events, filtered by the API server with the selectors."""
         ...
 
     def list_k8s_warning_events(self, namespace: str) -> list[dict]:
@@ -171,6 +218,62 @@ class IK8sClient(Protocol):
         """List all Kubernetes events for a specific resource."""
         ...
 
+    async def alist_resources(
+        self,
+        api_version: str,
+        kind: str,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list:
+        """List resources of a specific kind in a namespace, without blocking the event loop."""
+        ...
+
+    async def aget_resource(
+        self,
+        api_version: str,
+        kind: str,
+        name: str,
+        namespace: str,
+    ) -> dict:
+        """Get a specific resource by name in a namespace, without blocking the event loop."""
+        ...
+
+    async def aget_resource_version(self, kind: str) -> str:
+        """Get the resource version for a given kind, without blocking the event loop."""
+        ...
+
+    async def adescribe_resource(
+        self,
+        api_version: str,
+        kind: str,
+        name: str,
+        namespace: str,
+    ) -> dict:
+        """Describe a specific resource by name in a namespace, without blocking the event loop."""
+        ...
+
+    async def alist_not_running_pods(self, namespace: str) -> list[dict]:
+        """List all pods that are not in the Running phase, without blocking the event loop."""
+        ...
+
+    async def alist_k8s_events(
+        self,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list[dict]:
+        """List all Kubernetes events, without blocking the event loop."""
+        ...
+
+    async def alist_k8s_warning_events(self, namespace: str) -> list[dict]:
+        """List all Kubernetes warning events, without blocking the event loop."""
+        ...
+
+    async def alist_k8s_events_for_resource(self, kind: str, name: str, namespace: str) -> list[dict]:
+        """List all Kubernetes events for a specific resource, without blocking the event loop."""
+        ...
+
     async def fetch_pod_logs(
         self,
         name: str,
@@ -201,6 +304,50 @@ class IK8sClient(Protocol):
         """Get the group version of the Kubernetes API."""
         ...
 
+    async def aget_api_discovery(self) -> APIDiscovery | None:
+        """Get the cached API discovery of the cluster, or None if it is not available."""
+        ...
+
+
+def escape_field_selector_value(value: str) -> str:
+    """Escape the characters with a special meaning in the value of a field selector."""
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=")
+
+
+async def acollect_pages_within_budget(
+    pages: AsyncGenerator[dict | list[dict]],
+    max_bytes: int,
+) -> dict | list[dict]:
+    """Collect the pages of a Kubernetes GET request until the size budget is reached.
+
+    Args:
+        pages: The pages of the response, as yielded by K8sClient.aiter_api_request_pages.
+        max_bytes: The maximum JSON size of the collected items. At least one item is collected.
+
+    Returns:
+        The object or the list of items of the response. If the list exceeds the budget,
+        a dictionary with the collected items and a note about the truncation.
+    """
+    items: list[dict] = []
+    size = 0
+    async with aclosing(pages):
+        async for page in pages:
+            if isinstance(page, dict):
+                return page
+            for item in page:
+                size += len(json.dumps(item, default=str))
+                if size > max_bytes and items:
+                    logger.info(f"Truncated Kubernetes response after {len(items)} items of {max_bytes} bytes budget")
+                    return {
+                        "items": items,
+                        "truncated": True,
+                        "note": f"Only the first {len(items)} items are returned, because the response is too large. "
+                        "Refine the query to get the remaining items, "
+                        "for example with a namespace, a labelSelector or a fieldSelector.",
+                    }
+                items.append(item)
+    return items
+
 
 def get_url_for_paged_request(base_url: str, continue_token: str) -> str:
     """Construct the URL for paginated requests."""
@@ -224,11 +371,21 @@ class K8sClient:
 
     @staticmethod
     def new(k8s_auth_headers: K8sAuthHeaders, data_sanitizer: IDataSanitizer | None = None) -> IK8sClient:
-        """Create a new instance of the K8sClient class."""
-        return K8sClient(
-            k8s_auth_headers=k8s_auth_headers,
-            data_sanitizer=data_sanitizer,
-        )
+        """Get a K8sClient for the auth headers.
+
+        Clients are cached by a hash of the auth headers and whether they sanitize the data, so that requests
+        with the same credentials reuse the SSL context, the dynamic client and the pooled connections.
+        The data sanitizer of a cached client is kept, as it only depends on the process-wide sanitization config.
+        """
+        cache_key = (k8s_auth_headers.get_cache_key(), data_sanitizer is not None)
+        k8s_client = _k8s_client_cache.get(cache_key)
+        if k8s_client is None:
+            k8s_client = K8sClient(
+                k8s_auth_headers=k8s_auth_headers,
+                data_sanitizer=data_sanitizer,
+            )
+            _k8s_client_cache.set(cache_key, k8s_client)
+        return k8s_client
 
     def __init__(
         self,
@@ -238,25 +395,7 @@ class K8sClient:
         """Initialize the K8sClient object."""
         self.k8s_auth_headers = k8s_auth_headers
 
-        with tempfile.NamedTemporaryFile(delete=False) as ca_file:
-            ca_file.write(self.k8s_auth_headers.get_decoded_certificate_authority_data())
-        self.ca_temp_filename = ca_file.name
-        self.client_ssl_context = ssl.create_default_context(cafile=self.ca_temp_filename)
-
-        if self.k8s_auth_headers.get_auth_type() == AuthType.CLIENT_CERTIFICATE:
-            # Write the client certificate data to a temporary file.
-            with tempfile.NamedTemporaryFile(delete=False) as client_cert_file:
-                client_cert_file.write(self.k8s_auth_headers.get_decoded_client_certificate_data())
-            self.client_cert_temp_filename = client_cert_file.name
-
-            # Write the client key data to a temporary file.
-            with tempfile.NamedTemporaryFile(delete=False) as client_key_file:
-                client_key_file.write(self.k8s_auth_headers.get_decoded_client_key_data())
-            self.client_key_temp_filename = client_key_file.name
-            self.client_ssl_context.load_cert_chain(
-                certfile=self.client_cert_temp_filename,
-                keyfile=self.client_key_temp_filename,
-            )
+        self.client_ssl_context = _get_ssl_context(self.k8s_auth_headers)
 
         # Delay dynamic_client creation until first use
         self._dynamic_client = None
@@ -291,16 +430,45 @@ class K8sClient:
     def dynamic_client(self) -> dynamic.DynamicClient:
         """Lazy initialization of dynamic client. Creates the client on first access."""
         if self._dynamic_client is None:
-            self._dynamic_client = self._create_dynamic_client()
+            # the client may be accessed concurrently by the threads of the thread pool.
+            with _dynamic_client_lock:
+                if self._dynamic_client is None:
+                    self._dynamic_client = self._create_dynamic_client()
         return self._dynamic_client
 
+    @staticmethod
+    async def _arun_in_thread_pool(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call of the dynamic client in the bounded thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_thread_pool_executor, partial(func, *args, **kwargs))
+
     def model_dump(self) -> None:
         """Dump the model. It should not return any critical information because it is called by checkpointer
         to store the object in database."""
         return None
 
+    def _write_certificate_temp_files(self) -> None:
+        """Write the certificates to temporary files, which are required by the Kubernetes python client."""
+        with tempfile.NamedTemporaryFile(delete=False) as ca_file:
+            ca_file.write(self.k8s_auth_headers.get_decoded_certificate_authority_data())
+        self.ca_temp_filename = ca_file.name
+
+        if self.k8s_auth_headers.get_auth_type() == AuthType.CLIENT_CERTIFICATE:
+            # Write the client certificate data to a temporary file.
+            with tempfile.NamedTemporaryFile(delete=False) as client_cert_file:
+                client_cert_file.write(self.k8s_auth_headers.get_decoded_client_certificate_data())
+            self.client_cert_temp_filename = client_cert_file.name
+
+            # Write the client key data to a temporary file.
+            with tempfile.NamedTemporaryFile(delete=False) as client_key_file:
+                client_key_file.write(self.k8s_auth_headers.get_decoded_client_key_data())
+            self.client_key_temp_filename = client_key_file.name
+
     def _create_dynamic_client(self) -> dynamic.DynamicClient:
         """Create a dynamic client for the K8s API."""
+        # The files are only written when the dynamic client is used.
+        self._write_certificate_temp_files()
+
         # Create configuration object for client.
         conf = client.Configuration()
         conf.host = self.get_api_server()
@@ -330,20 +498,61 @@ class K8sClient:
             headers["Authorization"] = "Bearer " + self.k8s_auth_headers.x_k8s_authorization
         return headers
 
-    async def _paginated_api_request(self, base_url: str) -> dict | list[dict]:
-        """Pagination support for the api request."""
-        async with aiohttp.ClientSession(headers=self._get_auth_headers()) as session:
-            # Initialize variables for pagination
-            page_count = 0
-            all_items: list[dict] = []
-            continue_token = ""
+    async def _aiter_raw_pages(self, base_url: str) -> AsyncGenerator[tuple[dict, int]]:
+        """Iterate the responses of a paginated GET request, with the size of their bodies in bytes.
+        The next page is only requested when iterated."""
+        session = await K8sSessionPool().aget_session(self.get_api_server())
+        headers = self._get_auth_headers()
+        continue_token = ""
+
+        # loop until all items are fetched or continue token is empty.
+        while True:
+            # fetch the next batch of items.
+            next_url = get_url_for_paged_request(base_url, continue_token)
+            async with session.get(url=next_url, headers=headers, ssl=self.client_ssl_context) as response:
+                # Check if the response status is not OK.
+                if response.status != HTTPStatus.OK:
+                    error_text = await response.text()
+                    error_message = parse_k8s_error_response(error_text)
+                    raise K8sClientError(
+                        message=f"Failed to execute GET request to the Kubernetes API. Error: {error_message}",
+                        status_code=response.status,
+                        uri=base_url,
+                    )
+                result = await response.json()
+                # the body is kept by the response after parsing it.
+                size_bytes = len(await response.read())
 
-            # loop until all items are fetched or continue token is empty.
-            while True:
+            yield result, size_bytes
+
+            # Check for continue token
+            continue_token = result.get("metadata", {}).get("continue", "") if "items" in result else ""
+            if not continue_token:
+                return
+
+    async def _paginated_api_request(self, base_url: str) -> tuple[dict | list[dict], int]:
+        """Pagination support for the api request.
+
+        Returns:
+            The result and the total size of the response bodies in bytes.
+        """
+        page_count = 0
+        all_items: list[dict] = []
+        result: dict = {}
+        total_size_bytes = 0
+
+        async with aclosing(self._aiter_raw_pages(base_url)) as pages:
+            async for result, size_bytes in pages:
                 page_count += 1
+                total_size_bytes += size_bytes
+                if "items" not in result:
+                    return (all_items if len(all_items) else result), total_size_bytes
+
+                if len(result["items"]) > 0:
+                    all_items.extend(result["items"])
 
-                # Check if we've exceeded the maximum number of pages
-                if page_count > K8S_API_PAGINATION_MAX_PAGE:
+                # Check if the next page would exceed the maximum number of pages
+                if result.get("metadata", {}).get("continue", "") and page_count >= K8S_API_PAGINATION_MAX_PAGE:
                     err_msg = (
                         "Kubernetes API rate limit exceeded. Please refine your query and "
                         "provide more specific resource details."
@@ -351,36 +560,156 @@ class K8sClient:
                     logger.debug(err_msg)
                     raise ValueError(err_msg)
 
-                # fetch the next batch of items.
-                next_url = get_url_for_paged_request(base_url, continue_token)
-                async with session.get(url=next_url, ssl=self.client_ssl_context) as response:
-                    # Check if the response status is not OK.
-                    if response.status != HTTPStatus.OK:
-                        error_text = await response.text()
-                        error_message = parse_k8s_error_response(error_text)
-                        raise K8sClientError(
-                            message=f"Failed to execute GET request to the Kubernetes API. Error: {error_message}",
-                            status_code=response.status,
-                            uri=base_url,
-                        )
-
-                    result = await response.json()
-                    if "items" not in result:
-                        return all_items if len(all_items) else result
-
-                    if len(result["items"]) > 0:
-                        all_items.extend(result["items"])
-
-                    # Check for continue token
-                    continue_token = result.get("metadata", {}).get("continue", "")
-                    if not continue_token:
-                        return all_items if len(all_items) else result
-
-    async def execute_get_api_request(self, uri: str) -> dict | list[dict]:
-        """Execute a GET request to the Kubernetes API"""
+        return (all_items if len(all_items) else result), total_size_bytes
+
+    async def alist_with_resource_version(self, uri: str) -> tuple[list[dict], str, int]:
+        """List all items of a collection, without the page limit.
+
+        Returns:
+            The raw items, the resource version of the list, from which a watch can be started, and the total size
+            of the response bodies in bytes.
+        """
+        base_url = f"{self.get_api_server()}/{uri.lstrip('/')}"
+        items: list[dict] = []
+        resource_version = ""
+        total_size_bytes = 0
+        async with aclosing(self._aiter_raw_pages(base_url)) as pages:
+            async for page, size_bytes in pages:
+                items.extend(page.get("items", []))
+                resource_version = page.get("metadata", {}).get("resourceVersion", "")
+                total_size_bytes += size_bytes
+        return items, resource_version, total_size_bytes
+
+    async def aiter_watch_events(self, uri: str, resource_version: str, timeout_seconds: int) -> AsyncGenerator[dict]:
+        """Watch a collection from the resource version and yield the raw watch events.
+
+        Bookmark events are requested, so that the resource version stays current on quiet collections.
+        The API server ends the watch after timeout_seconds.
+        """
+        session = await K8sSessionPool().aget_session(self.get_api_server())
+        query = urlencode(
+            {
+                "watch": "true",
+                "allowWatchBookmarks": "true",
+                "resourceVersion": resource_version,
+                "timeoutSeconds": timeout_seconds,
+            }
+        )
+        url = f"{self.get_api_server()}/{uri.lstrip('/')}?{query}"
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=timeout_seconds + WATCH_READ_TIMEOUT_MARGIN)
+        async with session.get(
+            url=url, headers=self._get_auth_headers(), ssl=self.client_ssl_context, timeout=timeout
+        ) as response:
+            if response.status != HTTPStatus.OK:
+                error_message = parse_k8s_error_response(await response.text())
+                raise K8sClientError(
+                    message=f"Failed to watch the Kubernetes API. Error: {error_message}",
+                    status_code=response.status,
+                    uri=uri,
+                )
+
+            # the events are separated by new lines, and may be split across chunks.
+            buffer = bytearray()
+            async for chunk in response.content.iter_any():
+                buffer.extend(chunk)
+                while (index := buffer.find(b"\n")) >= 0:
+                    line = bytes(buffer[:index])
+                    del buffer[: index + 1]
+                    if line.strip():
+                        yield json.loads(line)
+
+    async def aget_aggregated_discovery(self, path: str, etag: str = "") -> tuple[str, dict | None]:
+        """Get an aggregated discovery document of the API server.
+
+        Args:
+            path: The discovery path, 'api' for the core group or 'apis' for the other groups.
+            etag: The ETag of a cached document, so that the document is only returned if it changed.
+
+        Returns:
+            The ETag and the document, or the given ETag and None if the document did not change.
+            API servers without aggregated discovery return the legacy document.
+        """
+        session = await K8sSessionPool().aget_session(self.get_api_server())
+        headers = {**self._get_auth_headers(), "Accept": AGGREGATED_DISCOVERY_ACCEPT}
+        if etag:
+            headers["If-None-Match"] = etag
+        url = f"{self.get_api_server()}/{path}"
+        async with session.get(url=url, headers=headers, ssl=self.client_ssl_context) as response:
+            if response.status == HTTPStatus.NOT_MODIFIED:
+                return etag, None
+            if response.status != HTTPStatus.OK:
+                error_message = parse_k8s_error_response(await response.text())
+                raise K8sClientError(
+                    message=f"Failed to get the API discovery of the Kubernetes API. Error: {error_message}",
+                    status_code=response.status,
+                    uri=path,
+                )
+            return response.headers.get("ETag", ""), await response.json()
+
+    async def aget_api_discovery(self) -> APIDiscovery | None:
+        """Get the cached API discovery of the cluster, or None if it is not available."""
+        try:
+            return await K8sDiscoveryCache().aget(self)
+        except Exception as e:
+            logger.warning(f"Failed to get the API discovery of {self.get_api_server()}: {e}")
+            return None
+
+    def _get_synced_informer(self, resource: InformedResource) -> K8sInformer | None:
+        """Get the informer of the collection, if informers are enabled and it has listed the collection.
+        The informer is started on first use, so the first calls fall back to the API server."""
+        if not K8S_INFORMERS_ENABLED:
+            return None
+        informer = K8sInformerRegistry().get_informer(self, resource)
+        return informer if informer.synced else None
+
+    async def aiter_api_request_pages(self, uri: str) -> AsyncGenerator[dict | list[dict]]:
+        """Iterate the pages of a GET request to the Kubernetes API.
+
+        Yields the sanitized items of each page of a list, or the sanitized object of any other response.
+        Only the current page is held in memory and no further pages are requested once the caller stops
+        iterating, so callers can cut off huge lists when their budget is reached.
+        """
+        base_url = f"{self.get_api_server()}/{uri.lstrip('/')}"
+        logger.debug(f"Iterating pages of GET request to {base_url}")
+        async with aclosing(self._aiter_raw_pages(base_url)) as pages:
+            async for result, size_bytes in pages:
+                page: dict | list[dict] = result.get("items", result)
+                if self.data_sanitizer:
+                    page = await asanitize(self.data_sanitizer, page, self.get_api_server(), size_bytes)
+                yield page
+
+    async def execute_get_api_request(self, uri: str, max_bytes: int | None = None) -> dict | list[dict]:
+        """Execute a GET request to the Kubernetes API.
+
+        Without a budget, lists are fetched up to K8S_API_PAGINATION_MAX_PAGE pages. With a budget, lists are
+        streamed until the JSON size of their items exceeds max_bytes, and the collected items are returned
+        with a truncation note, see acollect_pages_within_budget.
+
+        The sanitized results are cached per identity for a short time, and concurrent identical requests
+        share a single API call. Cached results are shared between the callers, so they must not be modified.
+        """
+        cache_key = (self.k8s_auth_headers.get_cache_key(), self.data_sanitizer is not None, uri, max_bytes)
+        cached_result = _get_response_cache.get(cache_key)
+        if cached_result is not None:
+            return cast(dict | list[dict], cached_result)
+
+        loop = asyncio.get_running_loop()
+        task = _in_flight_get_requests.get(cache_key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._aexecute_get_api_request(uri, max_bytes))
+            _in_flight_get_requests[cache_key] = task
+            task.add_done_callback(partial(_on_get_request_done, cache_key))
+        # shield the shared request from the cancellation of a single caller.
+        return await asyncio.shield(task)
+
+    async def _aexecute_get_api_request(self, uri: str, max_bytes: int | None) -> dict | list[dict]:
+        """Execute the GET request, bypassing the cache."""
+        if max_bytes is not None:
+            return await acollect_pages_within_budget(self.aiter_api_request_pages(uri), max_bytes)
+
         base_url = f"{self.get_api_server()}/{uri.lstrip('/')}"
         logger.debug(f"Executing GET request to {base_url}")
-        result = await self._paginated_api_request(base_url)
+        result, size_bytes = await self._paginated_api_request(base_url)
         logger.debug(f"Completed Executing GET request to {base_url}")
 
         # Validate result type
@@ -392,18 +721,30 @@ class K8sClient:
             )
 
         if self.data_sanitizer:
-            result = self.data_sanitizer.sanitize(result)
+            result = await asanitize(self.data_sanitizer, result, self.get_api_server(), size_bytes)
         return result
 
-    def list_resources(self, api_version: str, kind: str, namespace: str) -> list[dict]:
+    def list_resources(
+        self,
+        api_version: str,
+        kind: str,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list[dict]:
         """List resources of a specific kind in a namespace.
-        Provide empty string for namespace to list resources in all namespaces."""
-        result = self.dynamic_client.resources.get(api_version=api_version, kind=kind).get(namespace=namespace)
+        Provide empty string for namespace to list resources in all namespaces.
+        The selectors are applied by the API server, so that only the matching resources are transferred."""
+        result = self.dynamic_client.resources.get(api_version=api_version, kind=kind).get(
+            namespace=namespace,
+            field_selector=field_selector,
+            label_selector=label_selector,
+        )
 
         # convert objects to dictionaries.
         items = [item.to_dict() for item in result.items]
         if self.data_sanitizer:
-            return self.data_sanitizer.sanitize(items)  # type: ignore
+            return self.data_sanitizer.sanitize(items, self.get_api_server())  # type: ignore
         return items
 
     def get_resource(
@@ -420,7 +761,7 @@ class K8sClient:
             .to_dict()
         )
         if self.data_sanitizer:
-            return cast(dict, self.data_sanitizer.sanitize(resource))
+            return cast(dict, self.data_sanitizer.sanitize(resource, self.get_api_server()))
         return resource  # type: ignore
 
     def get_resource_version(self, kind: str) -> str:
@@ -464,62 +805,154 @@ class K8sClient:
         """Describe a specific resource by name in a namespace. This includes the resource and its events."""
         resource = self.get_resource(api_version, kind, name, namespace)
 
-        # clone the object because we cannot modify the original object.
-        result = copy.deepcopy(resource)
-
-        # get events for the resource.
-        result["events"] = self.list_k8s_events_for_resource(kind, name, namespace)
-        for event in result["events"]:
-            del event["involvedObject"]
-
-        if self.data_sanitizer:
-            return self.data_sanitizer.sanitize(result)  # type: ignore
-        return result
+        # get events for the resource. The resource and the events are already sanitized, and they may be shared
+        # with other callers, so they are copied instead of modified.
+        events = self.list_k8s_events_for_resource(kind, name, namespace)
+        return {
+            **resource,
+            "events": [{key: value for key, value in event.items() if key != "involvedObject"} for event in events],
+        }
 
     def list_not_running_pods(self, namespace: str) -> list[dict]:
         """List all pods that are not in the Running phase.
         Provide empty string for namespace to list all pods."""
-        all_pods = self.list_resources(
+        return self.list_resources(
             api_version="v1",
             kind="Pod",
             namespace=namespace,
+            field_selector="status.phase!=Running",
         )
-        # filter pods by status and convert object to dictionary.
-        items = []
-        for pod in all_pods:
-            if "status" not in pod or "phase" not in pod["status"] or pod["status"]["phase"] != "Running":
-                items.append(pod)
-        return items
 
     async def list_nodes_metrics(self) -> list[dict]:
         """List all K8s Nodes metrics."""
         result = await self.execute_get_api_request("apis/metrics.k8s.io/v1beta1/nodes")
         return list[dict](result)
 
-    def list_k8s_events(self, namespace: str) -> list[dict]:
-        """List all Kubernetes events. Provide empty string for namespace to list all events."""
+    def list_k8s_events(
+        self,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list[dict]:
+        """List all Kubernetes events. Provide empty string for namespace to list all events.
+        The selectors are applied by the API server, so that only the matching events are transferred."""
 
-        result = self.dynamic_client.resources.get(api_version="v1", kind="Event").get(namespace=namespace)
+        result = self.dynamic_client.resources.get(api_version="v1", kind="Event").get(
+            namespace=namespace,
+            field_selector=field_selector,
+            label_selector=label_selector,
+        )
 
         # convert objects to dictionaries and return.
         events = [event.to_dict() for event in result.items]
         if self.data_sanitizer:
-            return list[dict](self.data_sanitizer.sanitize(events))
+            return list[dict](self.data_sanitizer.sanitize(events, self.get_api_server()))
         return events
 
     def list_k8s_warning_events(self, namespace: str) -> list[dict]:
         """List all Kubernetes warning events. Provide empty string for namespace to list all warning events."""
-        return [event for event in self.list_k8s_events(namespace) if event["type"] == "Warning"]
+        return self.list_k8s_events(namespace, field_selector="type=Warning")
 
     def list_k8s_events_for_resource(self, kind: str, name: str, namespace: str) -> list[dict]:
         """List all Kubernetes events for a specific resource. Provide empty string for namespace to list all events."""
-        events = self.list_k8s_events(namespace)
-        result = []
-        for event in events:
-            if event["involvedObject"]["kind"] == kind and event["involvedObject"]["name"] == name:
-                result.append(event)
+        return self.list_k8s_events(
+            namespace,
+            field_selector=(
+                f"involvedObject.kind={escape_field_selector_value(kind)},"
+                f"involvedObject.name={escape_field_selector_value(name)}"
+            ),
+        )
 
-        return result
+    async def alist_resources(
+        self,
+        api_version: str,
+        kind: str,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list[dict]:
+        """List resources of a specific kind in a namespace, without blocking the event loop.
+        Provide empty string for namespace to list resources in all namespaces."""
+        return await self._arun_in_thread_pool(
+            self.list_resources, api_version, kind, namespace, field_selector, label_selector
+        )
+
+    async def aget_resource(
+        self,
+        api_version: str,
+        kind: str,
+        name: str,
+        namespace: str,
+    ) -> dict:
+        """Get a specific resource by name in a namespace, without blocking the event loop."""
+        return await self._arun_in_thread_pool(self.get_resource, api_version, kind, name, namespace)
+
+    async def aget_resource_version(self, kind: str) -> str:
+        """Get the resource version for a given kind, without blocking the event loop.
+        The kind is looked up in the cached API discovery, if available."""
+        discovery = await self.aget_api_discovery()
+        if discovery is None:
+            return await self._arun_in_thread_pool(self.get_resource_version, kind)
+
+        group_version = discovery.get_group_version(kind)
+        if group_version is None:
+            logger.error(f"Failed to get resource version for kind '{kind}': not found in the API discovery")
+            raise ValueError(f"Failed to get resource version for kind '{kind}'")
+        return group_version
+
+    async def adescribe_resource(
+        self,
+        api_version: str,
+        kind: str,
+        name: str,
+        namespace: str,
+    ) -> dict:
+        """Describe a specific resource by name in a namespace, without blocking the event loop.
+        This includes the resource and its events."""
+        resource = await self.aget_resource(api_version, kind, name, namespace)
+
+        # get events for the resource. The resource and the events are already sanitized, and they may be shared
+        # with other callers, so they are copied instead of modified.
+        events = await self.alist_k8s_events_for_resource(kind, name, namespace)
+        return {
+            **resource,
+            "events": [{key: value for key, value in event.items() if key != "involvedObject"} for event in events],
+        }
+
+    async def alist_not_running_pods(self, namespace: str) -> list[dict]:
+        """List all pods that are not in the Running phase, without blocking the event loop.
+        Provide empty string for namespace to list all pods."""
+        informer = self._get_synced_informer(PODS)
+        if informer:
+            phases = [phase for phase in informer.get_index_values("phase") if phase != "Running"]
+            return informer.get_by_index("phase", phases, namespace)
+        return await self._arun_in_thread_pool(self.list_not_running_pods, namespace)
+
+    async def alist_k8s_events(
+        self,
+        namespace: str,
+        field_selector: str | None = None,
+        label_selector: str | None = None,
+    ) -> list[dict]:
+        """List all Kubernetes events, without blocking the event loop.
+        Provide empty string for namespace to list all events."""
+        return await self._arun_in_thread_pool(self.list_k8s_events, namespace, field_selector, label_selector)
+
+    async def alist_k8s_warning_events(self, namespace: str) -> list[dict]:
+        """List all Kubernetes warning events, without blocking the event loop.
+        Provide empty string for namespace to list all warning events."""
+        informer = self._get_synced_informer(EVENTS)
+        if informer:
+            return informer.get_by_index("type", ["Warning"], namespace)
+        return await self._arun_in_thread_pool(self.list_k8s_warning_events, namespace)
+
+    async def alist_k8s_events_for_resource(self, kind: str, name: str, namespace: str) -> list[dict]:
+        """List all Kubernetes events for a specific resource, without blocking the event loop.
+        Provide empty string for namespace to list all events."""
+        informer = self._get_synced_informer(EVENTS)
+        if informer:
+            return informer.get_by_index("involved_object", [f"{kind}/{name}"], namespace)
+        return await self._arun_in_thread_pool(self.list_k8s_events_for_resource, kind, name, namespace)
 
     async def fetch_pod_logs(
         self,
@@ -535,14 +968,12 @@ class K8sClient:
         if is_terminated:
             uri += "&previous=true"
 
-        async with (
-            aiohttp.ClientSession() as session,
-            session.get(
-                f"{self.get_api_server()}/{uri.lstrip('/')}",
-                headers=self._get_auth_headers(),
-                ssl=self.client_ssl_context,
-            ) as response,
-        ):
+        session = await K8sSessionPool().aget_session(self.get_api_server())
+        async with session.get(
+            f"{self.get_api_server()}/{uri.lstrip('/')}",
+            headers=self._get_auth_headers(),
+            ssl=self.client_ssl_context,
+        ) as response:
             # Check if the response status is not OK.
             if response.status != HTTPStatus.OK:
                 error_text = await response.text()
@@ -590,6 +1021,12 @@ class K8sClient:
         if group_version == "" or parts_count > GROUP_VERSION_PARTS_COUNT:
             raise ValueError(f"Invalid groupVersion: {group_version}. Expected format: v1 or <group>/<version>.")
 
+        # serve the group version from the cached API discovery, if available.
+        discovery = await self.aget_api_discovery()
+        resources = discovery.get_resources(group_version) if discovery else None
+        if resources is not None:
+            return {"kind": "APIResourceList", "groupVersion": group_version, "resources": resources}
+
         # for Core API group, the endpoint is "api/v1", for others "apis/<group>/<version>".
         uri = f"api/{group_version}"
         if parts_count == GROUP_VERSION_PARTS_COUNT:
@@ -603,3 +1040,64 @@ class K8sClient:
                 f"Expected a dictionary, but got {type(result)}."
             )
         return result
+
+
+# Initialized K8sClients by the hash of their auth headers.
+_k8s_client_cache = TTLCache(maxsize=K8S_CLIENT_CACHE_MAX_SIZE, ttl=K8S_CLIENT_CACHE_TTL)
+
+# SSL contexts by cluster URL and a hash of the certificates. Pooled connections are only reused by requests
+# with the same SSL context, so the clients of a cluster with the same certificates share it.
+_ssl_context_cache = TTLCache(maxsize=K8S_CLIENT_CACHE_MAX_SIZE, ttl=K8S_CLIENT_CACHE_TTL)
+
+
+def _get_ssl_context(k8s_auth_headers: K8sAuthHeaders) -> ssl.SSLContext:
+    """Get the SSL context with the CA certificate and, for client certificate auth, the client certificate."""
+    certificates = [k8s_auth_headers.get_decoded_certificate_authority_data()]
+    if k8s_auth_headers.get_auth_type() == AuthType.CLIENT_CERTIFICATE:
+        certificates += [
+            k8s_auth_headers.get_decoded_client_certificate_data(),
+            k8s_auth_headers.get_decoded_client_key_data(),
+        ]
+    cache_key = (k8s_auth_headers.x_cluster_url, hashlib.sha256(b"\0".join(certificates)).hexdigest())
+    ssl_context = _ssl_context_cache.get(cache_key)
+    if ssl_context is None:
+        # The CA certificate is loaded from memory.
+        ssl_context = ssl.create_default_context(cadata=certificates[0].decode())
+        if len(certificates) > 1:
+            _load_client_cert_chain(ssl_context, certificates[1], certificates[2])
+        _ssl_context_cache.set(cache_key, ssl_context)
+    return ssl_context
+
+
+def _load_client_cert_chain(ssl_context: ssl.SSLContext, cert_data: bytes, key_data: bytes) -> None:
+    """Load the client certificate and key into the SSL context."""
+    # The ssl module can only load certificate chains from files, so they only exist during loading.
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cert_file = os.path.join(temp_dir, "client.crt")
+        key_file = os.path.join(temp_dir, "client.key")
+        with open(cert_file, "wb") as f:
+            f.write(cert_data)
+        with open(key_file, "wb") as f:
+            f.write(key_data)
+        ssl_context.load_cert_chain(certfile=cert_file, keyfile=key_file)
+
+
+# Sanitized results of GET requests by identity and request, and the requests in flight.
+_get_response_cache = TTLCache(maxsize=K8S_GET_CACHE_MAX_SIZE, ttl=K8S_GET_CACHE_TTL)
+_in_flight_get_requests: dict[tuple, asyncio.Task] = {}
+
+
+def _on_get_request_done(cache_key: tuple, task: asyncio.Task) -> None:
+    """Cache the result of a finished GET request and remove it from the requests in flight."""
+    if _in_flight_get_requests.get(cache_key) is task:
+        del _in_flight_get_requests[cache_key]
+    if task.cancelled():
+        return
+    # retrieving the exception marks it as handled, the callers have received it already.
+    if task.exception() is None:
+        _get_response_cache.set(cache_key, task.result())
+
+
+# Bounded thread pool for the blocking calls of the dynamic client, so that they do not block the event loop.
+_thread_pool_executor = ThreadPoolExecutor(max_workers=K8S_CLIENT_THREAD_POOL_SIZE, thread_name_prefix="k8s-client")
+_dynamic_client_lock = threading.Lock()
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from services.redis import Redis
+from utils import logging
+from utils.cache import TTLCache
+from utils.settings import (
+    K8S_DISCOVERY_CACHE_MAX_SIZE,
+    K8S_DISCOVERY_CACHE_REDIS_ENABLED,
+    K8S_DISCOVERY_CACHE_RETENTION,
+    K8S_DISCOVERY_CACHE_TTL,
+)
+from utils.singleton_meta import SingletonMeta
+
+if TYPE_CHECKING:
+    from services.k8s import K8sClient
+
+logger = logging.get_logger(__name__)
+
+# The aggregated discovery documents of the core group and of the other groups.
+DISCOVERY_PATHS = ("api", "apis")
+AGGREGATED_DISCOVERY_KIND = "APIGroupDiscoveryList"
+REDIS_KEY_PREFIX = "k8s_api_discovery:"
+
+# The resources of each group version of a discovery document, in the format of an APIResourceList.
+ResourcesByGroupVersion = dict[str, list[dict]]
+
+T = TypeVar("T")
+
+
+def parse_aggregated_discovery(document: dict) -> ResourcesByGroupVersion:
+    """Convert an aggregated discovery document to the resources of each group version.
+    Subresources are skipped, as they are not listed as kinds."""
+    resources_by_group_version: ResourcesByGroupVersion = {}
+    for group in document.get("items", []):
+        # the core group has no name, and its group version is only the version.
+        group_name = group.get("metadata", {}).get("name", "")
+        for version in group.get("versions", []):
+            group_version = f"{group_name}/{version['version']}" if group_name else version["version"]
+            resources_by_group_version[group_version] = [
+                {
+                    "name": resource.get("resource", ""),
+                    "singularName": resource.get("singularResource", ""),
+                    "namespaced": resource.get("scope") == "Namespaced",
+                    "kind": resource.get("responseKind", {}).get("kind", ""),
+                    "verbs": resource.get("verbs", []),
+                    "shortNames": resource.get("shortNames", []),
+                    "categories": resource.get("categories", []),
+                }
+                for resource in version.get("resources", [])
+            ]
+    return resources_by_group_version
+
+
+class APIDiscovery:
+    """The API resources of a cluster, indexed by group version and by kind."""
+
+    def __init__(self, documents: dict[str, tuple[str, ResourcesByGroupVersion]]):
+        """
+        Args:
+            documents: The ETag and the resources of each discovery path.
+        """
+        self.documents = documents
+        self._resources_by_group_version: ResourcesByGroupVersion = {}
+        self._group_versions_by_kind: dict[str, str] = {}
+        # the validated resources of each group version by lower case kind, which are built on first use.
+        self._resources_by_kind: dict[str, dict[str, Any]] = {}
+        for path in DISCOVERY_PATHS:
+            _, resources_by_group_version = documents.get(path, ("", {}))
+            for group_version, resources in resources_by_group_version.items():
+                self._resources_by_group_version[group_version] = resources
+                for resource in resources:
+                    # the versions of a group are ordered by preference, so the first match is the preferred one.
+                    self._group_versions_by_kind.setdefault(resource["kind"], group_version)
+
+    def get_group_version(self, kind: str) -> str | None:
+        """Get the preferred group version of the kind, or None if the kind is not served."""
+        return self._group_versions_by_kind.get(kind)
+
+    def get_resources(self, group_version: str) -> list[dict] | None:
+        """Get the resources of the group version, or None if the group version is not served."""
+        return self._resources_by_group_version.get(group_version)
+
+    def get_resources_by_kind(
+        self, group_version: str, build_index: Callable[[list[dict]], dict[str, T]]
+    ) -> dict[str, T] | None:
+        """Get the resources of the group version by lower case kind, or None if the group version is not served.
+
+        The index is built from the raw resources with build_index on first use and kept with the discovery,
+        so that the resources are only validated once per discovery of the cluster.
+        """
+        index = self._resources_by_kind.get(group_version)
+        if index is None:
+            resources = self._resources_by_group_version.get(group_version)
+            if resources is None:
+                return None
+            index = self._resources_by_kind[group_version] = build_index(resources)
+        return index
+
+    def to_json(self) -> str:
+        """Serialize the discovery documents."""
+        return json.dumps(self.documents)
+
+    @classmethod
+    def from_json(cls, value: str | bytes) -> "APIDiscovery":
+        """Deserialize the discovery documents."""
+        documents = json.loads(value)
+        return cls({path: (etag, resources) for path, (etag, resources) in documents.items()})
+
+
+class K8sDiscoveryCache(metaclass=SingletonMeta):
+    """Process-wide cache of the aggregated API discovery of the clusters, with an optional Redis tier.
+
+    Discovery is readable by every authenticated user, so the cache is shared by all users of a cluster.
+    After the TTL, the discovery is revalidated with the ETags of its documents, which the API server
+    answers with 304 Not Modified while the APIs did not change. The Redis tier shares the documents
+    between replicas and restarts, so that a new process only needs to revalidate them.
+    API servers without aggregated discovery are remembered as such for the TTL.
+    """
+
+    def __init__(
+        self,
+        ttl: float = K8S_DISCOVERY_CACHE_TTL,
+        retention: float = K8S_DISCOVERY_CACHE_RETENTION,
+        redis_enabled: bool = K8S_DISCOVERY_CACHE_REDIS_ENABLED,
+    ):
+        """
+        Args:
+            ttl: Seconds after which the discovery of a cluster is revalidated.
+            retention: Seconds for which the discovery is kept for revalidation, in memory and in Redis.
+            redis_enabled: Whether to share the discovery documents in Redis.
+        """
+        self.ttl = ttl
+        self.retention = retention
+        self.redis_enabled = redis_enabled
+        # the validation time and the discovery of each cluster, which is None if it is not supported.
+        self._entries = TTLCache(maxsize=K8S_DISCOVERY_CACHE_MAX_SIZE, ttl=retention)
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    async def aget(self, k8s_client: "K8sClient") -> APIDiscovery | None:
+        """Get the API discovery of the cluster of the client, or None if the API server does not support
+        aggregated discovery. Concurrent revalidations of a cluster share the requests.
+
+        Raises:
+            K8sClientError: If a discovery request fails.
+        """
+        cluster_url = k8s_client.get_api_server()
+        entry: tuple[float, APIDiscovery | None] | None = self._entries.get(cluster_url)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+
+        loop = asyncio.get_running_loop()
+        task = self._in_flight.get(cluster_url)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._arevalidate(k8s_client, entry[1] if entry else None))
+            self._in_flight[cluster_url] = task
+            task.add_done_callback(lambda done: self._on_revalidated(cluster_url, done))
+        # shield the shared revalidation from the cancellation of a single caller.
+        return await asyncio.shield(task)
+
+    def clear(self) -> None:
+        """Remove the discovery of all clusters from memory."""
+        self._entries.clear()
+
+    def _on_revalidated(self, cluster_url: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(cluster_url) is task:
+            del self._in_flight[cluster_url]
+
+    async def _arevalidate(self, k8s_client: "K8sClient", discovery: APIDiscovery | None) -> APIDiscovery | None:
+        cluster_url = k8s_client.get_api_server()
+        if discovery is None and self.redis_enabled:
+            discovery = await self._aload_from_redis(cluster_url)
+
+        documents = dict(discovery.documents) if discovery else {}
+        responses = await asyncio.gather(
+            *(k8s_client.aget_aggregated_discovery(path, documents.get(path, ("", {}))[0]) for path in DISCOVERY_PATHS)
+        )
+        changed = discovery is None
+        for path, (etag, document) in zip(DISCOVERY_PATHS, responses, strict=True):
+            # the document is None, if it was not modified since the cached one.
+            if document is None:
+                continue
+            if document.get("kind") != AGGREGATED_DISCOVERY_KIND:
+                logger.info(f"Kubernetes API server {cluster_url} does not support aggregated discovery.")
+                self._entries.set(cluster_url, (time.monotonic(), None))
+                return None
+            documents[path] = (etag, parse_aggregated_discovery(document))
+            changed = True
+
+        if changed:
+            discovery = APIDiscovery(documents)
+            if self.redis_enabled:
+                await self._asave_to_redis(cluster_url, discovery)
+        self._entries.set(cluster_url, (time.monotonic(), discovery))
+        return discovery
+
+    async def _aload_from_redis(self, cluster_url: str) -> APIDiscovery | None:
+        try:
+            value = await Redis().get_connection().get(_get_redis_key(cluster_url))
+            return APIDiscovery.from_json(value) if value else None
+        except Exception as e:
+            logger.warning(f"Failed to load the API discovery of {cluster_url} from Redis: {e}")
+            return None
+
+    async def _asave_to_redis(self, cluster_url: str, discovery: APIDiscovery) -> None:
+        try:
+            await Redis().get_connection().set(_get_redis_key(cluster_url), discovery.to_json(), ex=int(self.retention))
+        except Exception as e:
+            logger.warning(f"Failed to save the API discovery of {cluster_url} to Redis: {e}")
+
+    @classmethod
+    def _reset_for_tests(cls) -> None:
+        """Reset the singleton instance. Only use this for testing purpose."""
+        SingletonMeta.reset_instance(cls)
+
+
+def _get_redis_key(cluster_url: str) -> str:
+    return REDIS_KEY_PREFIX + hashlib.sha256(cluster_url.encode()).hexdigest()
@@ -0,0 +1,294 @@
+import asyncio
+import time
+from collections.abc import Callable, Iterable
+from contextlib import aclosing, suppress
+from http import HTTPStatus
+from typing import TYPE_CHECKING, cast
+
+import aiohttp
+
+from services.data_sanitizer import asanitize
+from utils import logging
+from utils.exceptions import K8sClientError
+from utils.settings import K8S_INFORMER_IDLE_TIMEOUT, K8S_INFORMERS_MAX_COUNT
+from utils.singleton_meta import SingletonMeta
+
+if TYPE_CHECKING:
+    from services.k8s import K8sClient
+
+logger = logging.get_logger(__name__)
+
+# The API server ends each watch after this timeout, so that idle informers notice that they can stop.
+WATCH_TIMEOUT_SECONDS = 60
+RETRY_INTERVAL_SECONDS = 5
+# Errors after which the informer stops, because retrying would not help.
+PERMANENT_ERROR_STATUS_CODES = {HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN, HTTPStatus.NOT_FOUND}
+
+
+class InformedResource:
+    """A collection of the Kubernetes API watched by informers, with the index functions of its objects."""
+
+    def __init__(self, uri: str, indexers: dict[str, Callable[[dict], str]]):
+        """
+        Args:
+            uri: The URI of the collection in all namespaces, e.g. 'api/v1/pods'.
+            indexers: The functions computing the index value of an object, by index name.
+        """
+        self.uri = uri
+        self.indexers = indexers
+
+
+def _get_involved_object_key(event: dict) -> str:
+    involved_object = event.get("involvedObject", {})
+    return f"{involved_object.get('kind', '')}/{involved_object.get('name', '')}"
+
+
+EVENTS = InformedResource(
+    uri="api/v1/events",
+    indexers={
+        "type": lambda event: str(event.get("type", "")),
+        "involved_object": _get_involved_object_key,
+    },
+)
+PODS = InformedResource(
+    uri="api/v1/pods",
+    indexers={"phase": lambda pod: str(pod.get("status", {}).get("phase", ""))},
+)
+
+
+class _ResourceVersionExpiredError(Exception):
+    """The resource version of the watch is too old, so the collection needs to be listed again."""
+
+
+class K8sInformer:
+    """Keeps the objects of a collection in an indexed in-memory store.
+
+    The informer lists the collection once, and then watches it from the resource version of the list.
+    Bookmarks keep the resource version current, so that a watch can be resumed without listing again.
+    The informer stops once it was not used for the idle timeout, or when the API server denies the access.
+    The stored objects are sanitized with the data sanitizer of the client, and they are shared between
+    the callers, so they must not be modified.
+    """
+
+    def __init__(self, k8s_client: "K8sClient", resource: InformedResource, idle_timeout: float):
+        """
+        Args:
+            k8s_client: The client, whose identity is used to list and watch the collection.
+            resource: The watched collection.
+            idle_timeout: Seconds without usage after which the informer stops.
+        """
+        self.k8s_client = k8s_client
+        self.resource = resource
+        self.idle_timeout = idle_timeout
+        self.synced = False
+        self.failed = False
+        self.stopped_at: float | None = None
+        self.last_used = time.monotonic()
+        self.loop = asyncio.get_running_loop()
+        self._objects: dict[str, dict] = {}
+        # the keys of each index value are kept in insertion order, so that results are stable.
+        self._indexes: dict[str, dict[str, dict[str, None]]] = {name: {} for name in resource.indexers}
+        self._resource_version = ""
+        self._task = self.loop.create_task(self._arun())
+        # also called if the task is cancelled before it started.
+        self._task.add_done_callback(self._on_stopped)
+
+    @property
+    def stopped(self) -> bool:
+        """Whether the informer stopped watching the collection."""
+        return self.stopped_at is not None
+
+    def touch(self) -> None:
+        """Mark the informer as used."""
+        self.last_used = time.monotonic()
+
+    def is_idle(self) -> bool:
+        """Whether the informer was not used for the idle timeout."""
+        return time.monotonic() - self.last_used > self.idle_timeout
+
+    def get_index_values(self, index_name: str) -> list[str]:
+        """Get the values of the index, which have at least one object."""
+        return list(self._indexes[index_name])
+
+    def get_by_index(self, index_name: str, values: Iterable[str], namespace: str = "") -> list[dict]:
+        """Get the objects with any of the index values. Provide empty string for namespace to get all objects."""
+        index = self._indexes[index_name]
+        objects = [self._objects[key] for value in values for key in index.get(value, ())]
+        if namespace:
+            return [obj for obj in objects if obj.get("metadata", {}).get("namespace") == namespace]
+        return objects
+
+    def stop(self) -> None:
+        """Stop watching the collection, without waiting for it. Can be called from any event loop."""
+        if self.loop is asyncio.get_running_loop():
+            self._task.cancel()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._task.cancel)
+
+    async def astop(self) -> None:
+        """Stop watching the collection."""
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+    async def _arun(self) -> None:
+        while not self.is_idle():
+            try:
+                if not self._resource_version:
+                    await self._arelist()
+                await self._awatch()
+            except _ResourceVersionExpiredError:
+                logger.debug(f"Resource version of {self.resource.uri} expired, listing it again.")
+                self._resource_version = ""
+            except K8sClientError as e:
+                if e.status_code == HTTPStatus.GONE:
+                    self._resource_version = ""
+                elif e.status_code in PERMANENT_ERROR_STATUS_CODES:
+                    logger.warning(f"Stopped informer of {self.resource.uri}: {e.message}")
+                    self.failed = True
+                    return
+                else:
+                    await self._aretry_later(e)
+            except (aiohttp.ClientError, TimeoutError, ValueError) as e:
+                await self._aretry_later(e)
+
+    def _on_stopped(self, _: asyncio.Task) -> None:
+        self.synced = False
+        self.stopped_at = time.monotonic()
+
+    async def _aretry_later(self, error: Exception) -> None:
+        logger.warning(f"Informer of {self.resource.uri} failed, retrying in {RETRY_INTERVAL_SECONDS}s: {error}")
+        # the store is outdated until the collection is listed again.
+        self.synced = False
+        self._resource_version = ""
+        await asyncio.sleep(RETRY_INTERVAL_SECONDS)
+
+    async def _arelist(self) -> None:
+        items, resource_version, size_bytes = await self.k8s_client.alist_with_resource_version(self.resource.uri)
+        keys = [self._get_key(item) for item in items]
+        if self.k8s_client.data_sanitizer:
+            # large lists are sanitized by worker processes, so that relists do not block the event loop.
+            items = await asanitize(self.k8s_client.data_sanitizer, items, self.k8s_client.get_api_server(), size_bytes)
+        self._objects.clear()
+        for index in self._indexes.values():
+            index.clear()
+        for key, item in zip(keys, items, strict=True):
+            self._add(key, item)
+        self._resource_version = resource_version
+        self.synced = True
+        logger.debug(f"Informer of {self.resource.uri} listed {len(items)} objects.")
+
+    async def _awatch(self) -> None:
+        events = self.k8s_client.aiter_watch_events(self.resource.uri, self._resource_version, WATCH_TIMEOUT_SECONDS)
+        async with aclosing(events):
+            async for event in events:
+                self._apply(event)
+                if self.is_idle():
+                    return
+
+    def _apply(self, event: dict) -> None:
+        event_type = event.get("type")
+        obj = event.get("object", {})
+        if event_type == "ERROR":
+            if obj.get("code") == HTTPStatus.GONE:
+                raise _ResourceVersionExpiredError()
+            raise K8sClientError(
+                message=f"Failed to watch the Kubernetes API. Error: {obj.get('message', '')}",
+                status_code=obj.get("code", HTTPStatus.INTERNAL_SERVER_ERROR),
+                uri=self.resource.uri,
+            )
+        if event_type in ("ADDED", "MODIFIED"):
+            self._store(obj)
+        elif event_type == "DELETED":
+            self._remove(self._get_key(obj))
+        self._resource_version = obj.get("metadata", {}).get("resourceVersion", self._resource_version)
+
+    @staticmethod
+    def _get_key(obj: dict) -> str:
+        metadata = obj.get("metadata", {})
+        return str(metadata.get("uid") or f"{metadata.get('namespace', '')}/{metadata.get('name', '')}")
+
+    def _store(self, obj: dict) -> None:
+        key = self._get_key(obj)
+        if self.k8s_client.data_sanitizer:
+            obj = cast(dict, self.k8s_client.data_sanitizer.sanitize(obj, self.k8s_client.get_api_server()))
+        self._add(key, obj)
+
+    def _add(self, key: str, obj: dict) -> None:
+        """Store the sanitized object under the key, replacing the previous version of it."""
+        self._remove(key)
+        self._objects[key] = obj
+        for name, indexer in self.resource.indexers.items():
+            self._indexes[name].setdefault(indexer(obj), {})[key] = None
+
+    def _remove(self, key: str) -> None:
+        obj = self._objects.pop(key, None)
+        if obj is None:
+            return
+        for name, indexer in self.resource.indexers.items():
+            value = indexer(obj)
+            keys = self._indexes[name].get(value)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._indexes[name][value]
+
+
+class K8sInformerRegistry(metaclass=SingletonMeta):
+    """Process-wide registry of the informers, by identity and collection.
+
+    Informers are started on first use and stop when their cluster was idle for the idle timeout. Informers
+    which were denied access are only started again after the idle timeout, to not list the collection
+    on every question. If more than max_count informers are registered, the least recently used ones are stopped.
+    """
+
+    def __init__(self, idle_timeout: float = K8S_INFORMER_IDLE_TIMEOUT, max_count: int = K8S_INFORMERS_MAX_COUNT):
+        """
+        Args:
+            idle_timeout: Seconds without usage after which an informer stops.
+            max_count: The maximum number of registered informers.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_count = max_count
+        # the informers are kept in the order of their last usage.
+        self._informers: dict[tuple[str, bool, str], K8sInformer] = {}
+
+    def get_informer(self, k8s_client: "K8sClient", resource: InformedResource) -> K8sInformer:
+        """Get the informer of the collection for the identity of the client, starting it if required."""
+        self._remove_stopped_informers()
+        key = (k8s_client.k8s_auth_headers.get_cache_key(), k8s_client.data_sanitizer is not None, resource.uri)
+        informer = self._informers.pop(key, None)
+        # informers are bound to the event loop in which they were started.
+        if informer is not None and informer.loop is not asyncio.get_running_loop():
+            informer.stop()
+            informer = None
+        if informer is None:
+            informer = K8sInformer(k8s_client, resource, self.idle_timeout)
+        self._informers[key] = informer
+        while len(self._informers) > self.max_count:
+            evicted_key = next(iter(self._informers))
+            self._informers.pop(evicted_key).stop()
+        informer.touch()
+        return informer
+
+    async def aclose(self) -> None:
+        """Stop all informers."""
+        informers, self._informers = self._informers, {}
+        loop = asyncio.get_running_loop()
+        for informer in informers.values():
+            if informer.loop is loop:
+                await informer.astop()
+
+    def _remove_stopped_informers(self) -> None:
+        now = time.monotonic()
+        for key, informer in list(self._informers.items()):
+            if informer.stopped_at is None:
+                continue
+            # failed informers are kept until the idle timeout passed, so that they are not restarted at once.
+            if not informer.failed or now - informer.stopped_at > self.idle_timeout:
+                del self._informers[key]
+
+    @classmethod
+    def _reset_for_tests(cls) -> None:
+        """Reset the singleton instance. Only use this for testing purpose."""
+        SingletonMeta.reset_instance(cls)
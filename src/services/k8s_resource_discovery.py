@@ -1,7 +1,6 @@
-import json
 import re
 
-from pydantic import AliasChoices, BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field, TypeAdapter
 from tenacity import retry, stop_after_attempt
 
 from agents.common.constants import CLUSTER, NAMESPACED
@@ -13,6 +12,8 @@ from utils.settings import K8S_API_RESOURCES_JSON_FILE, K8S_RESOURCE_RELATIONS_J
 logger = logging.get_logger(__name__)
 
 RETRY_ATTEMPTS = 3
+# Separates the group version and the kind in the subject of the combined relation matcher.
+RELATION_SUBJECT_SEPARATOR = "\x00"
 
 
 class ResourceKind(BaseModel):
@@ -68,6 +69,11 @@ class K8sResourceRelation(BaseModel):
     related_to: str = Field(alias="relatedTo")
 
 
+_api_resource_groups_adapter = TypeAdapter(list[ApiResourceGroup])
+_resource_relations_adapter = TypeAdapter(list[K8sResourceRelation])
+_resource_kinds_adapter = TypeAdapter(list[ResourceKind])
+
+
 class K8sResourceDiscovery:
     """
     K8sResourceDiscovery is a class that provides methods to discover Kubernetes resources.
@@ -76,6 +82,10 @@ class K8sResourceDiscovery:
     # Class static variable to store API resources
     api_resources: list[ApiResourceGroup] = []
     resource_relations: list[K8sResourceRelation] = []
+    # Resource kinds of the API resources by group version and lower case kind.
+    resource_kinds_index: dict[tuple[str, str], ResourceKind] = {}
+    # All relation patterns combined in one regex, with a named alternative per relation.
+    resource_relations_matcher: re.Pattern | None = None
 
     def __init__(self, k8s_client: IK8sClient):
         K8sResourceDiscovery.initialize()
@@ -87,16 +97,65 @@ class K8sResourceDiscovery:
         # load the json file ./config/api_resources.json.
         if len(K8sResourceDiscovery.api_resources) == 0:
             logger.info(f"Loading API resources from file: {K8S_API_RESOURCES_JSON_FILE}")
-            with open(K8S_API_RESOURCES_JSON_FILE) as f:
-                items = json.load(f)
-                K8sResourceDiscovery.api_resources = [ApiResourceGroup.model_validate(i) for i in items]
+            with open(K8S_API_RESOURCES_JSON_FILE, "rb") as f:
+                # parsing and validating the raw JSON in one step is much faster than validating parsed items.
+                K8sResourceDiscovery.api_resources = _api_resource_groups_adapter.validate_json(f.read())
+            K8sResourceDiscovery.resource_kinds_index = K8sResourceDiscovery._build_resource_kinds_index(
+                K8sResourceDiscovery.api_resources
+            )
 
         # load the json file ./config/kyma_resource_patterns.json.
         if len(K8sResourceDiscovery.resource_relations) == 0:
             logger.info(f"Loading resource relations from file: {K8S_RESOURCE_RELATIONS_JSON_FILE}")
-            with open(K8S_RESOURCE_RELATIONS_JSON_FILE) as f:
-                items = json.load(f)
-                K8sResourceDiscovery.resource_relations = [K8sResourceRelation.model_validate(i) for i in items]
+            with open(K8S_RESOURCE_RELATIONS_JSON_FILE, "rb") as f:
+                K8sResourceDiscovery.resource_relations = _resource_relations_adapter.validate_json(f.read())
+            K8sResourceDiscovery.resource_relations_matcher = K8sResourceDiscovery._compile_resource_relations(
+                K8sResourceDiscovery.resource_relations
+            )
+
+    @staticmethod
+    def _build_resource_kinds_index(
+        api_resources: list[ApiResourceGroup],
+    ) -> dict[tuple[str, str], ResourceKind]:
+        """Index the resource kinds by group version and lower case kind.
+        Kinds with multiple resources are resolved like _find_resource_kind."""
+        index: dict[tuple[str, str], ResourceKind] = {}
+        for group in api_resources:
+            for version in group.versions:
+                for kind, resource_kind in K8sResourceDiscovery._index_resource_kinds(version.resources).items():
+                    index.setdefault((version.group_version, kind), resource_kind)
+        return index
+
+    @staticmethod
+    def _index_resource_kinds(resources: list[ResourceKind]) -> dict[str, ResourceKind]:
+        """Index the resource kinds of a group version by lower case kind.
+        Kinds with multiple resources are resolved like _find_resource_kind."""
+        resources_by_kind: dict[str, list[ResourceKind]] = {}
+        for resource in resources:
+            resources_by_kind.setdefault(resource.kind.lower(), []).append(resource)
+        index: dict[str, ResourceKind] = {}
+        for kind, kind_resources in resources_by_kind.items():
+            resource_kind = K8sResourceDiscovery._find_resource_kind(kind, kind_resources)
+            if resource_kind is not None:
+                index[kind] = resource_kind
+        return index
+
+    @staticmethod
+    def _index_raw_resource_kinds(resources: list[dict]) -> dict[str, ResourceKind]:
+        """Validate the raw resources of an APIResourceList and index them by lower case kind."""
+        return K8sResourceDiscovery._index_resource_kinds(_resource_kinds_adapter.validate_python(resources))
+
+    @staticmethod
+    def _compile_resource_relations(relations: list[K8sResourceRelation]) -> re.Pattern:
+        """Combine the relation patterns in one regex, which fully matches '<groupVersion>\\x00<kind>'.
+        The alternatives are tried in order, so the first matching relation wins like in a linear scan."""
+        alternatives = [
+            f"(?P<relation{i}>(?:{relation.group_version_pattern}){RELATION_SUBJECT_SEPARATOR}"
+            f"(?:{relation.kind_pattern}))"
+            for i, relation in enumerate(relations)
+        ]
+        # an empty alternation would match the empty subject only, so use a pattern which never matches.
+        return re.compile("|".join(alternatives) or "(?!)")
 
     @staticmethod
     def get_resource_related_to(group_version: str, kind: str) -> str:
@@ -107,14 +166,15 @@ class K8sResourceDiscovery:
         :return:
         """
         K8sResourceDiscovery.initialize()
-        for relation in K8sResourceDiscovery.resource_relations:
-            if re.fullmatch(relation.group_version_pattern, group_version.lower()) and re.fullmatch(
-                relation.kind_pattern, kind
-            ):
-                return relation.related_to
+        matcher = K8sResourceDiscovery.resource_relations_matcher
+        match = matcher.fullmatch(f"{group_version.lower()}{RELATION_SUBJECT_SEPARATOR}{kind}") if matcher else None
+        if match is not None and match.lastgroup is not None:
+            index = int(match.lastgroup.removeprefix("relation"))
+            return K8sResourceDiscovery.resource_relations[index].related_to
         return "Kubernetes"  # Default to Kubernetes if no match found
 
-    def _find_resource_kind(self, resource_kind: str, resources: list[ResourceKind]) -> ResourceKind | None:
+    @staticmethod
+    def _find_resource_kind(resource_kind: str, resources: list[ResourceKind]) -> ResourceKind | None:
         """
         Find the resource kind in the list of resources.
         :param resource_kind:
@@ -151,17 +211,8 @@ class K8sResourceDiscovery:
         group_version_local = "core/v1" if group_version.lower() == "v1" else group_version.lower()
         kind_local = kind.split(".")[0] if "." in kind else kind
 
-        # Check if the group version exists in the resources.
         logger.debug(f"looking for Kind {kind_local}: {group_version_local} in local api resources list...")
-        resource_kind: ResourceKind | None = None
-        for group in K8sResourceDiscovery.api_resources:
-            for version in group.versions:
-                if version.group_version == group_version_local:
-                    # Check if the kind exists in the resources of the version
-                    resource_kind = self._find_resource_kind(kind_local, version.resources)
-                    if resource_kind is not None:
-                        break
-
+        resource_kind = K8sResourceDiscovery.resource_kinds_index.get((group_version_local, kind_local.lower()))
         if resource_kind is None:
             raise ValueError(
                 f"Invalid resource kind: {kind}. "
@@ -182,15 +233,19 @@ class K8sResourceDiscovery:
         :param kind:
         :return:
         """
-        group_version_details = await self.k8s_client.get_group_version(group_version)
-        if group_version_details is None:
-            raise ValueError(f"Invalid groupVersion: {group_version}. Not found.")
+        # the validated resources are kept with the cached API discovery, if available.
+        discovery = await self.k8s_client.aget_api_discovery()
+        resource_kinds = (
+            discovery.get_resources_by_kind(group_version, self._index_raw_resource_kinds) if discovery else None
+        )
+        if resource_kinds is None:
+            group_version_details = await self.k8s_client.get_group_version(group_version)
+            if group_version_details is None:
+                raise ValueError(f"Invalid groupVersion: {group_version}. Not found.")
+            resource_kinds = self._index_raw_resource_kinds(group_version_details.get("resources", []))
 
-        resources: list[ResourceKind] = [
-            ResourceKind.model_validate(i) for i in group_version_details.get("resources", [])
-        ]
         kind_local = kind.split(".")[0] if "." in kind else kind
-        resource_kind = self._find_resource_kind(kind_local, resources)
+        resource_kind = resource_kinds.get(kind_local.lower())
         if resource_kind is None:
             raise ValueError(
                 f"Invalid resource kind: {kind}. "
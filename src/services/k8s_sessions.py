@@ -0,0 +1,106 @@
+import asyncio
+import time
+from contextlib import suppress
+
+import aiohttp
+
+from utils import logging
+from utils.settings import (
+    K8S_CONNECTION_KEEPALIVE_TIMEOUT,
+    K8S_CONNECTION_LIMIT_PER_HOST,
+    K8S_SESSION_IDLE_TIMEOUT,
+)
+from utils.singleton_meta import SingletonMeta
+
+logger = logging.get_logger(__name__)
+
+
+class _PooledSession:
+    """An aiohttp session of the pool together with its event loop and last usage time."""
+
+    def __init__(self, session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop):
+        self.session = session
+        self.loop = loop
+        self.last_used = time.monotonic()
+
+
+class K8sSessionPool(metaclass=SingletonMeta):
+    """Process-wide pool of aiohttp sessions, with one session per Kubernetes API server.
+
+    Requests to the same API server reuse the keep-alive connections of the session, so that only the
+    first request pays the TCP and TLS handshake. The connections are additionally keyed by aiohttp with
+    the SSL context of the request, so connections are never shared between different client certificates.
+    Authorization headers must be passed per request, because the sessions are shared between users.
+    For the same reason, the sessions do not keep cookies.
+    """
+
+    def __init__(
+        self,
+        limit_per_host: int = K8S_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout: float = K8S_CONNECTION_KEEPALIVE_TIMEOUT,
+        idle_timeout: float = K8S_SESSION_IDLE_TIMEOUT,
+    ):
+        """
+        Args:
+            limit_per_host: The maximum number of concurrent connections to an API server.
+            keepalive_timeout: Seconds after which an idle keep-alive connection is closed.
+            idle_timeout: Seconds after which an unused session is closed and removed from the pool.
+        """
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.idle_timeout = idle_timeout
+        self._sessions: dict[str, _PooledSession] = {}
+
+    async def aget_session(self, cluster_url: str) -> aiohttp.ClientSession:
+        """Get the shared session for the API server. Must not be closed by the caller."""
+        await self._aevict_idle_sessions()
+        loop = asyncio.get_running_loop()
+        pooled = self._sessions.get(cluster_url)
+        # sessions are bound to the event loop in which they were created.
+        if pooled is None or pooled.session.closed or pooled.loop is not loop:
+            if pooled is not None:
+                await _aclose_session(pooled)
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+            pooled = _PooledSession(session, loop)
+            self._sessions[cluster_url] = pooled
+        pooled.last_used = time.monotonic()
+        return pooled.session
+
+    async def aclose(self) -> None:
+        """Close all sessions of the pool."""
+        sessions, self._sessions = self._sessions, {}
+        for pooled in sessions.values():
+            await _aclose_session(pooled)
+
+    async def _aevict_idle_sessions(self) -> None:
+        now = time.monotonic()
+        for cluster_url, pooled in list(self._sessions.items()):
+            if now - pooled.last_used <= self.idle_timeout:
+                continue
+            del self._sessions[cluster_url]
+            await _aclose_session(pooled)
+            logger.debug(f"Closed idle session for Kubernetes API server {cluster_url}.")
+
+    @classmethod
+    def _reset_for_tests(cls) -> None:
+        """Reset the singleton instance. Only use this for testing purpose."""
+        SingletonMeta.reset_instance(cls)
+
+
+async def _aclose_session(pooled: _PooledSession) -> None:
+    """Close the session in its own event loop, or abort its connections if that loop is closed."""
+    if pooled.session.closed:
+        return
+    if pooled.loop is asyncio.get_running_loop():
+        await pooled.session.close()
+    elif not pooled.loop.is_closed():
+        # the session is closed by its event loop, once that runs again.
+        asyncio.run_coroutine_threadsafe(pooled.session.close(), pooled.loop)
+    elif pooled.session.connector is not None:
+        # the transports cannot be closed gracefully without their event loop, so they are aborted.
+        with suppress(RuntimeError):
+            pooled.session.connector._close(abort_ssl=True)
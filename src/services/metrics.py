@@ -21,6 +21,9 @@ USAGE_TRACKER_PUBLISH_FAILURE_METRIC_KEY = f"{METRICS_KEY_PREFIX}_usage_tracker_
 LANGGRAPH_ERROR_METRIC_KEY = f"{METRICS_KEY_PREFIX}_langgraph_error_count"
 HANADB_LATENCY_METRIC_KEY = f"{METRICS_KEY_PREFIX}_tcp_hanadb_latency_seconds"
 LLM_LATENCY_METRIC_KEY = f"{METRICS_KEY_PREFIX}_llm_latency_seconds"
+USAGE_CACHE_DRIFT_METRIC_KEY = f"{METRICS_KEY_PREFIX}_usage_cache_drift_tokens"
+SANITIZER_CACHE_LOOKUP_METRIC_KEY = f"{METRICS_KEY_PREFIX}_sanitizer_cache_lookup_count"
+SANITIZER_CACHE_SAVED_CPU_METRIC_KEY = f"{METRICS_KEY_PREFIX}_sanitizer_cache_saved_cpu_seconds"
 
 
 class LangGraphErrorType(Enum):
@@ -67,6 +70,23 @@ class CustomMetrics(metaclass=SingletonMeta):
             ["is_success"],
             registry=self.registry,
         )
+        self.usage_cache_drift_tokens = Histogram(
+            USAGE_CACHE_DRIFT_METRIC_KEY,
+            "Difference between the in-process and the Redis token usage on reconciliation",
+            buckets=(0, 100, 1_000, 10_000, 100_000, 1_000_000, float("inf")),
+            registry=self.registry,
+        )
+        self.sanitizer_cache_lookup_count = Counter(
+            SANITIZER_CACHE_LOOKUP_METRIC_KEY,
+            "Lookups of sanitized Kubernetes objects in the data sanitizer cache",
+            ["result"],
+            registry=self.registry,
+        )
+        self.sanitizer_cache_saved_cpu_seconds = Counter(
+            SANITIZER_CACHE_SAVED_CPU_METRIC_KEY,
+            "CPU time of the sanitizations served from the data sanitizer cache",
+            registry=self.registry,
+        )
 
     def generate_http_response(self) -> Response:
         """Generate the HTTP response for the metrics."""
@@ -88,6 +108,20 @@ class CustomMetrics(metaclass=SingletonMeta):
         """Record the LLM latency."""
         self.llm_latency.observe(duration)
 
+    async def record_usage_cache_drift(self, tokens: int) -> None:
+        """Record the token usage drift of the in-process usage cache."""
+        self.usage_cache_drift_tokens.observe(tokens)
+
+    def record_sanitizer_cache_hit(self, saved_cpu_seconds: float) -> None:
+        """Record a sanitized object served from the cache, and the CPU time its sanitization took.
+        This is synchronous, as objects are sanitized in worker threads."""
+        self.sanitizer_cache_lookup_count.labels(result="hit").inc()
+        self.sanitizer_cache_saved_cpu_seconds.inc(saved_cpu_seconds)
+
+    def record_sanitizer_cache_miss(self) -> None:
+        """Record an object which was sanitized, because it was not cached."""
+        self.sanitizer_cache_lookup_count.labels(result="miss").inc()
+
     async def monitor_http_requests(self, req: Request, call_next: Any) -> Any:
         """A middleware to monitor HTTP requests."""
         method = req.method
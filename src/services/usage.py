@@ -1,4 +1,6 @@
+import asyncio
 import time
+from collections import defaultdict
 from typing import Any, Protocol
 from uuid import UUID
 
@@ -11,7 +13,17 @@ from agents.memory.async_redis_checkpointer import IUsageMemory
 from routers.probes import IUsageTrackerProbe
 from services.metrics import CustomMetrics, LangGraphErrorType
 from services.probes import get_usage_tracker_probe
-from utils.settings import TOKEN_USAGE_RESET_INTERVAL
+from utils.logging import get_logger
+from utils.settings import (
+    TOKEN_USAGE_MAX_STALENESS,
+    TOKEN_USAGE_RESET_INTERVAL,
+    TOKEN_USAGE_SYNC_INTERVAL,
+)
+
+logger = get_logger(__name__)
+
+# Token counters of the LLM usage.
+USAGE_COUNTERS = ("input", "output", "total")
 
 
 class UsageModel(BaseModel):
@@ -32,6 +44,178 @@ class UsageExceedReport(BaseModel):
     reset_seconds_left: int
 
 
+class ClusterUsage(BaseModel):
+    """Token usage of a cluster within the reset interval, as known by this replica."""
+
+    total_tokens: int = 0
+    latest_epoch: float = 0.0
+    # usage recorded by this replica, which is not yet written to the memory.
+    pending: dict[str, int] = {}
+    # monotonic time of the last reconciliation with the memory.
+    synced_at: float | None = None
+
+
+class UsageCache(IUsageMemory):
+    """In-process token usage accumulator, which is reconciled with the memory asynchronously.
+
+    The LLM usage written through this cache is added to in-process counters and flushed to the
+    wrapped memory after `sync_interval_sec`. Flushing also reloads the totals from the memory, which
+    includes the usage of the other replicas. So the usage limit check is a dictionary lookup, and
+    the usage of the other replicas is seen with a delay of at most `max_staleness_sec`.
+    """
+
+    def __init__(
+        self,
+        memory: IUsageMemory,
+        reset_interval_sec: int,
+        sync_interval_sec: float = TOKEN_USAGE_SYNC_INTERVAL,
+        max_staleness_sec: float = TOKEN_USAGE_MAX_STALENESS,
+        probe: IUsageTrackerProbe | None = None,
+    ):
+        """
+        Args:
+            memory: The memory to flush the usage to and reconcile the totals with.
+            reset_interval_sec: The interval in which the token usage is counted.
+            sync_interval_sec: The interval after which local usage is flushed and the totals are refreshed
+                in the background.
+            max_staleness_sec: The maximum age of the totals. Older totals are refreshed before they are returned.
+            probe: The probe to track flush failures in.
+        """
+        self.memory = memory
+        self.reset_interval_sec = reset_interval_sec
+        self.sync_interval_sec = sync_interval_sec
+        self.max_staleness_sec = max_staleness_sec
+        self._probe = probe or get_usage_tracker_probe()
+        self._usage: dict[str, ClusterUsage] = {}
+        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._sync_tasks: dict[str, asyncio.Task] = {}
+
+    async def awrite_llm_usage(self, cluster_id: str, data: dict, ttl: int = 0) -> str:
+        """Add the LLM usage to the in-process counters. Return the cluster ID.
+
+        The usage is written to the memory with the reset interval as ttl within the sync interval.
+        """
+        usage = self._usage.setdefault(cluster_id, ClusterUsage())
+        for counter in USAGE_COUNTERS:
+            usage.pending[counter] = usage.pending.get(counter, 0) + int(data.get(counter, 0))
+        usage.total_tokens += int(data.get("total", 0))
+        usage.latest_epoch = time.time()
+        self._schedule_sync(cluster_id)
+        return cluster_id
+
+    async def adelete_expired_llm_usage_records(self, cluster_id: str, ttl: int) -> None:
+        """Delete expired LLM usage records."""
+        await self.memory.adelete_expired_llm_usage_records(cluster_id, ttl)
+
+    async def alist_llm_usage_records(self, cluster_id: str, ttl: int) -> list[dict]:
+        """List non-expired LLM usage records, including the usage not flushed yet."""
+        await self.areconcile(cluster_id)
+        return await self.memory.alist_llm_usage_records(cluster_id, ttl)
+
+    async def aget_usage(self, cluster_id: str) -> ClusterUsage:
+        """Get the token usage of the cluster.
+
+        Totals older than the sync interval are returned as they are and refreshed in the background.
+        Totals older than the maximum staleness are refreshed before returning them.
+        """
+        usage = self._usage.get(cluster_id)
+        if usage is None or usage.synced_at is None:
+            return await self.areconcile(cluster_id)
+        age = time.monotonic() - usage.synced_at
+        if age > self.max_staleness_sec:
+            return await self.areconcile(cluster_id)
+        if age > self.sync_interval_sec:
+            self._schedule_sync(cluster_id, delay=0)
+        return usage
+
+    async def areconcile(self, cluster_id: str) -> ClusterUsage:
+        """Flush the local usage of the cluster to the memory and reload the totals from it."""
+        async with self._locks[cluster_id]:
+            usage = self._usage.setdefault(cluster_id, ClusterUsage())
+            await self._aflush(cluster_id, usage)
+            await self.memory.adelete_expired_llm_usage_records(cluster_id, self.reset_interval_sec)
+            records = [
+                UsageModel(**record)
+                for record in await self.memory.alist_llm_usage_records(cluster_id, self.reset_interval_sec)
+            ]
+
+            # usage recorded while reading the memory is not included in the records.
+            total_tokens = sum(record.total for record in records) + usage.pending.get("total", 0)
+            if usage.synced_at is not None:
+                await CustomMetrics().record_usage_cache_drift(abs(total_tokens - usage.total_tokens))
+            usage.total_tokens = total_tokens
+            epochs = [record.epoch for record in records]
+            if usage.pending:
+                epochs.append(usage.latest_epoch)
+            usage.latest_epoch = max(epochs, default=0.0)
+            usage.synced_at = time.monotonic()
+            asyncio.get_running_loop().call_later(
+                self.max_staleness_sec, self._evict_if_idle, cluster_id, usage.synced_at
+            )
+            return usage
+
+    async def aflush_all(self) -> None:
+        """Flush the local usage of all clusters to the memory, e.g. before the process stops."""
+        for task in list(self._sync_tasks.values()):
+            task.cancel()
+        for cluster_id, usage in list(self._usage.items()):
+            if not usage.pending:
+                continue
+            try:
+                async with self._locks[cluster_id]:
+                    await self._aflush(cluster_id, usage)
+            except Exception:
+                logger.exception(f"Failed to flush the token usage of cluster {cluster_id}.")
+
+    async def _aflush(self, cluster_id: str, usage: ClusterUsage) -> None:
+        if not usage.pending:
+            return
+        pending, usage.pending = usage.pending, {}
+        try:
+            await self.memory.awrite_llm_usage(cluster_id, pending, self.reset_interval_sec)
+        except Exception:
+            # keep the usage to flush it with the next sync.
+            for counter, value in pending.items():
+                usage.pending[counter] = usage.pending.get(counter, 0) + value
+            self._probe.increase_failure_count()
+            await CustomMetrics().record_token_usage_tracker_publish_failure()
+            raise
+        self._probe.reset_failure_count()
+
+    def _schedule_sync(self, cluster_id: str, delay: float | None = None) -> None:
+        """Reconcile the usage of the cluster in a background task, unless one is already scheduled."""
+        if cluster_id in self._sync_tasks:
+            return
+        delay = self.sync_interval_sec if delay is None else delay
+        task = asyncio.create_task(self._areconcile_later(cluster_id, delay))
+        self._sync_tasks[cluster_id] = task
+        task.add_done_callback(lambda done: self._on_sync_done(cluster_id, done))
+
+    def _on_sync_done(self, cluster_id: str, task: asyncio.Task) -> None:
+        self._sync_tasks.pop(cluster_id, None)
+        # retry if the usage could not be flushed, unless the sync was cancelled by aflush_all.
+        usage = self._usage.get(cluster_id)
+        if usage is not None and usage.pending and not task.cancelled():
+            self._schedule_sync(cluster_id)
+
+    def _evict_if_idle(self, cluster_id: str, synced_at: float) -> None:
+        """Remove the cluster, if it was not synced since and has no pending usage."""
+        usage = self._usage.get(cluster_id)
+        if usage is None or usage.synced_at != synced_at or usage.pending or cluster_id in self._sync_tasks:
+            return
+        if self._locks[cluster_id].locked():
+            return
+        del self._usage[cluster_id]
+        del self._locks[cluster_id]
+
+    async def _areconcile_later(self, cluster_id: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self.areconcile(cluster_id)
+        except Exception:
+            logger.exception(f"Failed to reconcile the token usage of cluster {cluster_id}.")
+
+
 class UsageTrackerCallback(AsyncCallbackHandler):
     """langChain callback handler to track the token usage.
     Reference: https://python.langchain.com/docs/concepts/callbacks/
@@ -148,10 +332,17 @@ class IUsageTracker(Protocol):
 class UsageTracker(IUsageTracker):
     """Usage tracker to check the token usage."""
 
-    def __init__(self, memory: IUsageMemory, token_limit: int, reset_interval_sec: int):
+    def __init__(
+        self,
+        memory: IUsageMemory,
+        token_limit: int,
+        reset_interval_sec: int,
+        usage_cache: UsageCache | None = None,
+    ):
         self.memory = memory
         self.reset_interval_sec: int = reset_interval_sec
         self.token_limit: int = token_limit
+        self.usage_cache = usage_cache
 
     async def adelete_expired_records(self, cluster_id: str) -> None:
         """Delete the expired records for the given cluster_id."""
@@ -161,6 +352,8 @@ class UsageTracker(IUsageTracker):
         """Check if the token limit is exceeded for the given cluster_id."""
         if self.token_limit == -1:
             return None
+        if self.usage_cache is not None:
+            return await self._ais_cached_usage_limit_exceeded(self.usage_cache, cluster_id)
         records = await self.memory.alist_llm_usage_records(cluster_id, self.reset_interval_sec)
         # parse the records as Pydantic model to verify the structure.
         records = [UsageModel(**record) for record in records]
@@ -181,6 +374,19 @@ class UsageTracker(IUsageTracker):
             reset_seconds_left=reset_seconds_left,
         )
 
+    async def _ais_cached_usage_limit_exceeded(
+        self, usage_cache: UsageCache, cluster_id: str
+    ) -> UsageExceedReport | None:
+        usage = await usage_cache.aget_usage(cluster_id)
+        if usage.total_tokens < self.token_limit:
+            return None
+        return UsageExceedReport(
+            cluster_id=cluster_id,
+            token_limit=self.token_limit,
+            total_tokens_used=usage.total_tokens,
+            reset_seconds_left=int(float(self.reset_interval_sec) - (time.time() - usage.latest_epoch)),
+        )
+
 
 # Helper methods
 
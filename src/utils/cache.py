@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+
+class TTLCache:
+    """A thread-safe, size bounded LRU cache whose entries expire after a time to live.
+
+    When the cache is full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Callable[[Hashable, Any], None] | None = None):
+        """
+        Args:
+            maxsize: The maximum number of entries.
+            ttl: Seconds after which an entry expires.
+            on_evict: Called with the key and the value of each entry which expired or was evicted,
+                but not of entries which were popped, replaced or cleared.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        """Get the value of the key, or None if it is not cached or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+        if self.on_evict:
+            self.on_evict(key, value)
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache the value of the key, evicting the least recently used entry if the cache is full."""
+        evicted = []
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted_key, (_, evicted_value) = self._entries.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+        # the callback is called without the lock, so that it may use the cache.
+        if self.on_evict:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key: Hashable) -> Any | None:
+        """Remove the key from the cache and return its value, if any."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else None
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
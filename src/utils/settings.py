@@ -87,6 +87,12 @@ user_part = f"{REDIS_USER}" if REDIS_USER else ""
 auth_part = f"{user_part}:{REDIS_PASSWORD}@" if REDIS_USER or REDIS_PASSWORD else ""
 REDIS_URL = f"redis://{auth_part}{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB_NUMBER}"
 REDIS_TTL = config("REDIS_TTL", default=43200, cast=int)  # Default 12 Hours
+# Checkpoint payloads larger than this (in bytes) are stored zstd compressed. Set to -1 to disable compression.
+REDIS_CHECKPOINT_COMPRESSION_THRESHOLD = config("REDIS_CHECKPOINT_COMPRESSION_THRESHOLD", default=1024, cast=int)
+# Store each channel value once per version instead of embedding all channel values in every checkpoint.
+REDIS_CHECKPOINT_DELTA_MODE = config("REDIS_CHECKPOINT_DELTA_MODE", default=False, cast=bool)
+# Number of latest checkpoints kept per conversation thread. Set to 0 to keep all checkpoints until their TTL expires.
+REDIS_CHECKPOINT_RETENTION_COUNT = config("REDIS_CHECKPOINT_RETENTION_COUNT", default=0, cast=int)
 # Langfuse
 LANGFUSE_SECRET_KEY = config("LANGFUSE_SECRET_KEY", default="dummy")
 LANGFUSE_PUBLIC_KEY = config("LANGFUSE_PUBLIC_KEY", default="dummy")
@@ -97,11 +103,21 @@ LANGFUSE_MASKING_MODE = config("LANGFUSE_MASKING_MODE", default="REDACTED", cast
 # Summarization
 SUMMARIZATION_TOKEN_UPPER_LIMIT = config("SUMMARIZATION_TOKEN_UPPER_LIMIT", default=3000, cast=int)
 SUMMARIZATION_TOKEN_LOWER_LIMIT = config("SUMMARIZATION_TOKEN_LOWER_LIMIT", default=2000, cast=int)
+# The token counts of the messages are cached by message id, so that each message is only tokenized once.
+MESSAGE_TOKEN_COUNT_CACHE_MAX_SIZE = config("MESSAGE_TOKEN_COUNT_CACHE_MAX_SIZE", default=10000, cast=int)
+MESSAGE_TOKEN_COUNT_CACHE_TTL = config("MESSAGE_TOKEN_COUNT_CACHE_TTL", default=3600, cast=int)
+# Rolling summarization folds the evicted messages into the summary in the background, instead of blocking the graph.
+SUMMARIZATION_ROLLING_ENABLED = config("SUMMARIZATION_ROLLING_ENABLED", default=False, cast=bool)
+ROLLING_SUMMARY_CACHE_MAX_SIZE = config("ROLLING_SUMMARY_CACHE_MAX_SIZE", default=10000, cast=int)
+ROLLING_SUMMARY_CACHE_TTL = config("ROLLING_SUMMARY_CACHE_TTL", default=3600, cast=int)
 
 MAX_TOKEN_LIMIT_INPUT_QUERY = config("MAX_TOKEN_LIMIT_INPUT_QUERY", default=8000, cast=int)
 
 # RAG
 RAG_RELEVANCY_SCORE_THRESHOLD = config("RAG_RELEVANCY_SCORE_THRESHOLD", default=0.5, cast=float)
+QUERY_EMBEDDING_CACHE_MAX_SIZE = config("QUERY_EMBEDDING_CACHE_MAX_SIZE", default=2048, cast=int)
+QUERY_EMBEDDING_CACHE_TTL = config("QUERY_EMBEDDING_CACHE_TTL", default=86400, cast=int)
+QUERY_EMBEDDING_CACHE_REDIS_ENABLED = config("QUERY_EMBEDDING_CACHE_REDIS_ENABLED", default=False, cast=bool)
 
 DATABASE_URL = config("DATABASE_URL", None)
 DATABASE_PORT = config("DATABASE_PORT", cast=int, default=443)
@@ -111,15 +127,60 @@ DOCS_TABLE_NAME = config("DOCS_TABLE_NAME", default="kyma_docs")
 
 TOKEN_LIMIT_PER_CLUSTER = config("TOKEN_LIMIT_PER_CLUSTER", 5000000, cast=int)
 TOKEN_USAGE_RESET_INTERVAL = config("TOKEN_USAGE_RESET_INTERVAL", 86400, cast=int)  # 24 hours
+# The token usage of all LLM calls within this interval is stored in a single counter.
+TOKEN_USAGE_BUCKET_SECONDS = config("TOKEN_USAGE_BUCKET_SECONDS", 60, cast=int)
+# Token usage is accumulated in-process and synced with Redis after this many seconds.
+TOKEN_USAGE_SYNC_INTERVAL = config("TOKEN_USAGE_SYNC_INTERVAL", 5, cast=int)
+# The usage limit check waits for a sync with Redis if the last one is older than this many seconds.
+TOKEN_USAGE_MAX_STALENESS = config("TOKEN_USAGE_MAX_STALENESS", 30, cast=int)
 
 
 K8S_API_PAGINATION_LIMIT = config("K8S_API_PAGINATION_LIMIT", 40, cast=int)
 
 K8S_API_PAGINATION_MAX_PAGE = config("K8S_API_PAGINATION_MAX_PAGE", 1, cast=int)
 
+# Connection pool of the shared aiohttp sessions to the Kubernetes API servers.
+K8S_CONNECTION_LIMIT_PER_HOST = config("K8S_CONNECTION_LIMIT_PER_HOST", 10, cast=int)
+K8S_CONNECTION_KEEPALIVE_TIMEOUT = config("K8S_CONNECTION_KEEPALIVE_TIMEOUT", 30, cast=int)
+K8S_SESSION_IDLE_TIMEOUT = config("K8S_SESSION_IDLE_TIMEOUT", 300, cast=int)
+# Initialized K8s clients are reused by requests with the same auth headers.
+K8S_CLIENT_CACHE_MAX_SIZE = config("K8S_CLIENT_CACHE_MAX_SIZE", 256, cast=int)
+K8S_CLIENT_CACHE_TTL = config("K8S_CLIENT_CACHE_TTL", 300, cast=int)
+# Sanitized results of Kubernetes GET requests are cached per identity for a short time.
+K8S_GET_CACHE_MAX_SIZE = config("K8S_GET_CACHE_MAX_SIZE", 512, cast=int)
+K8S_GET_CACHE_TTL = config("K8S_GET_CACHE_TTL", 5, cast=float)
+# Optional informers, which keep the events and pods of clusters with active conversations in memory.
+K8S_INFORMERS_ENABLED = config("K8S_INFORMERS_ENABLED", default=False, cast=bool)
+K8S_INFORMER_IDLE_TIMEOUT = config("K8S_INFORMER_IDLE_TIMEOUT", 600, cast=int)
+# The least recently used informers are stopped when more are running.
+K8S_INFORMERS_MAX_COUNT = config("K8S_INFORMERS_MAX_COUNT", 64, cast=int)
+# The API discovery of the clusters is revalidated by ETag after the TTL, and retained for revalidation
+# in memory and optionally in Redis.
+K8S_DISCOVERY_CACHE_MAX_SIZE = config("K8S_DISCOVERY_CACHE_MAX_SIZE", 256, cast=int)
+K8S_DISCOVERY_CACHE_TTL = config("K8S_DISCOVERY_CACHE_TTL", 300, cast=int)
+K8S_DISCOVERY_CACHE_RETENTION = config("K8S_DISCOVERY_CACHE_RETENTION", 86400, cast=int)
+K8S_DISCOVERY_CACHE_REDIS_ENABLED = config("K8S_DISCOVERY_CACHE_REDIS_ENABLED", default=False, cast=bool)
+# Sanitized Kubernetes objects are memoized by their uid and resourceVersion.
+DATA_SANITIZER_CACHE_MAX_SIZE = config("DATA_SANITIZER_CACHE_MAX_SIZE", 4096, cast=int)
+DATA_SANITIZER_CACHE_TTL = config("DATA_SANITIZER_CACHE_TTL", 3600, cast=int)
+# Optional worker processes, which sanitize lists with at least the minimum JSON size in chunks,
+# so that the event loop stays responsive. A page of K8S_API_PAGINATION_LIMIT real objects reaches the default.
+DATA_SANITIZER_PROCESS_POOL_ENABLED = config("DATA_SANITIZER_PROCESS_POOL_ENABLED", default=False, cast=bool)
+DATA_SANITIZER_PROCESS_POOL_SIZE = config("DATA_SANITIZER_PROCESS_POOL_SIZE", 2, cast=int)
+DATA_SANITIZER_PROCESS_POOL_MIN_BYTES = config("DATA_SANITIZER_PROCESS_POOL_MIN_BYTES", 128 * 1024, cast=int)
+DATA_SANITIZER_PROCESS_POOL_CHUNK_SIZE = config("DATA_SANITIZER_PROCESS_POOL_CHUNK_SIZE", 100, cast=int)
+# Maximum number of threads running the blocking Kubernetes dynamic client calls.
+K8S_CLIENT_THREAD_POOL_SIZE = config("K8S_CLIENT_THREAD_POOL_SIZE", 16, cast=int)
+# Timeout in seconds for fetching each source of the cluster and namespace overview context.
+K8S_OVERVIEW_SOURCE_TIMEOUT = config("K8S_OVERVIEW_SOURCE_TIMEOUT", 10, cast=float)
+
 TOTAL_CHUNKS_LIMIT = config("TOTAL_CHUNKS_LIMIT", 2, cast=int)  # Limit the number of allowed chunking of tool response
 
 TOOL_RESPONSE_TOKEN_COUNT_LIMIT = config("TOOL_RESPONSE_TOKEN_COUNT_LIMIT", 10000, cast=int)
+# Maximum JSON size of the items returned by the Kubernetes query tools, assuming about 3 bytes per token.
+K8S_QUERY_TOOL_MAX_RESPONSE_BYTES = config(
+    "K8S_QUERY_TOOL_MAX_RESPONSE_BYTES", TOTAL_CHUNKS_LIMIT * TOOL_RESPONSE_TOKEN_COUNT_LIMIT * 3, cast=int
+)
 
 REDIS_SSL_ENABLED = config("REDIS_SSL_ENABLED", default=False)
 K8S_API_RESOURCES_JSON_FILE = config(
@@ -23,3 +23,13 @@ class SingletonMeta(type):
         """
         if target_cls in cls._instances:
             del cls._instances[target_cls]
+
+    @classmethod
+    def get_instance(cls, target_cls: type) -> object | None:
+        """
+        Get the singleton instance of the specified class, without creating it.
+
+        Args:
+            target_cls (type): The class whose singleton instance should be returned.
+        """
+        return cls._instances.get(target_cls)
@@ -1,4 +1,3 @@
-import json
 from collections.abc import Awaitable
 
 import redis
@@ -18,17 +17,18 @@ class TokenUsageDataValidator:
         self.conn.close()
 
     def fetch_llm_usage_documents(self) -> list[dict]:
-        """Fetch all LLM usage documents from Redis."""
-        keys = self.conn.keys("llm_usage_*")
+        """Fetch the bucketed LLM usage counters of all clusters from Redis."""
+        keys = self.conn.keys("llm_usage_*_buckets")
         if isinstance(keys, Awaitable):
             raise TypeError(
                 "The keys method returned an Awaitable. "
                 "Please check the Redis connection and ensure it is not in async mode."
             )
-        documents = self.conn.mget(keys)
-        return [json.loads(doc) for doc in documents if doc]
+        return [self.conn.hgetall(key) for key in keys]  # type: ignore
 
     def get_total_token_usage(self) -> int:
-        """Get the total token usage from all LLM usage documents."""
+        """Get the total token usage from all LLM usage counters."""
         documents = self.fetch_llm_usage_documents()
-        return sum([doc["total"] for doc in documents])
+        return sum(
+            int(value) for doc in documents for field, value in doc.items() if field.decode().endswith(":total")
+        )
@@ -1,5 +1,7 @@
+import asyncio
+import time
 from collections.abc import Sequence
-from unittest.mock import MagicMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 from langchain_core.messages import (
@@ -12,14 +14,23 @@ from langchain_core.messages import (
 
 import agents.common.constants as constants
 from agents.common.agent import agent_edge, subtask_selector_edge
+from agents.common.data import Message
 from agents.common.state import CompanionState, SubTask, SubTaskStatus, UserInput
 from agents.common.utils import (
     RECENT_MESSAGES_LIMIT,
+    _message_token_counts,
+    afetch_overview_context,
+    compute_bounded_string_token_count,
+    compute_message_token_count,
     compute_messages_token_count,
     compute_string_token_count,
     filter_messages,
     filter_valid_messages,
+    get_encoding_for_model,
+    get_max_token_byte_count,
+    get_relevant_context_from_k8s_cluster,
     get_resource_context_message,
+    warm_up_tokenizer,
 )
 from agents.k8s.agent import K8S_AGENT
 from agents.k8s.state import KubernetesAgentState
@@ -311,6 +322,88 @@ def test_compute_messages_token_count(msgs, model_type, expected_token_count):
     assert compute_messages_token_count(msgs, model_type) == expected_token_count
 
 
+@pytest.fixture
+def word_encoding():
+    """A fake tiktoken encoding, which encodes every word as one token."""
+    encoding = Mock(encode=Mock(side_effect=lambda text: text.split()))
+    get_encoding_for_model.cache_clear()
+    _message_token_counts.clear()
+    with patch("agents.common.utils.tiktoken.encoding_for_model", return_value=encoding) as mock_encoding_for_model:
+        yield encoding, mock_encoding_for_model
+    get_encoding_for_model.cache_clear()
+    _message_token_counts.clear()
+
+
+def test_get_encoding_for_model_is_cached(word_encoding):
+    encoding, mock_encoding_for_model = word_encoding
+
+    assert compute_string_token_count("Hello, world!", "gpt-4o") == len(["Hello,", "world!"])
+    assert compute_string_token_count("Hello", "gpt-4o") == 1
+
+    mock_encoding_for_model.assert_called_once_with("gpt-4o")
+    assert get_encoding_for_model("gpt-4o") is encoding
+
+
+def test_get_encoding_for_model_falls_back_once_for_unknown_models(word_encoding):
+    encoding, mock_encoding_for_model = word_encoding
+    mock_encoding_for_model.side_effect = KeyError("unknown-model")
+
+    with patch("agents.common.utils.tiktoken.get_encoding", return_value=encoding) as mock_get_encoding:
+        compute_string_token_count("Hello", "unknown-model")
+        compute_string_token_count("Hello", "unknown-model")
+
+    mock_get_encoding.assert_called_once_with("cl100k_base")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100])
+def test_compute_bounded_string_token_count_adds_up_chunks(word_encoding, chunk_size):
+    text = "What is  Kubernetes?\nA container\torchestrator, it manages pods. " * 3
+
+    assert compute_bounded_string_token_count(text, "gpt-4o", limit=1000, chunk_size=chunk_size) == len(text.split())
+
+
+def test_compute_bounded_string_token_count_stops_over_limit(word_encoding):
+    encoding, _ = word_encoding
+    text = "word " * 10_000
+    limit = 100
+    chunk_size = 50
+
+    token_count = compute_bounded_string_token_count(text, "gpt-4o", limit, chunk_size)
+
+    assert limit < token_count <= limit + chunk_size
+    encoded_text = "".join(call.kwargs["text"] for call in encoding.encode.call_args_list)
+    assert text.startswith(encoded_text)
+    assert len(encoded_text) < (limit + 2 * chunk_size) * len("word ")
+
+
+def test_compute_message_token_count_is_cached_per_message(word_encoding):
+    encoding, _ = word_encoding
+    history = [HumanMessage(content=f"question {i}", id=f"msg-{i}") for i in range(50)]
+    summary = SystemMessage(content="Summary of previous chat: many questions")
+    summary_token_count = len(str(summary.content).split())
+
+    assert compute_messages_token_count([summary, *history], "gpt-4o") == summary_token_count + 2 * len(history)
+    history.append(AIMessage(content="the new answer", id="msg-50"))
+    encoding.encode.reset_mock()
+
+    # only the new message is tokenized in the next step.
+    assert compute_messages_token_count([summary, *history], "gpt-4o") == summary_token_count + 2 * len(history) + 1
+    assert encoding.encode.call_count == 1
+    # a message whose content changed is tokenized again.
+    assert compute_message_token_count(HumanMessage(content="changed", id="msg-0"), "gpt-4o") == 1
+    assert encoding.encode.call_count == len(["new answer", "changed"])
+
+
+def test_compute_message_token_count_does_not_cache_content(word_encoding):
+    content = "a large tool output " * 100
+
+    assert compute_message_token_count(ToolMessage(content=content, tool_call_id="call-1", id="msg-1"), "gpt-4o") > 0
+    assert compute_message_token_count(SystemMessage(content=content), "gpt-4o") > 0
+
+    assert len(_message_token_counts) == len(["with id", "without id"])
+    assert content not in repr(_message_token_counts._entries)
+
+
 @pytest.mark.parametrize(
     "test_description, input_messages, expected_output",
     [
@@ -563,3 +656,106 @@ def test_get_resource_context_message(description: str, user_input: UserInput, e
     else:
         assert isinstance(result, SystemMessage), description
         assert result.content == expected_message.content, description
+
+
+def delayed(result: list[dict], delay: float = 0.0, error: Exception | None = None):
+    """Create a fetch function of an overview context source, which responds after the delay."""
+
+    async def fetch(**_) -> list[dict]:
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+
+    return fetch
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "description, sources, expected_context",
+    [
+        (
+            "all sources are fetched",
+            {
+                "pods": delayed([{"kind": "Pod"}]),
+                "metrics": delayed([{"kind": "NodeMetrics"}]),
+                "events": delayed([{"kind": "Event"}]),
+            },
+            "kind: Pod\n\nkind: NodeMetrics\n\nkind: Event\n",
+        ),
+        (
+            "failed sources are left out",
+            {
+                "pods": delayed([{"kind": "Pod"}]),
+                "metrics": delayed([], error=ValueError("metrics server unavailable")),
+                "events": delayed([{"kind": "Event"}]),
+            },
+            "kind: Pod\n\nkind: Event\n",
+        ),
+        (
+            "sources which time out are left out",
+            {
+                "pods": delayed([{"kind": "Pod"}]),
+                "metrics": delayed([{"kind": "NodeMetrics"}], delay=10),
+                "events": delayed([{"kind": "Event"}]),
+            },
+            "kind: Pod\n\nkind: Event\n",
+        ),
+    ],
+)
+async def test_afetch_overview_context(description, sources, expected_context):
+    context = await afetch_overview_context(sources, timeout=0.1)
+    assert context == expected_context, description
+
+
+@pytest.mark.asyncio
+async def test_afetch_overview_context_raises_if_all_sources_failed():
+    error = ValueError("forbidden")
+    with pytest.raises(ValueError, match="forbidden"):
+        await afetch_overview_context(
+            {
+                "pods": delayed([], error=error),
+                "events": delayed([], delay=10),
+            },
+            timeout=0.1,
+        )
+
+
+@pytest.mark.asyncio
+async def test_get_relevant_context_from_k8s_cluster_fetches_overview_concurrently():
+    source_latency = 0.1
+    k8s_client = Mock(spec=IK8sClient)
+    k8s_client.alist_not_running_pods = AsyncMock(side_effect=delayed([{"kind": "Pod"}], source_latency))
+    k8s_client.list_nodes_metrics = AsyncMock(side_effect=delayed([{"kind": "NodeMetrics"}], source_latency))
+    k8s_client.alist_k8s_warning_events = AsyncMock(side_effect=delayed([{"kind": "Event"}], source_latency))
+    message = Message(query="", namespace="", resource_kind="Cluster", resource_api_version="", resource_name="")
+
+    start = time.perf_counter()
+    context = await get_relevant_context_from_k8s_cluster(message, k8s_client)
+    duration = time.perf_counter() - start
+
+    assert context == "kind: Pod\n\nkind: NodeMetrics\n\nkind: Event\n"
+    # bounded by the slowest source instead of the sum of all sources.
+    assert duration < 2 * source_latency
+    k8s_client.alist_not_running_pods.assert_awaited_once_with(namespace="")
+    k8s_client.alist_k8s_warning_events.assert_awaited_once_with(namespace="")
+
+
+def test_warm_up_tokenizer_loads_encoding(word_encoding):
+    encoding, mock_encoding_for_model = word_encoding
+    encoding.token_byte_values = Mock(return_value=[b"a", b"abc", b"ab"])
+    get_max_token_byte_count.cache_clear()
+
+    warm_up_tokenizer("gpt-4o")
+
+    mock_encoding_for_model.assert_called_once_with("gpt-4o")
+    assert get_max_token_byte_count("gpt-4o") == len(b"abc")
+    get_max_token_byte_count.cache_clear()
+
+
+def test_warm_up_tokenizer_ignores_errors(word_encoding):
+    _, mock_encoding_for_model = word_encoding
+    mock_encoding_for_model.side_effect = ValueError("no network")
+    get_max_token_byte_count.cache_clear()
+
+    warm_up_tokenizer("gpt-4o")  # Should not raise
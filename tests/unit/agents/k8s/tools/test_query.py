@@ -9,6 +9,7 @@ from agents.common.data import Message
 from agents.k8s.tools.query import k8s_overview_query_tool, k8s_query_tool
 from services.k8s import IK8sClient
 from utils.exceptions import K8sClientError
+from utils.settings import K8S_QUERY_TOOL_MAX_RESPONSE_BYTES
 
 
 def sample_k8s_secret():
@@ -105,7 +106,7 @@ async def test_k8s_query_tool(given_uri, given_object, given_exception, expected
 
     # Then
     # check if the method was called with the given URI.
-    k8s_client.execute_get_api_request.assert_called_once_with(given_uri)
+    k8s_client.execute_get_api_request.assert_called_once_with(given_uri, max_bytes=K8S_QUERY_TOOL_MAX_RESPONSE_BYTES)
     # check the response.
     if expected_error:
         got_err_msg = result["messages"][0].content
@@ -3,25 +3,38 @@ import json
 import time
 from collections import defaultdict
 from datetime import UTC, datetime
+from typing import Annotated
 
 import fakeredis
 import pytest
 import pytest_asyncio
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.checkpoint.base import Checkpoint
 from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from redis.asyncio.client import Pipeline
+from typing_extensions import TypedDict
 
 from agents.memory.async_redis_checkpointer import (
+    INDEX_BACKFILL_DONE_KEY,
+    INDEX_BACKFILL_LOCK_KEY,
     AsyncRedisSaver,
-    _extract_time_from_llm_usage_key,
-    _get_llm_usage_key_filter,
     _get_llm_usage_key_prefix,
+    _make_llm_usage_field,
     _make_llm_usage_key,
+    _make_redis_checkpoint_blob_key,
+    _make_redis_checkpoint_index_key,
     _make_redis_checkpoint_key,
+    _make_redis_checkpoint_writes_index_key,
     _make_redis_checkpoint_writes_key,
+    _parse_llm_usage_buckets,
     _parse_redis_checkpoint_key,
     _parse_redis_checkpoint_writes_key,
     _safe_decode,
 )
+from agents.memory.serializer import ZSTD_TYPE_SUFFIX, CompressedSerializer
+from utils.settings import TOKEN_USAGE_BUCKET_SECONDS
 
 
 def create_checkpoint(checkpoint_id: str) -> Checkpoint:
@@ -40,6 +53,71 @@ def create_metadata(step: int) -> dict:
     return {"source": "input", "step": step, "writes": {}, "score": 1}
 
 
+class RoundTripCounter:
+    """Counts the Redis round trips, where a pipeline execution is a single round trip."""
+
+    def __init__(self, conn, mocker):
+        self.count = 0
+        original_execute_command = conn.execute_command
+        original_pipeline_execute = Pipeline.execute
+
+        async def execute_command(*args, **kwargs):
+            self.count += 1
+            return await original_execute_command(*args, **kwargs)
+
+        async def pipeline_execute(pipe, *args, **kwargs):
+            if pipe.command_stack:
+                self.count += 1
+            return await original_pipeline_execute(pipe, *args, **kwargs)
+
+        mocker.patch.object(conn, "execute_command", side_effect=execute_command)
+        mocker.patch.object(Pipeline, "execute", autospec=True, side_effect=pipeline_execute)
+
+
+class BytesWrittenCounter:
+    """Counts the bytes sent to Redis by pipelined HSET commands."""
+
+    def __init__(self, mocker):
+        self.count = 0
+        original_pipeline_execute = Pipeline.execute
+
+        async def pipeline_execute(pipe, *args, **kwargs):
+            for command_args, _ in pipe.command_stack:
+                if command_args[0] == "HSET":
+                    self.count += sum(len(arg) for arg in command_args[1:] if isinstance(arg, str | bytes))
+            return await original_pipeline_execute(pipe, *args, **kwargs)
+
+        mocker.patch.object(Pipeline, "execute", autospec=True, side_effect=pipeline_execute)
+
+
+class TurnState(TypedDict):
+    messages: Annotated[list, add_messages]
+    next: str
+    subtasks: list[str]
+
+
+def create_companion_like_graph(checkpointer, tool_output_size: int = 10):
+    """Create a graph with the same linear node layout and channel updates as one CompanionGraph turn,
+    without the LLM calls."""
+    node_updates = {
+        "initial_summarization": lambda _: {"next": "gatekeeper"},
+        "gatekeeper": lambda _: {"next": "supervisor"},
+        "supervisor": lambda _: {"next": "agent", "subtasks": ["check the deployment"]},
+        "agent": lambda _: {"messages": [AIMessage(content="tool output " * tool_output_size)]},
+        "summarization": lambda _: {"next": "finalizer"},
+        "finalizer": lambda _: {"messages": [AIMessage(content="final response")]},
+    }
+    nodes = list(node_updates)
+    workflow = StateGraph(TurnState)
+    for node, update in node_updates.items():
+        workflow.add_node(node, update)
+    workflow.add_edge(START, nodes[0])
+    for source, target in zip(nodes, nodes[1:], strict=False):
+        workflow.add_edge(source, target)
+    workflow.add_edge(nodes[-1], END)
+    return workflow.compile(checkpointer=checkpointer), len(nodes)
+
+
 @pytest.mark.asyncio
 class TestAsyncRedisSaver:
     serde = JsonPlusSerializer()
@@ -53,6 +131,14 @@ class TestAsyncRedisSaver:
     def async_redis_saver(self, fake_async_redis):
         return AsyncRedisSaver(conn=fake_async_redis)
 
+    @pytest_asyncio.fixture
+    async def indexed_redis_saver(self, fake_async_redis):
+        """A saver whose indexes are complete, so that its lookups do not scan for the keys of the thread."""
+        await fake_async_redis.set(INDEX_BACKFILL_DONE_KEY, "1")
+        saver = AsyncRedisSaver(conn=fake_async_redis)
+        await saver.abackfill_indexes_once()
+        return saver
+
     async def test_concurrent_writes(self, async_redis_saver, fake_async_redis):
         config = {
             "configurable": {
@@ -393,6 +479,23 @@ class TestAsyncRedisSaver:
         assert result.checkpoint == checkpoint
         assert result.metadata == metadata
 
+    async def test_aget_tuple_with_compressed_serializer(self, fake_async_redis):
+        saver = AsyncRedisSaver(conn=fake_async_redis, serde=CompressedSerializer(compression_threshold=0))
+        legacy_saver = AsyncRedisSaver(conn=fake_async_redis)
+        thread_config = {"configurable": {"thread_id": "thread-compressed", "checkpoint_ns": ""}}
+        # a checkpoint written before compression was enabled.
+        legacy_checkpoint = create_checkpoint("chk-1")
+        await legacy_saver.aput(thread_config, legacy_checkpoint, create_metadata(1), {})
+        checkpoint = create_checkpoint("chk-2")
+        await saver.aput(thread_config, checkpoint, create_metadata(2), {})
+
+        stored_data = await fake_async_redis.hgetall(_make_redis_checkpoint_key("thread-compressed", "", "chk-2"))
+        assert stored_data[b"type"].decode().endswith(ZSTD_TYPE_SUFFIX)
+        assert stored_data[b"metadata_type"].decode().endswith(ZSTD_TYPE_SUFFIX)
+        results = [result async for result in saver.alist(thread_config)]
+        assert [result.checkpoint for result in results] == [checkpoint, legacy_checkpoint]
+        assert [result.metadata for result in results] == [create_metadata(2), create_metadata(1)]
+
     async def test_alist_backward_compatibility_legacy_metadata(self, async_redis_saver, fake_async_redis):
         """Test that alist can handle checkpoints with legacy JSON metadata (without metadata_type)."""
         # Setup: Create two checkpoints - one new format, one legacy format
@@ -426,6 +529,8 @@ class TestAsyncRedisSaver:
             "parent_checkpoint_id": "",
         }
         await fake_async_redis.hset(key_legacy, mapping=data)
+        # Legacy checkpoints are not indexed, so they need to be backfilled.
+        await async_redis_saver.abackfill_indexes()
 
         # Test: List all checkpoints
         config_list = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
@@ -505,6 +610,9 @@ class TestAsyncRedisSaver:
                 },
             )
 
+        # Writes stored directly are not indexed yet.
+        await async_redis_saver.abackfill_indexes()
+
         # Load and verify writes
         result = await async_redis_saver._aload_pending_writes(thread_id, checkpoint_ns, checkpoint_id)
         assert len(result) == expected_count
@@ -515,12 +623,471 @@ class TestAsyncRedisSaver:
             assert result[0][1] == writes_data[0][1]  # channel
             assert result[0][2] == writes_data[0][2]  # value
 
+    async def test_aget_tuple_returns_latest_checkpoint_from_index(self, async_redis_saver, fake_async_redis):
+        thread_config = {"configurable": {"thread_id": "thread-index", "checkpoint_ns": ""}}
+        for checkpoint_id in ["chk-1", "chk-3", "chk-2"]:
+            await async_redis_saver.aput(thread_config, create_checkpoint(checkpoint_id), create_metadata(1), {})
+
+        result = await async_redis_saver.aget_tuple(thread_config)
+
+        assert result is not None
+        assert result.checkpoint["id"] == "chk-3"
+        index_key = _make_redis_checkpoint_index_key("thread-index", "")
+        expected_index_size = 3
+        assert await fake_async_redis.zcard(index_key) == expected_index_size
+        assert await fake_async_redis.ttl(index_key) > 0
+
+    async def test_aget_tuple_does_not_scan_keyspace(self, async_redis_saver, fake_async_redis, mocker):
+        thread_config = {"configurable": {"thread_id": "thread-no-scan", "checkpoint_ns": ""}}
+        await async_redis_saver.aput(thread_config, create_checkpoint("chk-1"), create_metadata(1), {})
+        await async_redis_saver.aput_writes(
+            {"configurable": {**thread_config["configurable"], "checkpoint_id": "chk-1"}},
+            [("channel1", "value1")],
+            "task1",
+        )
+        keys_spy = mocker.spy(fake_async_redis, "keys")
+
+        result = await async_redis_saver.aget_tuple(thread_config)
+        listed = [item async for item in async_redis_saver.alist(thread_config)]
+
+        assert result is not None
+        assert result.pending_writes == [("task1", "channel1", "value1")]
+        assert len(listed) == 1
+        keys_spy.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "before, limit, expected_ids",
+        [
+            (None, None, ["chk-4", "chk-3", "chk-2", "chk-1"]),
+            (None, 2, ["chk-4", "chk-3"]),
+            ("chk-3", None, ["chk-2", "chk-1"]),
+            ("chk-4", 1, ["chk-3"]),
+        ],
+    )
+    async def test_alist_uses_index_ordering(self, async_redis_saver, before, limit, expected_ids):
+        thread_config = {"configurable": {"thread_id": "thread-alist", "checkpoint_ns": ""}}
+        for checkpoint_id in ["chk-1", "chk-2", "chk-3", "chk-4"]:
+            await async_redis_saver.aput(thread_config, create_checkpoint(checkpoint_id), create_metadata(1), {})
+        before_config = {"configurable": {"checkpoint_id": before}} if before else None
+
+        results = [result async for result in async_redis_saver.alist(thread_config, before=before_config, limit=limit)]
+
+        assert [result.checkpoint["id"] for result in results] == expected_ids
+
+    async def test_alist_drops_expired_checkpoints_from_index(self, async_redis_saver, fake_async_redis):
+        thread_config = {"configurable": {"thread_id": "thread-expired", "checkpoint_ns": ""}}
+        await async_redis_saver.aput(thread_config, create_checkpoint("chk-1"), create_metadata(1), {})
+        await async_redis_saver.aput(thread_config, create_checkpoint("chk-2"), create_metadata(2), {})
+        await fake_async_redis.delete(_make_redis_checkpoint_key("thread-expired", "", "chk-1"))
+
+        results = [result async for result in async_redis_saver.alist(thread_config)]
+
+        assert [result.checkpoint["id"] for result in results] == ["chk-2"]
+        index_key = _make_redis_checkpoint_index_key("thread-expired", "")
+        assert await fake_async_redis.zrange(index_key, 0, -1) == [b"chk-2"]
+
+    async def test_abackfill_indexes(self, async_redis_saver, fake_async_redis):
+        # given: keys written without indexes.
+        checkpoint = create_checkpoint("chk-1")
+        type_, serialized_checkpoint = async_redis_saver.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = async_redis_saver.serde.dumps_typed(create_metadata(1))
+        await fake_async_redis.hset(
+            _make_redis_checkpoint_key("thread-backfill", "ns1", "chk-1"),
+            mapping={
+                "checkpoint": serialized_checkpoint,
+                "type": type_,
+                "checkpoint_id": "chk-1",
+                "metadata": serialized_metadata,
+                "metadata_type": metadata_type,
+                "parent_checkpoint_id": "",
+            },
+        )
+        writes_key = _make_redis_checkpoint_writes_key("thread-backfill", "ns1", "chk-1", "task1", 0)
+        value_type, serialized_value = async_redis_saver.serde.dumps_typed("value1")
+        await fake_async_redis.hset(
+            writes_key, mapping={"channel": "channel1", "type": value_type, "value": serialized_value}
+        )
+        thread_config = {"configurable": {"thread_id": "thread-backfill", "checkpoint_ns": "ns1"}}
+        assert await fake_async_redis.keys("*index*") == []
+
+        # when
+        ttl = 60
+        indexed = await async_redis_saver.abackfill_indexes(redis_ttl=ttl)
+
+        # then
+        expected_indexed_keys = 2
+        assert indexed == expected_indexed_keys
+        writes_index_key = _make_redis_checkpoint_writes_index_key("thread-backfill", "ns1", "chk-1")
+        assert await fake_async_redis.zrange(writes_index_key, 0, -1) == [writes_key.encode()]
+        assert 0 < await fake_async_redis.ttl(writes_index_key) <= ttl
+        result = await async_redis_saver.aget_tuple(thread_config)
+        assert result is not None
+        assert result.checkpoint == checkpoint
+        assert result.pending_writes == [("task1", "channel1", "value1")]
+
+    async def test_abackfill_indexes_is_single_round_trip_per_scan_page(
+        self, async_redis_saver, fake_async_redis, mocker
+    ):
+        # given: legacy keys of many threads.
+        threads_count = 30
+        for i in range(threads_count):
+            await fake_async_redis.hset(_make_redis_checkpoint_key(f"thread-{i}", "", "chk-1"), mapping={"a": "b"})
+        counter = RoundTripCounter(fake_async_redis, mocker)
+
+        # when
+        indexed = await async_redis_saver.abackfill_indexes(scan_count=10)
+
+        # then: each SCAN call is followed by one pipeline for the keys of its page.
+        scan_calls = sum(1 for call in fake_async_redis.execute_command.call_args_list if call.args[0] == "SCAN")
+        pipelines = counter.count - scan_calls
+        assert indexed == threads_count
+        assert pipelines <= scan_calls
+        index_key = _make_redis_checkpoint_index_key("thread-0", "")
+        assert await fake_async_redis.zrange(index_key, 0, -1) == [b"chk-1"]
+        assert await fake_async_redis.ttl(index_key) > 0
+
+    async def test_abackfill_indexes_once_extends_lock_while_backfilling(
+        self, async_redis_saver, fake_async_redis, mocker
+    ):
+        lock_ttl = 1
+        lock_ttls = []
+
+        async def slow_backfill():
+            for _ in range(3):
+                await asyncio.sleep(lock_ttl / 3)
+                lock_ttls.append(await fake_async_redis.pttl(INDEX_BACKFILL_LOCK_KEY))
+            return 0
+
+        mocker.patch.object(async_redis_saver, "abackfill_indexes", side_effect=slow_backfill)
+
+        assert await async_redis_saver.abackfill_indexes_once(lock_ttl=lock_ttl) is True
+
+        # the lock did not expire, although the backfill ran as long as its time to live.
+        assert all(ttl > 0 for ttl in lock_ttls)
+        assert await fake_async_redis.exists(INDEX_BACKFILL_LOCK_KEY) == 0
+        assert await fake_async_redis.exists(INDEX_BACKFILL_DONE_KEY) == 1
+
+    async def store_legacy_checkpoint(self, saver, conn, thread_id: str, checkpoint_id: str) -> Checkpoint:
+        """Store a checkpoint without index entries, as the versions before the indexes did."""
+        checkpoint = create_checkpoint(checkpoint_id)
+        type_, serialized_checkpoint = saver.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = saver.serde.dumps_typed(create_metadata(1))
+        await conn.hset(
+            _make_redis_checkpoint_key(thread_id, "", checkpoint_id),
+            mapping={
+                "checkpoint": serialized_checkpoint,
+                "type": type_,
+                "checkpoint_id": checkpoint_id,
+                "metadata": serialized_metadata,
+                "metadata_type": metadata_type,
+                "parent_checkpoint_id": "",
+            },
+        )
+        return checkpoint
+
+    async def test_abackfill_indexes_once_finds_legacy_checkpoints_with_empty_index(
+        self, async_redis_saver, fake_async_redis
+    ):
+        # given: a checkpoint written before the indexes existed, and no index at all.
+        checkpoint = await self.store_legacy_checkpoint(async_redis_saver, fake_async_redis, "thread-legacy", "chk-1")
+        thread_config = {"configurable": {"thread_id": "thread-legacy", "checkpoint_ns": ""}}
+        assert await fake_async_redis.keys("checkpoint_index*") == []
+
+        # when: the application starts three times.
+        first = await async_redis_saver.abackfill_indexes_once()
+        # the indexes are only complete, once a pass did not find any keys without index entries.
+        assert await fake_async_redis.exists(INDEX_BACKFILL_DONE_KEY) == 0
+        second = await async_redis_saver.abackfill_indexes_once()
+        third = await async_redis_saver.abackfill_indexes_once()
+
+        # then
+        assert (first, second, third) == (True, True, False)
+        assert await fake_async_redis.exists(INDEX_BACKFILL_DONE_KEY) == 1
+        result = await async_redis_saver.aget_tuple(thread_config)
+        assert result is not None
+        assert result.checkpoint == checkpoint
+        assert await fake_async_redis.exists(INDEX_BACKFILL_LOCK_KEY) == 0
+
+    async def test_lookups_find_unindexed_checkpoints_until_indexes_are_complete(
+        self, async_redis_saver, fake_async_redis
+    ):
+        # given: an indexed checkpoint, and a newer one written by a replica without the indexes.
+        thread_config = {"configurable": {"thread_id": "thread-rolling", "checkpoint_ns": ""}}
+        await async_redis_saver.aput(thread_config, create_checkpoint("chk-1"), create_metadata(1), {})
+        checkpoint = await self.store_legacy_checkpoint(async_redis_saver, fake_async_redis, "thread-rolling", "chk-2")
+
+        # when
+        result = await async_redis_saver.aget_tuple(thread_config)
+        listed = [checkpoint_tuple async for checkpoint_tuple in async_redis_saver.alist(thread_config)]
+
+        # then
+        assert result is not None
+        assert result.checkpoint == checkpoint
+        assert [checkpoint_tuple.checkpoint["id"] for checkpoint_tuple in listed] == ["chk-2", "chk-1"]
+
+    async def test_abackfill_indexes_until_complete_retries_failed_passes(self, async_redis_saver, mocker):
+        backfill = mocker.patch.object(
+            async_redis_saver, "abackfill_indexes", side_effect=[Exception("Redis unavailable"), 1, 0]
+        )
+
+        await asyncio.wait_for(async_redis_saver.abackfill_indexes_until_complete(interval=0), timeout=5)
+
+        assert backfill.call_count == len(["failed", "found keys", "found nothing"])
+        assert await async_redis_saver._aindexes_complete()
+
+    async def test_abackfill_indexes_once_skips_while_another_replica_backfills(
+        self, async_redis_saver, fake_async_redis
+    ):
+        await fake_async_redis.set(INDEX_BACKFILL_LOCK_KEY, "1")
+
+        assert await async_redis_saver.abackfill_indexes_once() is False
+        assert await fake_async_redis.exists(INDEX_BACKFILL_DONE_KEY) == 0
+
+    async def test_aput_delta_mode(self, fake_async_redis):
+        saver = AsyncRedisSaver(conn=fake_async_redis, delta_mode=True)
+        thread_config = {"configurable": {"thread_id": "thread-delta", "checkpoint_ns": ""}}
+        checkpoint = create_checkpoint("chk-1")
+        checkpoint["channel_values"] = {"messages": ["hello"], "next": "supervisor"}
+        checkpoint["channel_versions"] = {"messages": "1", "next": "1", "cleared": "1"}
+
+        config = await saver.aput(
+            thread_config, checkpoint, create_metadata(1), {"messages": "1", "next": "1", "cleared": "1"}
+        )
+        # only the "next" channel is updated in the second step.
+        checkpoint2 = create_checkpoint("chk-2")
+        checkpoint2["channel_values"] = {"messages": ["hello"], "next": "finalizer"}
+        checkpoint2["channel_versions"] = {"messages": "1", "next": "2", "cleared": "1"}
+        await saver.aput(config, checkpoint2, create_metadata(2), {"next": "2"})
+
+        # then: the checkpoints do not embed the channel values.
+        stored_data = await fake_async_redis.hgetall(_make_redis_checkpoint_key("thread-delta", "", "chk-2"))
+        assert stored_data[b"delta"] == b"1"
+        assert (
+            saver.serde.loads_typed((stored_data[b"type"].decode(), stored_data[b"checkpoint"]))["channel_values"] == {}
+        )
+        # each channel version is stored once.
+        blob_keys = await fake_async_redis.keys("checkpoint_blob$thread-delta$*")
+        assert sorted(_safe_decode(key) for key in blob_keys) == sorted(
+            [
+                _make_redis_checkpoint_blob_key("thread-delta", "", "messages", "1"),
+                _make_redis_checkpoint_blob_key("thread-delta", "", "next", "1"),
+                _make_redis_checkpoint_blob_key("thread-delta", "", "next", "2"),
+                _make_redis_checkpoint_blob_key("thread-delta", "", "cleared", "1"),
+            ]
+        )
+        # the channel values are reassembled on read.
+        result = await saver.aget_tuple(thread_config)
+        assert result.checkpoint == checkpoint2
+        results = [result async for result in saver.alist(thread_config)]
+        assert [result.checkpoint for result in results] == [checkpoint2, checkpoint]
+
+    async def test_delta_mode_recovers_channel_values_from_full_checkpoints(self, fake_async_redis):
+        # given: a thread started before the delta mode was enabled.
+        full_saver = AsyncRedisSaver(conn=fake_async_redis)
+        delta_saver = AsyncRedisSaver(conn=fake_async_redis, delta_mode=True)
+        thread_config = {"configurable": {"thread_id": "thread-migration", "checkpoint_ns": ""}}
+        checkpoint = create_checkpoint("chk-1")
+        checkpoint["channel_values"] = {"messages": ["hello"], "next": "supervisor"}
+        checkpoint["channel_versions"] = {"messages": "1", "next": "1"}
+        config = await full_saver.aput(thread_config, checkpoint, create_metadata(1), {"messages": "1", "next": "1"})
+        checkpoint2 = create_checkpoint("chk-2")
+        checkpoint2["channel_values"] = {"messages": ["hello"], "next": "finalizer"}
+        checkpoint2["channel_versions"] = {"messages": "1", "next": "2"}
+        await delta_saver.aput(config, checkpoint2, create_metadata(2), {"next": "2"})
+
+        # when
+        result = await delta_saver.aget_tuple(thread_config)
+
+        # then: the values are taken from the full parent checkpoint and stored as blobs.
+        assert result.checkpoint == checkpoint2
+        assert await fake_async_redis.exists(_make_redis_checkpoint_blob_key("thread-migration", "", "messages", "1"))
+
+    async def put_checkpoints(self, saver, thread_config, count: int) -> dict:
+        config = thread_config
+        for i in range(1, count + 1):
+            checkpoint = create_checkpoint(f"chk-{i}")
+            # "messages" changes in every step, "input" only in the first one.
+            checkpoint["channel_values"] = {"messages": [f"message {i}"], "input": "query"}
+            checkpoint["channel_versions"] = {"messages": str(i), "input": "1"}
+            new_versions = {"messages": str(i), "input": "1"} if i == 1 else {"messages": str(i)}
+            config = await saver.aput(config, checkpoint, create_metadata(i), new_versions)
+            await saver.aput_writes(config, [("channel1", f"value{i}")], f"task{i}")
+        return config
+
+    @pytest.mark.parametrize("delta_mode", [False, True])
+    async def test_aprune_checkpoints(self, fake_async_redis, delta_mode):
+        saver = AsyncRedisSaver(conn=fake_async_redis, delta_mode=delta_mode)
+        thread_config = {"configurable": {"thread_id": "thread-prune", "checkpoint_ns": ""}}
+        await self.put_checkpoints(saver, thread_config, 5)
+
+        # when
+        pruned = await saver.aprune_checkpoints("thread-prune", "", keep_last=2)
+
+        # then: only the latest checkpoints and their writes are left.
+        expected_pruned = 3
+        assert pruned == expected_pruned
+        results = [result async for result in saver.alist(thread_config)]
+        assert [result.checkpoint["id"] for result in results] == ["chk-5", "chk-4"]
+        assert [result.pending_writes for result in results] == [
+            [("task5", "channel1", "value5")],
+            [("task4", "channel1", "value4")],
+        ]
+        remaining_keys = sorted(_safe_decode(key) for key in await fake_async_redis.keys("*"))
+        for checkpoint_id in ["chk-1", "chk-2", "chk-3"]:
+            assert _make_redis_checkpoint_key("thread-prune", "", checkpoint_id) not in remaining_keys
+            assert _make_redis_checkpoint_writes_index_key("thread-prune", "", checkpoint_id) not in remaining_keys
+            assert not [key for key in remaining_keys if key.startswith(f"writes$thread-prune$${checkpoint_id}$")]
+        if delta_mode:
+            # the channel values still referenced by the kept checkpoints are not deleted.
+            assert [key for key in remaining_keys if key.startswith("checkpoint_blob$")] == sorted(
+                [
+                    _make_redis_checkpoint_blob_key("thread-prune", "", "input", "1"),
+                    _make_redis_checkpoint_blob_key("thread-prune", "", "messages", "4"),
+                    _make_redis_checkpoint_blob_key("thread-prune", "", "messages", "5"),
+                ]
+            )
+            assert results[1].checkpoint["channel_values"] == {"messages": ["message 4"], "input": "query"}
+
+    async def test_aprune_checkpoints_keeps_at_least_one_checkpoint(self, async_redis_saver):
+        with pytest.raises(ValueError):
+            await async_redis_saver.aprune_checkpoints("thread-prune", "", keep_last=0)
+
+    async def test_aput_prunes_checkpoints_in_background(self, fake_async_redis):
+        saver = AsyncRedisSaver(conn=fake_async_redis, max_checkpoints_per_thread=1)
+        thread_config = {"configurable": {"thread_id": "thread-retention", "checkpoint_ns": ""}}
+
+        # when
+        await self.put_checkpoints(saver, thread_config, 3)
+        await asyncio.gather(*saver._prune_tasks.values())
+
+        # then: only the latest checkpoint is left.
+        index_key = _make_redis_checkpoint_index_key("thread-retention", "")
+        assert await fake_async_redis.zrange(index_key, 0, -1) == [b"chk-3"]
+        result = await saver.aget_tuple(thread_config)
+        assert result.checkpoint["id"] == "chk-3"
+        assert result.pending_writes == [("task3", "channel1", "value3")]
+        assert not saver._prune_tasks
+
+    async def test_aput_does_not_prune_without_retention(self, async_redis_saver, fake_async_redis):
+        thread_config = {"configurable": {"thread_id": "thread-retention", "checkpoint_ns": ""}}
+
+        count = 3
+        await self.put_checkpoints(async_redis_saver, thread_config, count)
+
+        assert not async_redis_saver._prune_tasks
+        index_key = _make_redis_checkpoint_index_key("thread-retention", "")
+        assert await fake_async_redis.zcard(index_key) == count
+
+    async def test_delta_mode_writes_fewer_bytes_per_turn(self, mocker):
+        turns = 20
+        bytes_written = {}
+        counter = BytesWrittenCounter(mocker)
+        for delta_mode in [False, True]:
+            async with fakeredis.FakeAsyncRedis() as conn:
+                saver = AsyncRedisSaver(conn=conn, delta_mode=delta_mode)
+                graph, _ = create_companion_like_graph(saver, tool_output_size=200)
+                config = {"configurable": {"thread_id": "thread-delta"}}
+                for turn in range(turns):
+                    counter.count = 0
+                    async for _ in graph.astream({"messages": [HumanMessage(content=f"turn {turn}")]}, config):
+                        pass
+                bytes_written[delta_mode] = counter.count
+                state = await graph.aget_state(config)
+                expected_messages = turns * 3
+                assert len(state.values["messages"]) == expected_messages
+
+        # the last turn writes only the new messages in delta mode, and the whole history in full mode.
+        max_ratio = 0.5
+        assert bytes_written[True] < bytes_written[False] * max_ratio
+
+    async def test_aput_is_single_round_trip(self, async_redis_saver, fake_async_redis, mocker):
+        counter = RoundTripCounter(fake_async_redis, mocker)
+        config = {"configurable": {"thread_id": "thread-rt", "checkpoint_ns": ""}}
+
+        await async_redis_saver.aput(config, create_checkpoint("chk-1"), create_metadata(1), {})
+
+        assert counter.count == 1
+
+    @pytest.mark.parametrize(
+        "writes",
+        [
+            # HSET path: all channels are special channels.
+            [("__error__", "error"), ("__interrupt__", "interrupt")],
+            # HSETNX path: regular channels.
+            [("channel1", "value1"), ("channel2", "value2"), ("channel3", "value3")],
+        ],
+    )
+    async def test_aput_writes_is_single_round_trip(self, async_redis_saver, fake_async_redis, mocker, writes):
+        counter = RoundTripCounter(fake_async_redis, mocker)
+        config = {"configurable": {"thread_id": "thread-rt", "checkpoint_ns": "", "checkpoint_id": "chk-1"}}
+
+        await async_redis_saver.aput_writes(config, writes, "task1")
+
+        assert counter.count == 1
+        result = await async_redis_saver._aload_pending_writes("thread-rt", "", "chk-1")
+        assert sorted((channel, value) for _, channel, value in result) == sorted(writes)
+
+    async def test_aput_writes_does_not_overwrite_existing_values(self, async_redis_saver):
+        config = {"configurable": {"thread_id": "thread-nx", "checkpoint_ns": "", "checkpoint_id": "chk-1"}}
+
+        await async_redis_saver.aput_writes(config, [("channel1", "first")], "task1")
+        await async_redis_saver.aput_writes(config, [("channel1", "second")], "task1")
+
+        result = await async_redis_saver._aload_pending_writes("thread-nx", "", "chk-1")
+        assert result == [("task1", "channel1", "first")]
+
+    @pytest.mark.parametrize(
+        "with_checkpoint_id, expected_round_trips",
+        [
+            # checkpoint and writes index in one pipeline, all writes in another one.
+            (True, 2),
+            # the latest checkpoint lookup adds one round trip.
+            (False, 3),
+        ],
+    )
+    async def test_aget_tuple_round_trips(
+        self, indexed_redis_saver, fake_async_redis, mocker, with_checkpoint_id, expected_round_trips
+    ):
+        config = {"configurable": {"thread_id": "thread-rt", "checkpoint_ns": "", "checkpoint_id": "chk-1"}}
+        await indexed_redis_saver.aput(config, create_checkpoint("chk-1"), create_metadata(1), {})
+        for task_id in ["task1", "task2", "task3"]:
+            await indexed_redis_saver.aput_writes(config, [("channel1", task_id), ("channel2", task_id)], task_id)
+        counter = RoundTripCounter(fake_async_redis, mocker)
+        if not with_checkpoint_id:
+            config = {"configurable": {"thread_id": "thread-rt", "checkpoint_ns": ""}}
+
+        result = await indexed_redis_saver.aget_tuple(config)
+
+        assert counter.count == expected_round_trips
+        expected_pending_writes = 6
+        assert len(result.pending_writes) == expected_pending_writes
+
+    async def test_round_trips_per_graph_turn(self, indexed_redis_saver, fake_async_redis, mocker):
+        """Micro-benchmark of the Redis round trips caused by the checkpointer during one graph turn.
+
+        Before the writes were pipelined, one turn of this graph took 81 round trips.
+        """
+        graph, nodes_count = create_companion_like_graph(indexed_redis_saver)
+        config = {"configurable": {"thread_id": "thread-turn"}}
+        counter = RoundTripCounter(fake_async_redis, mocker)
+        # one checkpoint and one set of writes per superstep, plus the initial state lookup.
+        max_round_trips_per_turn = 2 * (nodes_count + 1) + 3
+
+        for turn in range(3):
+            counter.count = 0
+            chunks = [
+                chunk async for chunk in graph.astream({"messages": [HumanMessage(content=f"turn {turn}")]}, config)
+            ]
+
+            assert len(chunks) == nodes_count
+            assert counter.count <= max_round_trips_per_turn
+
     @pytest.mark.parametrize(
         "cluster_id, data, ttl",
         [
-            ("cluster1", {"usage": 100}, 0),
-            ("test-cluster", {"usage": 200}, 10),
-            ("123", {"usage": 300}, 5),
+            ("cluster1", {"input": 60, "output": 40, "total": 100}, 0),
+            ("test-cluster", {"input": 150, "output": 50, "total": 200}, 10),
+            ("123", {"input": 200, "output": 100, "total": 300, "epoch": 1.0}, 5),
         ],
     )
     async def test_awrite_llm_usage(self, async_redis_saver, fake_async_redis, cluster_id, data, ttl):
@@ -528,79 +1095,90 @@ class TestAsyncRedisSaver:
         key = await async_redis_saver.awrite_llm_usage(cluster_id, data, ttl)
 
         # then
-        stored_data = await fake_async_redis.get(key)
-        assert stored_data is not None
-        assert json.loads(stored_data) == data
+        assert key == _make_llm_usage_key(cluster_id)
+        records = await async_redis_saver.alist_llm_usage_records(cluster_id, 60)
+        assert len(records) == 1
+        for counter in ["input", "output", "total"]:
+            assert records[0][counter] == data[counter]
+        assert records[0]["epoch"] > time.time() - 60
 
         if ttl > 0:
             ttl_value = await fake_async_redis.ttl(key)
             assert ttl_value > 0
 
-    async def test_adelete_expired_llm_usage_records(self, async_redis_saver, fake_async_redis):
-        # given
-        num_of_records = 3
-        cluster_id = f"cluster_usage_record_deletion_test1_{time.time()}"
-        # Set up the keys in Redis
-        sample_data = {"usage": 100}
-        # insert 3 records.
-        ttl = 2
-        for _ in range(num_of_records):
-            await async_redis_saver.awrite_llm_usage(cluster_id, sample_data)
+    async def test_awrite_llm_usage_sums_usage_per_bucket(self, async_redis_saver, fake_async_redis, mocker):
+        # given: 3 calls in the same bucket, and 2 calls in the next bucket.
+        cluster_id = "cluster-buckets"
+        now = 1_700_000_000.0
+        mock_time = mocker.patch("agents.memory.async_redis_checkpointer.time.time")
+        for offset in [0, 1, 2, TOKEN_USAGE_BUCKET_SECONDS, TOKEN_USAGE_BUCKET_SECONDS + 1]:
+            mock_time.return_value = now + offset
+            await async_redis_saver.awrite_llm_usage(cluster_id, {"input": 10, "output": 5, "total": 15})
 
-        # simulate waiting for the TTL.
-        await asyncio.sleep(2)  # Adding 2 second to ensure TTL has expired
+        # when
+        records = await async_redis_saver.alist_llm_usage_records(cluster_id, 3600)
 
-        # insert 3 more records.
-        for _ in range(num_of_records):
-            await async_redis_saver.awrite_llm_usage(cluster_id, sample_data)
+        # then: one record per bucket, with the time of the latest call in the bucket.
+        assert sorted(records, key=lambda record: record["epoch"]) == [
+            {"input": 30, "output": 15, "total": 45, "epoch": now + 2},
+            {"input": 20, "output": 10, "total": 30, "epoch": now + TOKEN_USAGE_BUCKET_SECONDS + 1},
+        ]
+        # all usage of a cluster is stored in a single key.
+        assert await fake_async_redis.keys("llm_usage_*") == [_make_llm_usage_key(cluster_id).encode()]
 
-        all_keys = await fake_async_redis.keys(_get_llm_usage_key_filter(cluster_id))
-        assert len(all_keys) == 2 * num_of_records
+    async def test_adelete_expired_llm_usage_records(self, async_redis_saver, fake_async_redis, mocker):
+        # given
+        cluster_id = "cluster_usage_record_deletion_test1"
+        ttl = 2 * TOKEN_USAGE_BUCKET_SECONDS
+        now = 1_700_000_000.0
+        mock_time = mocker.patch("agents.memory.async_redis_checkpointer.time.time")
+        mock_time.return_value = now
+        await async_redis_saver.awrite_llm_usage(cluster_id, {"input": 1, "output": 1, "total": 2})
+        # simulate waiting for the TTL and insert more usage.
+        mock_time.return_value = now + ttl + 1
+        await async_redis_saver.awrite_llm_usage(cluster_id, {"input": 2, "output": 2, "total": 4})
 
         # when
-        # Call the method to delete expired records
         await async_redis_saver.adelete_expired_llm_usage_records(cluster_id, ttl)
 
-        # then
-        # Check the remaining keys in Redis
-        remaining_keys = await fake_async_redis.keys(_get_llm_usage_key_filter(cluster_id))
-        assert len(remaining_keys) == num_of_records
-        for key in remaining_keys:
-            assert _extract_time_from_llm_usage_key(_safe_decode(key)) > time.time() - ttl
+        # then: only the counters of the latest bucket are left.
+        remaining_fields = await fake_async_redis.hkeys(_make_llm_usage_key(cluster_id))
+        expected_fields = 4
+        assert len(remaining_fields) == expected_fields
+        records = await async_redis_saver.alist_llm_usage_records(cluster_id, 10 * ttl)
+        assert records == [{"input": 2, "output": 2, "total": 4, "epoch": now + ttl + 1}]
 
-    async def test_alist_llm_usage_records(self, async_redis_saver, fake_async_redis):
+    async def test_alist_llm_usage_records(self, async_redis_saver, fake_async_redis, mocker):
         # given
-        num_of_records = 3
-        cluster_id1 = f"cluster_list_llm_usage_records_test1_{time.time()}"
-        cluster_id2 = f"cluster_list_llm_usage_records_test2_{time.time()}"
-        # Set up the keys in Redis
-        # insert 3 records with different cluster_id (as noise).
-        ttl = 3
-        for _ in range(num_of_records):
-            await async_redis_saver.awrite_llm_usage(cluster_id2, {"epoch": time.time()})
-
-        # insert 3 records.
-        for _ in range(num_of_records):
-            await async_redis_saver.awrite_llm_usage(cluster_id1, {"epoch": time.time()})
-
-        # simulate waiting for the TTL.
-        await asyncio.sleep(ttl + 2)  # Adding 2 second to ensure TTL has expired
-
-        # insert 3 records with large ttl.
-        for _ in range(num_of_records):
-            await async_redis_saver.awrite_llm_usage(cluster_id1, {"epoch": time.time()})
+        cluster_id1 = "cluster_list_llm_usage_records_test1"
+        cluster_id2 = "cluster_list_llm_usage_records_test2"
+        ttl = 2 * TOKEN_USAGE_BUCKET_SECONDS
+        now = 1_700_000_000.0
+        mock_time = mocker.patch("agents.memory.async_redis_checkpointer.time.time")
+        mock_time.return_value = now
+        # usage of another cluster (as noise).
+        await async_redis_saver.awrite_llm_usage(cluster_id2, {"input": 5, "output": 5, "total": 10})
+        await async_redis_saver.awrite_llm_usage(cluster_id1, {"input": 5, "output": 5, "total": 10})
+        # simulate waiting for the TTL and insert more usage.
+        mock_time.return_value = now + ttl + 1
+        await async_redis_saver.awrite_llm_usage(cluster_id1, {"input": 1, "output": 2, "total": 3})
 
         # when
         records = await async_redis_saver.alist_llm_usage_records(cluster_id1, ttl)
 
-        # then
-        assert len(records) == num_of_records
+        # then: the expired bucket is not listed.
+        assert records == [{"input": 1, "output": 2, "total": 3, "epoch": now + ttl + 1}]
+
+    async def test_alist_llm_usage_records_does_not_scan_keyspace(self, async_redis_saver, fake_async_redis, mocker):
+        for _ in range(10):
+            await async_redis_saver.awrite_llm_usage("cluster1", {"input": 1, "output": 1, "total": 2})
+        keys_spy = mocker.spy(fake_async_redis, "keys")
+        counter = RoundTripCounter(fake_async_redis, mocker)
 
-        all_keys = await fake_async_redis.keys(_get_llm_usage_key_filter(cluster_id1))
-        assert len(all_keys) == 2 * num_of_records
+        await async_redis_saver.alist_llm_usage_records("cluster1", 3600)
 
-        for record in records:
-            assert record["epoch"] > time.time() - ttl
+        keys_spy.assert_not_called()
+        assert counter.count == 1
 
 
 class TestUtilityFunctions:
@@ -615,6 +1193,18 @@ class TestUtilityFunctions:
         key_no_idx = _make_redis_checkpoint_writes_key("thread1", "ns1", "chk1", "task1", None)
         assert key_no_idx == "writes$thread1$ns1$chk1$task1"
 
+    def test_make_redis_checkpoint_blob_key(self):
+        key = _make_redis_checkpoint_blob_key("thread1", "ns1", "messages", "00001.0.1")
+        assert key == "checkpoint_blob$thread1$ns1$messages$00001.0.1"
+
+    def test_make_redis_checkpoint_index_key(self):
+        key = _make_redis_checkpoint_index_key("thread1", "ns1")
+        assert key == "checkpoint_index$thread1$ns1"
+
+    def test_make_redis_checkpoint_writes_index_key(self):
+        key = _make_redis_checkpoint_writes_index_key("thread1", "ns1", "chk1")
+        assert key == "writes_index$thread1$ns1$chk1"
+
     def test_parse_redis_checkpoint_key(self):
         key = "checkpoint$thread1$ns1$chk1"
         result = _parse_redis_checkpoint_key(key)
@@ -653,43 +1243,26 @@ class TestUtilityFunctions:
         assert _get_llm_usage_key_prefix(cluster_id) == expected_prefix
 
     @pytest.mark.parametrize(
-        "cluster_id",
+        "cluster_id, expected_key",
         [
-            "cluster1",
-            "test-cluster",
-            "123",
+            ("cluster1", "llm_usage_cluster1_buckets"),
+            ("test-cluster", "llm_usage_test-cluster_buckets"),
         ],
     )
-    def test_make_llm_usage_key(self, cluster_id):
-        # when
-        key = _make_llm_usage_key(cluster_id)
+    def test_make_llm_usage_key(self, cluster_id, expected_key):
+        assert _make_llm_usage_key(cluster_id) == expected_key
 
-        # then
-        assert key.startswith(_get_llm_usage_key_prefix(cluster_id))
-        parts = key.split("_")
-        expected_parts_count = 4
-        assert len(parts) == expected_parts_count  # prefix, cluster_id, timestamp
-        # check that the last part is a float.
-        assert float(parts[-1]) > 0
+    def test_make_llm_usage_field(self):
+        assert _make_llm_usage_field(1633036800, "total") == "1633036800:total"
 
-    @pytest.mark.parametrize(
-        "cluster_id, expected_filter",
-        [
-            ("cluster1", "llm_usage_cluster1_*"),
-            ("test-cluster", "llm_usage_test-cluster_*"),
-            ("123", "llm_usage_123_*"),
-        ],
-    )
-    def test_get_llm_usage_key_filter(self, cluster_id, expected_filter):
-        assert _get_llm_usage_key_filter(cluster_id) == expected_filter
+    def test_parse_llm_usage_buckets(self):
+        data = {
+            b"1633036800:total": b"150",
+            b"1633036800:epoch": b"1633036812.5",
+            b"1633036860:total": b"10",
+        }
 
-    @pytest.mark.parametrize(
-        "key, expected_time",
-        [
-            ("llm_usage_cluster1_1633036800.123456", 1633036800.123456),
-            ("llm_usage_test-cluster_1633036800.654321", 1633036800.654321),
-            ("llm_usage_123_1633036800.789012", 1633036800.789012),
-        ],
-    )
-    def test_extract_time_from_llm_usage_key(self, key, expected_time):
-        assert _extract_time_from_llm_usage_key(key) == expected_time
+        assert _parse_llm_usage_buckets(data) == {
+            1633036800: {"total": 150, "epoch": 1633036812.5},
+            1633036860: {"total": 10},
+        }
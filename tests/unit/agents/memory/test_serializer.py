@@ -0,0 +1,147 @@
+import json
+from collections import defaultdict
+from datetime import UTC, datetime
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import Checkpoint
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from agents.common.constants import K8S_AGENT
+from agents.common.state import SubTask, SubTaskStatus, UserInput
+from agents.memory.serializer import ZSTD_TYPE_SUFFIX, CompressedSerializer
+
+
+def create_pod_list(count: int) -> dict:
+    return {
+        "apiVersion": "v1",
+        "kind": "PodList",
+        "items": [
+            {
+                "metadata": {
+                    "name": f"nginx-deployment-7c79c4bf97-{i:05d}",
+                    "namespace": "default",
+                    "uid": f"6b8f0b2e-1c2d-4e5f-8a9b-{i:012d}",
+                    "resourceVersion": str(100000 + i),
+                    "labels": {"app": "nginx", "pod-template-hash": "7c79c4bf97"},
+                    "creationTimestamp": "2024-01-01T00:00:00Z",
+                },
+                "spec": {
+                    "containers": [
+                        {
+                            "name": "nginx",
+                            "image": "nginx:1.25.3",
+                            "ports": [{"containerPort": 80, "protocol": "TCP"}],
+                            "resources": {"limits": {"cpu": "500m", "memory": "128Mi"}},
+                        }
+                    ],
+                    "nodeName": f"shoot--kyma--worker-{i % 3}",
+                },
+                "status": {"phase": "Running", "podIP": f"10.0.{i // 256}.{i % 256}"},
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def create_multi_turn_checkpoint(turns: int) -> Checkpoint:
+    """Create a checkpoint which resembles the CompanionState after the given number of turns."""
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"Why is my deployment nginx-{turn} not ready?", id=f"human-{turn}"))
+        messages.append(
+            ToolMessage(
+                content=json.dumps(create_pod_list(10)),
+                tool_call_id=f"call-{turn}",
+                id=f"tool-{turn}",
+            )
+        )
+        messages.append(
+            AIMessage(
+                content=f"The deployment nginx-{turn} is not ready because the image cannot be pulled. " * 5,
+                id=f"ai-{turn}",
+            )
+        )
+    return Checkpoint(
+        v=1,
+        id="chk-1",
+        ts=datetime.now(UTC).isoformat(),
+        channel_values={
+            "messages": messages,
+            "subtasks": [
+                SubTask(
+                    description=f"Check the status of deployment nginx-{turn}",
+                    task_title=f"Checking deployment nginx-{turn}",
+                    assigned_to=K8S_AGENT,
+                    status=SubTaskStatus.COMPLETED,
+                )
+                for turn in range(turns)
+            ],
+            "input": UserInput(query="Why is my deployment not ready?", resource_kind="Deployment"),
+            "next": "__end__",
+        },
+        channel_versions={"messages": turns, "subtasks": turns},
+        versions_seen=defaultdict(dict),
+        pending_sends=[],
+    )
+
+
+class TestCompressedSerializer:
+    @pytest.mark.parametrize(
+        "obj",
+        [
+            "",
+            "value",
+            {"source": "input", "step": 1, "writes": {}},
+            [HumanMessage(content="hello", id="1")],
+            create_multi_turn_checkpoint(3),
+        ],
+    )
+    def test_round_trip(self, obj):
+        serde = CompressedSerializer()
+
+        assert serde.loads_typed(serde.dumps_typed(obj)) == obj
+
+    @pytest.mark.parametrize(
+        "compression_threshold, expect_compressed",
+        [
+            # payload is larger than the threshold.
+            (16, True),
+            # payload is smaller than the threshold.
+            (1024 * 1024, False),
+            # compression disabled.
+            (-1, False),
+        ],
+    )
+    def test_dumps_typed_threshold(self, compression_threshold, expect_compressed):
+        serde = CompressedSerializer(compression_threshold=compression_threshold)
+        obj = {"content": "a" * 1024}
+
+        type_, data = serde.dumps_typed(obj)
+
+        plain_type, plain_data = JsonPlusSerializer().dumps_typed(obj)
+        if expect_compressed:
+            assert type_ == f"{plain_type}{ZSTD_TYPE_SUFFIX}"
+            assert len(data) < len(plain_data)
+        else:
+            assert (type_, data) == (plain_type, plain_data)
+        assert serde.loads_typed((type_, data)) == obj
+
+    def test_loads_typed_reads_uncompressed_payloads(self):
+        # payloads written before compression was introduced are read by the wrapped serializer.
+        checkpoint = create_multi_turn_checkpoint(2)
+        legacy_payload = JsonPlusSerializer().dumps_typed(checkpoint)
+
+        assert CompressedSerializer(compression_threshold=0).loads_typed(legacy_payload) == checkpoint
+
+    @pytest.mark.parametrize("turns", [1, 10, 20])
+    def test_compresses_multi_turn_checkpoints(self, turns):
+        checkpoint = create_multi_turn_checkpoint(turns)
+
+        plain_payload = JsonPlusSerializer().dumps_typed(checkpoint)
+        compressed_payload = CompressedSerializer().dumps_typed(checkpoint)
+
+        # tool outputs of Kubernetes lists are highly repetitive, so they should compress well.
+        max_compression_ratio = 0.25
+        assert len(compressed_payload[1]) < len(plain_payload[1]) * max_compression_ratio
+        assert CompressedSerializer().loads_typed(compressed_payload) == checkpoint
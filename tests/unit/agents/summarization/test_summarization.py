@@ -1,4 +1,5 @@
-from unittest.mock import AsyncMock, Mock
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from langchain_core.messages import (
@@ -11,6 +12,7 @@ from langchain_core.messages import (
 from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel
 
+from agents.common.utils import _message_token_counts, get_encoding_for_model
 from agents.summarization.summarization import MessageSummarizer
 from agents.supervisor.agent import SUPERVISOR
 from utils.models.factory import IModel
@@ -334,3 +336,151 @@ class TestSummarization:
 
         result = await summarization.summarization_node(state, {})
         assert result == expected_result
+
+
+@pytest.fixture
+def word_encoding():
+    """A fake tiktoken encoding, which encodes every word as one token."""
+    encoding = Mock(encode=Mock(side_effect=lambda text: text.split()))
+    get_encoding_for_model.cache_clear()
+    _message_token_counts.clear()
+    with patch("agents.common.utils.tiktoken.encoding_for_model", return_value=encoding):
+        yield encoding
+    get_encoding_for_model.cache_clear()
+    _message_token_counts.clear()
+
+
+class MessagesState(BaseModel):
+    messages: list
+    messages_summary: str
+
+
+def create_rolling_summarizer(token_lower_limit: int, token_upper_limit: int) -> MessageSummarizer:
+    model = Mock(spec=IModel)
+    model.llm = Mock()
+    summarizer = MessageSummarizer(
+        model=model,
+        tokenizer_model_name=MAIN_MODEL_NAME,
+        token_lower_limit=token_lower_limit,
+        token_upper_limit=token_upper_limit,
+        rolling=True,
+    )
+    summarizer._chain = Mock()
+    return summarizer
+
+
+async def wait_for_rolling_summary(summarizer: MessageSummarizer, thread_id: str) -> None:
+    task = summarizer._rolling_summaries.get((thread_id, "messages"))
+    await asyncio.wait([task])
+
+
+class TestRollingSummarization:
+    def test_filter_messages_by_token_limit_keeps_message_instances(self, word_encoding):
+        summarizer = create_rolling_summarizer(token_lower_limit=4, token_upper_limit=8)
+        messages = [HumanMessage(id=str(i), content="two words") for i in range(5)]
+
+        result = summarizer.filter_messages_by_token_limit(messages)
+
+        assert result == messages[-2:]
+        assert all(kept is original for kept, original in zip(result, messages[-2:], strict=True))
+
+    @pytest.mark.asyncio
+    async def test_summarization_node_folds_evicted_messages_in_background(self, word_encoding):
+        summarizer = create_rolling_summarizer(token_lower_limit=4, token_upper_limit=8)
+        release = asyncio.Event()
+
+        async def ainvoke(*args, **kwargs):
+            await release.wait()
+            return AIMessage(content="folded summary")
+
+        summarizer._chain.ainvoke = AsyncMock(side_effect=ainvoke)
+        config = RunnableConfig(configurable={"thread_id": "conversation-1"})
+        messages = [HumanMessage(id=str(i), content="two words") for i in range(5)]
+        state = MessagesState(messages=messages, messages_summary="old summary")
+
+        # the node does not wait for the summary.
+        assert await summarizer.summarization_node(state, config) == {"error": None, "messages": []}
+        assert await summarizer.summarization_node(state, config) == {"error": None, "messages": []}
+        release.set()
+        await wait_for_rolling_summary(summarizer, "conversation-1")
+
+        # only the evicted messages are folded into the previous summary.
+        summarizer._chain.ainvoke.assert_called_once()
+        folded_messages = summarizer._chain.ainvoke.call_args.kwargs["input"]["messages"]
+        assert [m.content for m in folded_messages] == ["old summary", "two words", "two words", "two words"]
+
+        # a new message arrived, while the summary was created.
+        state.messages.append(AIMessage(id="5", content="answer"))
+        result = await summarizer.summarization_node(state, config)
+
+        assert result == {
+            "error": None,
+            "messages_summary": "Summary of previous chat:\n folded summary",
+            "messages": [RemoveMessage(id="0"), RemoveMessage(id="1"), RemoveMessage(id="2")],
+            "next": SUPERVISOR,
+        }
+        summarizer._chain.ainvoke.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_summarization_node_discards_outdated_rolling_summary(self, word_encoding):
+        summarizer = create_rolling_summarizer(token_lower_limit=4, token_upper_limit=8)
+        summarizer._chain.ainvoke = AsyncMock(return_value=AIMessage(content="folded summary"))
+        config = RunnableConfig(configurable={"thread_id": "conversation-1"})
+        messages = [HumanMessage(id=str(i), content="two words") for i in range(5)]
+
+        await summarizer.summarization_node(MessagesState(messages=messages, messages_summary="old summary"), config)
+        await wait_for_rolling_summary(summarizer, "conversation-1")
+        # the conversation was summarized elsewhere in the meantime.
+        state = MessagesState(messages=messages[-2:], messages_summary="another summary")
+
+        assert await summarizer.summarization_node(state, config) == {"error": None, "messages": []}
+
+    @pytest.mark.asyncio
+    async def test_summarization_node_ignores_failed_rolling_summary(self, word_encoding):
+        summarizer = create_rolling_summarizer(token_lower_limit=4, token_upper_limit=8)
+        summarizer.get_summary = AsyncMock(side_effect=[Exception("Summarization failed"), "ok summary"])
+        config = RunnableConfig(configurable={"thread_id": "conversation-1"})
+        state = MessagesState(
+            messages=[HumanMessage(id=str(i), content="two words") for i in range(5)], messages_summary=""
+        )
+
+        await summarizer.summarization_node(state, config)
+        await wait_for_rolling_summary(summarizer, "conversation-1")
+
+        # the failed summary is dropped and the evicted messages are folded again.
+        assert await summarizer.summarization_node(state, config) == {"error": None, "messages": []}
+        await wait_for_rolling_summary(summarizer, "conversation-1")
+        result = await summarizer.summarization_node(state, config)
+
+        assert result["messages_summary"] == "ok summary"
+        assert summarizer.get_summary.call_count == len(["failed", "ok"])
+
+    @pytest.mark.asyncio
+    async def test_rolling_summary_tasks_are_kept_until_done_and_cancelled_on_eviction(self, word_encoding):
+        summarizer = create_rolling_summarizer(token_lower_limit=4, token_upper_limit=8)
+        summarizer._rolling_summaries.maxsize = 1
+
+        async def get_summary(*_):
+            await asyncio.Event().wait()
+
+        summarizer.get_summary = get_summary
+        messages = [HumanMessage(id=str(i), content="two words") for i in range(5)]
+
+        await summarizer.summarization_node(
+            MessagesState(messages=messages, messages_summary=""), {"configurable": {"thread_id": "conversation-1"}}
+        )
+        first_task = summarizer._rolling_summaries.get(("conversation-1", "messages"))
+        assert summarizer._rolling_summary_tasks == {first_task}
+
+        # the task of the first conversation is evicted by the task of the second one.
+        await summarizer.summarization_node(
+            MessagesState(messages=messages, messages_summary=""), {"configurable": {"thread_id": "conversation-2"}}
+        )
+        second_task = summarizer._rolling_summaries.get(("conversation-2", "messages"))
+        await asyncio.wait([first_task])
+
+        assert first_task.cancelled()
+        assert summarizer._rolling_summary_tasks == {second_task}
+        second_task.cancel()
+        await asyncio.wait([second_task])
+        assert not summarizer._rolling_summary_tasks
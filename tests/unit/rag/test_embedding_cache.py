@@ -0,0 +1,88 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from rag.embedding_cache import QueryEmbeddingCache, normalize_query
+from services.redis import Redis
+
+
+@pytest.fixture
+def mock_embeddings():
+    """Create a mock embeddings model, which embeds each text as its length."""
+    embeddings = Mock(spec=Embeddings)
+    embeddings.aembed_documents = AsyncMock(side_effect=lambda texts: [[float(len(text)), 0.1] for text in texts])
+    return embeddings
+
+
+@pytest.fixture(autouse=True)
+def reset_singletons():
+    QueryEmbeddingCache._reset_for_tests()
+    Redis._reset_for_tests()
+    yield
+    QueryEmbeddingCache._reset_for_tests()
+    Redis._reset_for_tests()
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("How to install Kyma?", "How to install Kyma?"),
+        ("  How to\tinstall\n Kyma? ", "How to install Kyma?"),
+        ("", ""),
+    ],
+)
+def test_normalize_query(query, expected):
+    assert normalize_query(query) == expected
+
+
+class TestQueryEmbeddingCache:
+    @pytest.mark.asyncio
+    async def test_aembed_queries_caches_by_model_and_normalized_query(self, mock_embeddings):
+        cache = QueryEmbeddingCache()
+
+        first = await cache.aembed_queries(mock_embeddings, "model-a", ["How to install Kyma?", "What is Kyma?"])
+        second = await cache.aembed_queries(mock_embeddings, "model-a", ["What is  Kyma?", "How to install Kyma?"])
+        await cache.aembed_queries(mock_embeddings, "model-b", ["What is Kyma?"])
+
+        assert second == [first[1], first[0]]
+        assert mock_embeddings.aembed_documents.call_args_list == [
+            ((["How to install Kyma?", "What is Kyma?"],),),
+            ((["What is Kyma?"],),),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_aembed_queries_shares_embeddings_in_redis(self, mock_embeddings):
+        stored: dict[str, bytes] = {}
+        connection = Mock(
+            mget=AsyncMock(side_effect=lambda keys: [stored.get(key) for key in keys]),
+            set=AsyncMock(side_effect=lambda key, value, ex: stored.__setitem__(key, value)),
+        )
+        Redis(connection_factory=lambda: connection)
+
+        embeddings = await QueryEmbeddingCache(redis_enabled=True).aembed_queries(
+            mock_embeddings, "model-a", ["How to install Kyma?"]
+        )
+        # a new process loads the embeddings from Redis.
+        QueryEmbeddingCache._reset_for_tests()
+        result = await QueryEmbeddingCache(redis_enabled=True).aembed_queries(
+            mock_embeddings, "model-a", ["How to install Kyma?", "What is Kyma?"]
+        )
+
+        assert result[0] == embeddings[0]
+        assert len(stored) == len(result)
+        assert mock_embeddings.aembed_documents.call_args_list[-1].args == (["What is Kyma?"],)
+
+    @pytest.mark.asyncio
+    async def test_aembed_queries_ignores_redis_errors(self, mock_embeddings):
+        connection = Mock(
+            mget=AsyncMock(side_effect=ConnectionError("connection refused")),
+            set=AsyncMock(side_effect=ConnectionError("connection refused")),
+        )
+        Redis(connection_factory=lambda: connection)
+
+        result = await QueryEmbeddingCache(redis_enabled=True).aembed_queries(
+            mock_embeddings, "model-a", ["What is Kyma?"]
+        )
+
+        assert result == [[float(len("What is Kyma?")), 0.1]]
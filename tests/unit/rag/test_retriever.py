@@ -5,14 +5,24 @@ from hdbcli import dbapi
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
+from rag.embedding_cache import QueryEmbeddingCache
 from rag.retriever import HanaDBRetriever
 from services.metrics import HANADB_LATENCY_METRIC_KEY, CustomMetrics
 
 
 @pytest.fixture
 def mock_embeddings():
-    """Create a mock embeddings model."""
-    return Mock(spec=Embeddings)
+    """Create a mock embeddings model, which embeds each text as its length."""
+    embeddings = Mock(spec=Embeddings)
+    embeddings.aembed_documents = AsyncMock(side_effect=lambda texts: [[float(len(text))] for text in texts])
+    return embeddings
+
+
+@pytest.fixture(autouse=True)
+def reset_query_embedding_cache():
+    QueryEmbeddingCache._reset_for_tests()
+    yield
+    QueryEmbeddingCache._reset_for_tests()
 
 
 @pytest.fixture
@@ -26,7 +36,7 @@ def mock_hanavectordb():
     """Create a mock HanaVectorDB instance."""
     with patch("rag.retriever.HanaVectorDB") as mock:
         # Set up the async method
-        mock.return_value.asimilarity_search = AsyncMock()
+        mock.return_value.asimilarity_search_by_vector = AsyncMock()
         yield mock
 
 
@@ -119,7 +129,7 @@ class TestHanaDBRetriever:
             if before_failure_metric_value is None:
                 before_failure_metric_value = 0
             # Setup mock to raise exception
-            mock_hanavectordb.return_value.asimilarity_search.side_effect = expected_error
+            mock_hanavectordb.return_value.asimilarity_search_by_vector.side_effect = expected_error
             # When/Then
             with pytest.raises(type(expected_error)) as exc_info:
                 await retriever.aretrieve(query, top_k)
@@ -133,12 +143,37 @@ class TestHanaDBRetriever:
             if before_success_metric_value is None:
                 before_success_metric_value = 0
             # Setup mock to return expected documents
-            mock_hanavectordb.return_value.asimilarity_search.return_value = expected_docs
+            mock_hanavectordb.return_value.asimilarity_search_by_vector.return_value = expected_docs
             # When
             result = await retriever.aretrieve(query, top_k)
             # Then
             assert result == expected_docs
-            mock_hanavectordb.return_value.asimilarity_search.assert_called_once_with(query, k=top_k)
+            mock_hanavectordb.return_value.asimilarity_search_by_vector.assert_called_once_with(
+                [float(len(query))], k=top_k
+            )
             # check metric.
             after_success_metric_value = CustomMetrics().registry.get_sample_value(metric_name, {"is_success": "True"})
             assert after_success_metric_value > before_success_metric_value
+
+    @pytest.mark.asyncio
+    async def test_aretrieve_many_embeds_queries_in_one_batch(
+        self, mock_embeddings, mock_connection, mock_hanavectordb
+    ):
+        retriever = HanaDBRetriever(
+            embedding=mock_embeddings,
+            connection=mock_connection,
+            table_name="test_table",
+            embedding_model_name="test-embedding",
+        )
+        mock_hanavectordb.return_value.asimilarity_search_by_vector.side_effect = lambda embedding, k: [
+            Document(page_content=str(embedding[0]))
+        ]
+        queries = ["How to install Kyma?", "What is a Function?", "How  to install Kyma?"]
+
+        result = await retriever.aretrieve_many(queries, top_k=2)
+        # repeated queries are not embedded again.
+        await retriever.aretrieve("How to install Kyma?")
+
+        assert [docs[0].page_content for docs in result] == ["20.0", "19.0", "20.0"]
+        mock_embeddings.aembed_documents.assert_called_once_with(["How to install Kyma?", "What is a Function?"])
+        assert mock_hanavectordb.return_value.asimilarity_search_by_vector.call_count == len(queries) + 1
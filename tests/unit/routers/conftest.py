@@ -44,7 +44,7 @@ class MockK8sClient(IK8sClient):
     def get_api_server(self) -> str:
         return SAMPLE_CLUSTER_URL
 
-    async def execute_get_api_request(self, uri: str) -> dict | list[dict]:
+    async def execute_get_api_request(self, uri: str, max_bytes: int | None = None) -> dict | list[dict]:
         if self.should_fail:
             raise Exception("K8s API request failed")
         if "pods" in uri:
@@ -76,12 +76,18 @@ class MockK8sClient(IK8sClient):
     def list_not_running_pods(self, namespace: str) -> list[dict]:
         return []
 
+    async def alist_not_running_pods(self, namespace: str) -> list[dict]:
+        return self.list_not_running_pods(namespace)
+
     async def list_nodes_metrics(self) -> list[dict]:
         return []
 
     def list_k8s_warning_events(self, namespace: str) -> list[dict]:
         return []
 
+    async def alist_k8s_warning_events(self, namespace: str) -> list[dict]:
+        return self.list_k8s_warning_events(namespace)
+
     def get_resource_version(self, kind: str) -> str:
         if self.should_fail:
             raise ValueError(f"Resource kind '{kind}' not found")
@@ -89,6 +95,9 @@ class MockK8sClient(IK8sClient):
             return self._resource_versions[kind]
         raise ValueError(f"Resource kind '{kind}' not found")
 
+    async def aget_resource_version(self, kind: str) -> str:
+        return self.get_resource_version(kind)
+
 
 @pytest.fixture(scope="function")
 def k8s_client_factory():
@@ -1104,8 +1104,9 @@ def test_extract_user_identifier(
     ],
 )
 def test_enforce_query_token_limit(mock_token_count, should_raise_exception):
+    # the query is too long to be accepted by its byte length alone.
     message = Message(
-        query="What is Kubernetes?",
+        query="What is Kubernetes? " * 500,
         resource_kind="Pod",
         resource_api_version="v1",
         resource_name="mypod",
@@ -1114,7 +1115,10 @@ def test_enforce_query_token_limit(mock_token_count, should_raise_exception):
         resource_related_to=None,
     )
 
-    with patch("routers.conversations.compute_string_token_count") as mock_token_counter:
+    with (
+        patch("routers.conversations.compute_bounded_string_token_count") as mock_token_counter,
+        patch("routers.conversations.get_max_token_byte_count", return_value=128),
+    ):
         mock_token_counter.return_value = mock_token_count
 
         if should_raise_exception:
@@ -1125,3 +1129,30 @@ def test_enforce_query_token_limit(mock_token_count, should_raise_exception):
             assert exc_info.value.detail == "Input Query exceeds the allowed token limit."
         else:
             enforce_query_token_limit(message)  # Should not raise
+        mock_token_counter.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "query, should_raise_exception",
+    [
+        ("What is Kubernetes?", False),  # fewer bytes than the token limit
+        ("Kubernetes" * 110_000, True),  # more bytes than the token limit allows
+    ],
+    ids=["short", "huge"],
+)
+def test_enforce_query_token_limit_decides_by_byte_length(query, should_raise_exception):
+    message = Message(
+        query=query, resource_kind="Pod", resource_api_version="v1", resource_name="mypod", namespace="default"
+    )
+
+    with (
+        patch("routers.conversations.compute_bounded_string_token_count") as mock_token_counter,
+        patch("routers.conversations.get_max_token_byte_count", return_value=128),
+    ):
+        if should_raise_exception:
+            with pytest.raises(HTTPException, match="exceeds the allowed token limit"):
+                enforce_query_token_limit(message)
+        else:
+            enforce_query_token_limit(message)
+
+    mock_token_counter.assert_not_called()
@@ -313,5 +313,6 @@ class TestConversation:
 
         # Then
         assert result == usage_limit_exceeded
-        mock_usage_limiter.adelete_expired_records.assert_called_once_with(cluster_id)
+        # expired records are deleted in the background, not on the request path.
+        mock_usage_limiter.adelete_expired_records.assert_not_called()
         mock_usage_limiter.ais_usage_limit_exceeded.assert_called_once_with(cluster_id)
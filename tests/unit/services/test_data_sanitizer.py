@@ -1,6 +1,22 @@
+import copy
+import json
+import re
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
 import pytest
 
-from services.data_sanitizer import REDACTED_VALUE, DataSanitizer
+from services.data_sanitizer import (
+    DEFAULT_REGEX_PATTERNS,
+    MAY_CONTAIN_PERSONAL_INFORMATION,
+    REDACTED_VALUE,
+    CompiledSanitizationConfig,
+    DataSanitizer,
+    SanitizerProcessPool,
+    compile_sanitization_config,
+)
+from services.metrics import CustomMetrics
 from utils.config import DataSanitizationConfig
 
 
@@ -9,8 +25,10 @@ class TestDataSanitizer:
     def setup(self):
         """Reset the DataSanitizer singleton between tests."""
         DataSanitizer._instances = {}
+        CustomMetrics._reset_for_tests()
         self.data_sanitizer = DataSanitizer()
         yield
+        CustomMetrics._reset_for_tests()
 
     test_data = [
         {
@@ -1287,3 +1305,362 @@ class TestDataSanitizer:
         result = self.data_sanitizer.sanitize(input_text)
 
         assert result == expected_contains, f"Failed {test_description}: Expected '{expected_contains}', got '{result}'"
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "contact john.doe@example.com",
+            "contact john at example dot com",
+            "call +1 (650) 253-0000",
+            "call +49 30 12345678",
+            "ssn 123-45-6789",
+            "card 4111111111111111 ",
+            "follow @johndoe",
+            "username: root password: root",
+        ],
+    )
+    def test_pre_filter_matches_all_personal_information(self, text):
+        # the pre-filter must match every text in which scrubadub finds personal information.
+        assert self.data_sanitizer.scrubber.clean(text) != text
+        assert MAY_CONTAIN_PERSONAL_INFORMATION.search(text)
+        assert self.data_sanitizer._scrub_string(text) == self.data_sanitizer.scrubber.clean(text)
+
+    @pytest.mark.parametrize("text", ["nginx:1.14.2", "Running", "Back-off restarting failed container", ""])
+    def test_pre_filter_skips_texts_without_personal_information(self, text):
+        assert not MAY_CONTAIN_PERSONAL_INFORMATION.search(text)
+
+    def test_sanitize_scrubs_only_string_leaves(self):
+        # given
+        resource = {
+            "kind": "ConfigMap",
+            "metadata": {
+                "name": "my-config",
+                "uid": "0a1b2c3d-1234-5678-9abc-def012345678",
+                "creationTimestamp": "2024-01-01T12:00:00Z",
+                "annotations": {"kubectl.kubernetes.io/last-applied-configuration": '{"owner": "john@example.com"}'},
+                "managedFields": [{"manager": "kubectl"}],
+            },
+            "data": {"owner": "john@example.com", "replicas": 6502530000, "enabled": True},
+        }
+        original = copy.deepcopy(resource)
+
+        # when
+        result = self.data_sanitizer.sanitize(resource)
+
+        # then
+        assert result == {
+            "kind": "ConfigMap",
+            "metadata": {
+                "name": "my-config",
+                "uid": "0a1b2c3d-1234-5678-9abc-def012345678",
+                "creationTimestamp": "2024-01-01T12:00:00Z",
+            },
+            "data": {"owner": "{{EMAIL}}", "replicas": 6502530000, "enabled": True},
+        }
+        # the input is not modified.
+        assert resource == original
+
+    def test_sanitize_scrubs_user_controlled_fields_with_safe_names(self):
+        # given
+        config_map = {
+            "kind": "ConfigMap",
+            "metadata": {"name": "my-config", "labels": {"kind": "user john@example.com"}},
+            "data": {"type": "user john@example.com", "status": "contact john@example.com"},
+        }
+        custom_resource = {
+            "kind": "MyResource",
+            "apiVersion": "example.com/v1",
+            "spec": {"status": "owner john@example.com", "reason": "call +1 (650) 253-0000"},
+            "status": {"phase": "Ready", "conditions": [{"type": "Ready", "message": "owner john@example.com"}]},
+        }
+
+        # when
+        config_map_result = self.data_sanitizer.sanitize(config_map)
+        custom_resource_result = self.data_sanitizer.sanitize(custom_resource)
+
+        # then
+        assert config_map_result["metadata"]["labels"] == {"kind": "user {{EMAIL}}"}
+        assert config_map_result["data"] == {"type": "user {{EMAIL}}", "status": "contact {{EMAIL}}"}
+        assert custom_resource_result["spec"] == {"status": "owner {{EMAIL}}", "reason": "call {{PHONE}}"}
+        assert custom_resource_result["status"] == {
+            "phase": "Ready",
+            "conditions": [{"type": "Ready", "message": "owner {{EMAIL}}"}],
+        }
+
+    def test_sanitize_secret_removes_last_applied_configuration(self):
+        secret = {
+            "kind": "Secret",
+            "metadata": {
+                "name": "my-secret",
+                "annotations": {"kubectl.kubernetes.io/last-applied-configuration": '{"data": {"password": "abc"}}'},
+            },
+            "data": {"password": "YWJj"},
+        }
+
+        assert self.data_sanitizer.sanitize(secret) == {"kind": "Secret", "metadata": {"name": "my-secret"}, "data": {}}
+
+    @pytest.mark.parametrize("kind", ["PodList", "DeploymentList", "ConfigMapList"])
+    def test_sanitize_lists_scrubs_personal_information(self, kind):
+        items_count = 40
+        resource = {"kind": kind, "apiVersion": "v1", "metadata": {"resourceVersion": "123456"}}
+        resource["items"] = [create_realistic_resource(kind.removesuffix("List"), i) for i in range(items_count)]
+
+        result = self.data_sanitizer.sanitize(resource)
+
+        assert len(result["items"]) == items_count
+        assert "john.doe@example.com" not in json.dumps(result)
+        assert "{{EMAIL}}" in json.dumps(result)
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "password=secret123 api_key=abc",
+            "Authorization: Basic dXNlcjpwYXNz",
+            "Bearer token: eyJhbGciOiJIUzI1NiJ9",
+            "USER=admin and Key=value",
+            "nothing to redact here",
+            "",
+        ],
+    )
+    def test_redact_credentials_equals_applying_the_patterns_one_by_one(self, text):
+        expected = text
+        for pattern in DEFAULT_REGEX_PATTERNS:
+            expected = re.sub(pattern, "{{REDACTED}}", expected, flags=re.IGNORECASE)
+
+        compiled_config = CompiledSanitizationConfig(DataSanitizationConfig(regex_patterns=DEFAULT_REGEX_PATTERNS))
+
+        assert compiled_config.credentials_matcher is not None
+        assert compiled_config.redact_credentials(text, "{{REDACTED}}") == expected
+
+    def test_redact_credentials_applies_patterns_with_backreferences_one_by_one(self):
+        compiled_config = CompiledSanitizationConfig(DataSanitizationConfig(regex_patterns=[r"(\w)\1", r"(?i)pwd=\S+"]))
+
+        assert compiled_config.credentials_matcher is None
+        assert compiled_config.redact_credentials("aa PWD=x", "*") == "* *"
+
+    def test_sensitive_names_are_matched_case_insensitively(self):
+        compiled_config = CompiledSanitizationConfig(
+            DataSanitizationConfig(sensitive_field_names=["Token", "secret"], sensitive_env_vars=[])
+        )
+
+        assert compiled_config.is_sensitive_field("accessTOKEN")
+        assert compiled_config.is_sensitive_field("clientSecretRef")
+        assert not compiled_config.is_sensitive_field("name")
+        # empty name lists match no name.
+        assert not compiled_config.is_sensitive_env_var("API_TOKEN")
+
+    def test_compiled_config_is_shared_by_equal_configs(self):
+        config = DataSanitizationConfig(sensitive_field_names=["token"], regex_patterns=[r"pwd=\S+"])
+
+        assert compile_sanitization_config(config) is compile_sanitization_config(config.model_copy(deep=True))
+        assert compile_sanitization_config(config) is not compile_sanitization_config(
+            DataSanitizationConfig(sensitive_field_names=["secret"])
+        )
+
+    def test_sensitive_field_lookup_equals_checking_every_name(self):
+        names = [f"sensitive_name_{i}" for i in range(500)] + ["uid"]
+        keys = list(create_realistic_resource("Pod", 0)["metadata"])
+        compiled_config = CompiledSanitizationConfig(DataSanitizationConfig(sensitive_field_names=names))
+
+        expected = [any(name in key.lower() for name in names) for key in keys]
+
+        assert [compiled_config.is_sensitive_field(key) for key in keys] == expected
+        assert any(expected)
+
+    def test_sanitize_memoizes_objects_by_version(self):
+        pod = create_realistic_resource("Pod", 1)
+        metrics = CustomMetrics()
+
+        result = self.data_sanitizer.sanitize(pod, "https://api.cluster-1")
+        cached_result = self.data_sanitizer.sanitize(copy.deepcopy(pod), "https://api.cluster-1")
+        other_cluster_result = self.data_sanitizer.sanitize(pod, "https://api.cluster-2")
+        modified_pod = copy.deepcopy(pod)
+        modified_pod["metadata"]["resourceVersion"] = "2"
+        modified_result = self.data_sanitizer.sanitize(modified_pod, "https://api.cluster-1")
+
+        assert cached_result is result
+        assert other_cluster_result is not result
+        assert modified_result is not result
+        assert modified_result["metadata"]["resourceVersion"] == "2"
+        assert metrics.sanitizer_cache_lookup_count.labels(result="hit")._value.get() == 1
+        assert metrics.sanitizer_cache_saved_cpu_seconds._value.get() > 0
+
+    def test_sanitize_memoizes_list_items(self):
+        pods = [create_realistic_resource("Pod", i) for i in range(3)]
+        pod_list = {"kind": "PodList", "apiVersion": "v1", "metadata": {"resourceVersion": "100"}, "items": pods}
+
+        result = self.data_sanitizer.sanitize(pod_list)
+        # the resource version of the list changed, but its items did not.
+        cached_result = self.data_sanitizer.sanitize({**pod_list, "metadata": {"resourceVersion": "101"}})
+        items_result = self.data_sanitizer.sanitize(pods)
+
+        assert cached_result["metadata"] == {"resourceVersion": "101"}
+        assert all(
+            item is cached_item for item, cached_item in zip(result["items"], cached_result["items"], strict=True)
+        )
+        # items without the kind of their list are sanitized in another way, so they are not mixed up.
+        assert all(item is not cached_item for item, cached_item in zip(result["items"], items_result, strict=True))
+        assert result["items"][0]["spec"]["containers"][0]["env"][1]["value"] == REDACTED_VALUE
+
+    def test_sanitize_does_not_mix_up_extended_objects(self):
+        pod = create_realistic_resource("Pod", 1)
+        self.data_sanitizer.sanitize(pod)
+
+        result = self.data_sanitizer.sanitize({**pod, "events": [{"message": "contact john.doe@example.com"}]})
+
+        assert result["events"] == [{"message": "contact {{EMAIL}}"}]
+
+    @pytest.mark.parametrize("kind", ["PodList", "DeploymentList", "ConfigMapList", "SecretList"])
+    def test_memoized_sanitization_equals_sanitization_without_cache(self, kind):
+        resource = {"kind": kind, "apiVersion": "v1", "metadata": {"resourceVersion": "123456"}}
+        resource["items"] = [create_realistic_resource(kind.removesuffix("List"), i) for i in range(3)]
+
+        result = self.data_sanitizer.sanitize(resource)
+        cached_result = self.data_sanitizer.sanitize(resource)
+        self.data_sanitizer.clear_cache()
+        with patch.object(DataSanitizer, "_get_memo_key", return_value=None):
+            uncached_result = self.data_sanitizer.sanitize(resource)
+
+        assert result == cached_result == uncached_result
+
+
+class TestSanitizerProcessPool:
+    @pytest.fixture(scope="class", autouse=True)
+    def process_pool(self):
+        SanitizerProcessPool._reset_for_tests()
+        yield
+        SanitizerProcessPool().shutdown()
+        SanitizerProcessPool._reset_for_tests()
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        DataSanitizer._instances = {}
+        self.data_sanitizer = DataSanitizer()
+        with (
+            patch("services.data_sanitizer.DATA_SANITIZER_PROCESS_POOL_ENABLED", True),
+            patch("services.data_sanitizer.DATA_SANITIZER_PROCESS_POOL_MIN_BYTES", 10 * 1024),
+            patch("services.data_sanitizer.DATA_SANITIZER_PROCESS_POOL_CHUNK_SIZE", 7),
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_asanitize_sanitizes_large_lists_in_order(self):
+        items = [create_realistic_resource("Pod" if i % 2 else "ConfigMap", i) for i in range(30)]
+        items.append({"message": "contact john.doe@example.com"})
+
+        size_bytes = len(json.dumps(items))
+
+        result = await self.data_sanitizer.asanitize(items, "https://api.cluster", size_bytes)
+        # the sanitized items are memoized, so they are not sent to the workers again.
+        cached_result = await self.data_sanitizer.asanitize(items, "https://api.cluster", size_bytes)
+        self.data_sanitizer.clear_cache()
+
+        assert result == self.data_sanitizer.sanitize(items, "https://api.cluster")
+        assert result[-1] == {"message": "contact {{EMAIL}}"}
+        assert all(item is cached_item for item, cached_item in zip(result[:-1], cached_result[:-1], strict=True))
+
+    @pytest.mark.asyncio
+    async def test_asanitize_sanitizes_small_data_in_process(self):
+        items = [create_realistic_resource("Pod", i) for i in range(3)]
+
+        with patch.object(SanitizerProcessPool, "get_executor") as mock_get_executor:
+            result = await self.data_sanitizer.asanitize(items, size_bytes=len(json.dumps(items)))
+            object_result = await self.data_sanitizer.asanitize(items[0], size_bytes=10 * 1024)
+
+        mock_get_executor.assert_not_called()
+        assert result == self.data_sanitizer.sanitize(items)
+        assert object_result == result[0]
+
+    @pytest.mark.asyncio
+    async def test_asanitize_falls_back_when_process_pool_is_broken(self):
+        class BrokenExecutor(Executor):
+            def submit(self, fn, /, *args, **kwargs):
+                raise BrokenProcessPool("worker died")
+
+        items = [create_realistic_resource("Pod", i) for i in range(10)]
+        process_pool = SanitizerProcessPool()
+        broken_executor = BrokenExecutor()
+
+        with patch.object(SanitizerProcessPool, "get_executor", return_value=broken_executor):
+            result = await self.data_sanitizer.asanitize(items, size_bytes=len(json.dumps(items)))
+
+        assert result == self.data_sanitizer.sanitize(items)
+        assert broken_executor not in process_pool._executors.values()
+
+
+def create_realistic_resource(kind: str, index: int) -> dict:
+    """Create a resource with the fields and the managed metadata of a real cluster."""
+    metadata = {
+        "name": f"app-{index}",
+        "namespace": "default",
+        "uid": f"0a1b2c3d-{index:04d}-5678-9abc-def012345678",
+        "resourceVersion": f"{1234567 + index}",
+        "generation": 3,
+        "creationTimestamp": "2024-01-01T12:00:00Z",
+        "labels": {"app": f"app-{index}", "app.kubernetes.io/version": "1.2.3"},
+        "annotations": {
+            "kubectl.kubernetes.io/last-applied-configuration": json.dumps({"metadata": {"name": f"app-{index}"}}),
+            "owner": "john.doe@example.com",
+        },
+        "managedFields": [
+            {
+                "manager": "kubectl-client-side-apply",
+                "operation": "Update",
+                "time": "2024-01-01T12:00:00Z",
+                "fieldsV1": {"f:metadata": {"f:labels": {".": {}, "f:app": {}}}},
+            }
+        ],
+    }
+    if kind == "ConfigMap":
+        return {"metadata": metadata, "data": {"config.yaml": f"replicas: {index}\nlogLevel: info\n"}}
+
+    pod_spec = {
+        "containers": [
+            {
+                "name": "app",
+                "image": "europe-docker.pkg.dev/kyma-project/prod/app:1.2.3",
+                "imagePullPolicy": "IfNotPresent",
+                "env": [{"name": "LOG_LEVEL", "value": "info"}, {"name": "API_TOKEN", "value": "abc123"}],
+                "ports": [{"containerPort": 8080, "protocol": "TCP"}],
+                "resources": {"limits": {"cpu": "500m", "memory": "512Mi"}},
+                "terminationMessagePath": "/dev/termination-log",
+                "terminationMessagePolicy": "File",
+            }
+        ],
+        "restartPolicy": "Always",
+        "dnsPolicy": "ClusterFirst",
+        "serviceAccountName": "default",
+    }
+    conditions = [
+        {"type": condition, "status": "True", "lastTransitionTime": "2024-01-01T12:00:05Z"}
+        for condition in ("Initialized", "Ready", "ContainersReady", "PodScheduled")
+    ]
+    if kind == "Deployment":
+        return {
+            "metadata": metadata,
+            "spec": {"replicas": 2, "template": {"metadata": {"labels": metadata["labels"]}, "spec": pod_spec}},
+            "status": {"observedGeneration": 3, "replicas": 2, "readyReplicas": 2, "conditions": conditions},
+        }
+    return {
+        "metadata": metadata,
+        "spec": pod_spec,
+        "status": {
+            "phase": "Running",
+            "conditions": conditions,
+            "hostIP": "10.250.0.12",
+            "podIP": f"100.64.1.{index}",
+            "startTime": "2024-01-01T12:00:00Z",
+            "qosClass": "Burstable",
+            "containerStatuses": [
+                {
+                    "name": "app",
+                    "ready": True,
+                    "restartCount": 0,
+                    "image": "europe-docker.pkg.dev/kyma-project/prod/app:1.2.3",
+                    "imageID": "europe-docker.pkg.dev/kyma-project/prod/app@sha256:0123456789abcdef0123456789abcdef",
+                    "containerID": "containerd://0123456789abcdef0123456789abcdef0123456789abcdef",
+                    "state": {"running": {"startedAt": "2024-01-01T12:00:03Z"}},
+                }
+            ],
+        },
+    }
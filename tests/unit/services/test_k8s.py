@@ -1,18 +1,67 @@
+import asyncio
+import base64
+import datetime
+import json
+import threading
+from collections.abc import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 from unittest.mock import Mock, patch
 
 import pytest
 from aioresponses import aioresponses
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
 
-from services.data_sanitizer import DataSanitizer
+from services.data_sanitizer import DataSanitizer, SanitizerProcessPool
 from services.k8s import (
     AuthType,
     K8sAuthHeaders,
     K8sClient,
     K8sClientError,
+    _get_response_cache,
+    _in_flight_get_requests,
+    _k8s_client_cache,
+    _ssl_context_cache,
+    acollect_pages_within_budget,
+    escape_field_selector_value,
     get_url_for_paged_request,
 )
-from utils.settings import K8S_API_PAGINATION_MAX_PAGE
+from utils.settings import K8S_API_PAGINATION_LIMIT, K8S_API_PAGINATION_MAX_PAGE
+
+
+@pytest.fixture(autouse=True)
+def clear_get_response_cache():
+    _get_response_cache.clear()
+    _in_flight_get_requests.clear()
+    yield
+    _get_response_cache.clear()
+    _in_flight_get_requests.clear()
+
+
+def generate_cert_and_key() -> tuple[str, str]:
+    """Generate a base64 encoded self-signed PEM certificate and its private key."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test")])
+    now = datetime.datetime.now(datetime.UTC)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    return base64.b64encode(cert_pem).decode(), base64.b64encode(key_pem).decode()
 
 
 def sample_k8s_secret():
@@ -57,6 +106,44 @@ def sample_k8s_pod():
     }
 
 
+def sample_k8s_running_pod(index: int) -> dict:
+    """Create a running pod with the managed fields, which a real API server returns for it."""
+    container_fields = {
+        f"f:{field}": {}
+        for field in ("image", "imagePullPolicy", "name", "resources", "terminationMessagePath", "volumeMounts")
+    }
+    return {
+        "kind": "Pod",
+        "apiVersion": "v1",
+        "metadata": {
+            "name": f"app-{index}",
+            "namespace": "default",
+            "uid": f"0a1b2c3d-{index:04d}-5678-9abc-def012345678",
+            "resourceVersion": f"{1234567 + index}",
+            "labels": {"app": "app", "pod-template-hash": "5d4f8c7b9"},
+            "ownerReferences": [{"kind": "ReplicaSet", "name": "app-5d4f8c7b9", "uid": "1a2b3c4d-5678"}],
+            "managedFields": [
+                {
+                    "manager": manager,
+                    "operation": "Update",
+                    "time": "2024-01-01T12:00:00Z",
+                    "fieldsV1": {
+                        "f:metadata": {"f:labels": {"f:app": {}, "f:pod-template-hash": {}}},
+                        "f:spec": {"f:containers": {f'k:{{"name":"app-{i}"}}': container_fields for i in range(8)}},
+                        "f:status": {f'k:{{"type":"{condition}"}}': {"f:status": {}} for condition in range(8)},
+                    },
+                }
+                for manager in ("kube-controller-manager", "kubelet")
+            ],
+        },
+        "spec": {
+            "containers": [{"name": "app", "image": "europe-docker.pkg.dev/kyma-project/prod/app:1.2.3"}],
+            "nodeName": "shoot-worker-1",
+        },
+        "status": {"phase": "Running", "podIP": f"100.64.1.{index}"},
+    }
+
+
 class TestK8sAuthHeaders:
     @pytest.mark.parametrize(
         "given_ca_data, expected_result",
@@ -409,12 +496,99 @@ class TestK8sAuthHeaders:
             assert headers.is_cluster_url_allowed() == expected_result, description
 
 
+class TestK8sClientInitialization:
+    @pytest.fixture(autouse=True)
+    def clear_client_cache(self):
+        _k8s_client_cache.clear()
+        _ssl_context_cache.clear()
+        yield
+        _k8s_client_cache.clear()
+        _ssl_context_cache.clear()
+
+    @pytest.fixture(scope="class")
+    def cert_and_key(self):
+        return generate_cert_and_key()
+
+    def create_headers(self, cert_and_key, token: str | None = None) -> K8sAuthHeaders:
+        cert, key = cert_and_key
+        return K8sAuthHeaders(
+            x_cluster_url="https://api.example.com",
+            x_cluster_certificate_authority_data=cert,
+            x_k8s_authorization=token,
+            x_client_certificate_data=None if token else cert,
+            x_client_key_data=None if token else key,
+        )
+
+    @pytest.mark.parametrize("token", ["test-token", None])
+    def test_init_loads_certificates_without_temp_files(self, cert_and_key, token):
+        headers = self.create_headers(cert_and_key, token)
+
+        with patch("services.k8s.tempfile.NamedTemporaryFile") as mock_named_temp_file:
+            k8s_client = K8sClient(k8s_auth_headers=headers)
+
+        mock_named_temp_file.assert_not_called()
+        assert k8s_client.ca_temp_filename == ""
+        assert len(k8s_client.client_ssl_context.get_ca_certs()) == 1
+
+    def test_new_reuses_client_for_same_headers(self, cert_and_key):
+        client1 = K8sClient.new(self.create_headers(cert_and_key, "token-1"))
+        client2 = K8sClient.new(self.create_headers(cert_and_key, "token-1"))
+        other_client = K8sClient.new(self.create_headers(cert_and_key, "token-2"))
+
+        assert client1 is client2
+        assert other_client is not client1
+        assert client1.client_ssl_context is client2.client_ssl_context
+
+    def test_clients_share_ssl_context_per_cluster_and_certificates(self, cert_and_key):
+        client = K8sClient(k8s_auth_headers=self.create_headers(cert_and_key, "token-1"))
+        other_cluster_headers = self.create_headers(cert_and_key, "token-1")
+        other_cluster_headers.x_cluster_url = "https://api.other.example.com"
+        other_ca_headers = self.create_headers(generate_cert_and_key(), "token-1")
+        client_cert_client = K8sClient(k8s_auth_headers=self.create_headers(cert_and_key))
+
+        # the token is sent in a header, so it does not need another SSL context.
+        assert K8sClient(k8s_auth_headers=self.create_headers(cert_and_key, "token-2")).client_ssl_context is (
+            client.client_ssl_context
+        )
+        assert K8sClient(k8s_auth_headers=other_cluster_headers).client_ssl_context is not client.client_ssl_context
+        assert K8sClient(k8s_auth_headers=other_ca_headers).client_ssl_context is not client.client_ssl_context
+        assert client_cert_client.client_ssl_context is not client.client_ssl_context
+        assert K8sClient(k8s_auth_headers=self.create_headers(cert_and_key)).client_ssl_context is (
+            client_cert_client.client_ssl_context
+        )
+
+    def test_new_does_not_share_client_without_sanitizer(self, cert_and_key):
+        data_sanitizer = Mock(sanitize=Mock(side_effect=lambda data, cluster: data))
+
+        unsanitized_client = K8sClient.new(self.create_headers(cert_and_key, "token-1"))
+        sanitized_client = K8sClient.new(self.create_headers(cert_and_key, "token-1"), data_sanitizer)
+
+        assert sanitized_client is not unsanitized_client
+        assert unsanitized_client.data_sanitizer is None
+        assert sanitized_client.data_sanitizer is data_sanitizer
+        assert K8sClient.new(self.create_headers(cert_and_key, "token-1"), data_sanitizer) is sanitized_client
+
+    def test_get_cache_key(self, cert_and_key):
+        headers = self.create_headers(cert_and_key, "token-1")
+
+        assert headers.get_cache_key() == self.create_headers(cert_and_key, "token-1").get_cache_key()
+        assert headers.get_cache_key() != self.create_headers(cert_and_key, "token-2").get_cache_key()
+        assert headers.get_cache_key() != self.create_headers(cert_and_key).get_cache_key()
+        # the credentials are not part of the key in plain text.
+        assert "token-1" not in headers.get_cache_key()
+
+
 class TestK8sClient:
     @pytest.fixture
     def k8s_client(self):
         with patch("services.k8s.K8sClient.__init__", return_value=None):
             k8s_client = K8sClient()
             k8s_client.client_ssl_context = None
+            k8s_client.k8s_auth_headers = K8sAuthHeaders(
+                x_cluster_url="https://api.example.com",
+                x_cluster_certificate_authority_data="abc",
+                x_k8s_authorization="test-token",
+            )
             return k8s_client
 
     def test_model_dump(self, k8s_client):
@@ -537,7 +711,7 @@ class TestK8sClient:
 
         # then
         if data_sanitizer:
-            data_sanitizer.sanitize.assert_called_once_with(raw_data)
+            data_sanitizer.sanitize.assert_called_once_with(raw_data, k8s_client.get_api_server())
         assert result == expected_result
 
     @pytest.mark.asyncio
@@ -799,6 +973,250 @@ class TestK8sClient:
                 # when
                 await k8s_client.execute_get_api_request("/test/uri")
 
+    def mock_paged_responses(self, aio_mock_response, k8s_client, pages: list[dict]) -> None:
+        """Mock the responses of the pages, which are linked by their continue tokens."""
+        for i, page in enumerate(pages):
+            continue_token = pages[i - 1]["metadata"]["continue"] if i > 0 else ""
+            aio_mock_response.get(
+                get_url_for_paged_request(f"{k8s_client.k8s_auth_headers.x_cluster_url}/test/uri", continue_token),
+                payload=page,
+                status=HTTPStatus.OK,
+            )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "test_description, data_sanitizer, expected_pages",
+        [
+            (
+                "should yield the items of all pages, beyond the pagination limit",
+                None,
+                [[{"data": "page-1"}], [{"data": "page-2"}], [{"data": "page-3"}]],
+            ),
+            (
+                "should sanitize each page",
+                Mock(sanitize=Mock(side_effect=lambda items, cluster: [{"sanitized": item["data"]} for item in items])),
+                [[{"sanitized": "page-1"}], [{"sanitized": "page-2"}], [{"sanitized": "page-3"}]],
+            ),
+        ],
+    )
+    async def test_aiter_api_request_pages(self, k8s_client, test_description, data_sanitizer, expected_pages):
+        # given
+        k8s_client.k8s_auth_headers = K8sAuthHeaders(
+            x_cluster_url="https://api.example.com",
+            x_cluster_certificate_authority_data="abc",
+            x_k8s_authorization="test-token",
+        )
+        k8s_client.data_sanitizer = data_sanitizer
+        pages = [
+            {"items": [{"data": "page-1"}], "metadata": {"continue": "token-1"}},
+            {"items": [{"data": "page-2"}], "metadata": {"continue": "token-2"}},
+            {"items": [{"data": "page-3"}], "metadata": {}},
+        ]
+
+        with aioresponses() as aio_mock_response:
+            self.mock_paged_responses(aio_mock_response, k8s_client, pages)
+
+            # when
+            result = [page async for page in k8s_client.aiter_api_request_pages("/test/uri")]
+
+        # then
+        assert result == expected_pages, test_description
+        if data_sanitizer:
+            assert data_sanitizer.sanitize.call_count == len(pages)
+
+    @pytest.mark.asyncio
+    async def test_aiter_api_request_pages_stops_requesting_pages(self, k8s_client):
+        # given
+        k8s_client.k8s_auth_headers = K8sAuthHeaders(
+            x_cluster_url="https://api.example.com",
+            x_cluster_certificate_authority_data="abc",
+            x_k8s_authorization="test-token",
+        )
+        k8s_client.data_sanitizer = None
+
+        with aioresponses() as aio_mock_response:
+            # only the first page is mocked, so requesting the second page would fail.
+            self.mock_paged_responses(
+                aio_mock_response,
+                k8s_client,
+                [{"items": [{"data": "page-1"}], "metadata": {"continue": "token-1"}}],
+            )
+
+            # when
+            pages = k8s_client.aiter_api_request_pages("/test/uri")
+            first_page = await anext(pages)
+            await pages.aclose()
+
+        # then
+        assert first_page == [{"data": "page-1"}]
+        assert len(aio_mock_response.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_aiter_api_request_pages_yields_object(self, k8s_client):
+        # given
+        k8s_client.k8s_auth_headers = K8sAuthHeaders(
+            x_cluster_url="https://api.example.com",
+            x_cluster_certificate_authority_data="abc",
+            x_k8s_authorization="test-token",
+        )
+        k8s_client.data_sanitizer = None
+        pod = {"kind": "Pod", "metadata": {"name": "my-pod"}}
+
+        with aioresponses() as aio_mock_response:
+            self.mock_paged_responses(aio_mock_response, k8s_client, [pod])
+
+            # when
+            result = [page async for page in k8s_client.aiter_api_request_pages("/test/uri")]
+
+        # then
+        assert result == [pod]
+
+    @pytest.fixture
+    def cached_k8s_client(self, k8s_client):
+        k8s_client.k8s_auth_headers = K8sAuthHeaders(
+            x_cluster_url="https://api.example.com",
+            x_cluster_certificate_authority_data="abc",
+            x_k8s_authorization="test-token",
+        )
+        k8s_client.data_sanitizer = Mock(sanitize=Mock(side_effect=lambda data, cluster: data))
+        return k8s_client
+
+    @pytest.mark.asyncio
+    async def test_execute_get_api_request_caches_sanitized_result(self, cached_k8s_client):
+        # given
+        url = get_url_for_paged_request("https://api.example.com/api/v1/pods", "")
+        pods = [{"kind": "Pod", "metadata": {"name": "my-pod"}}]
+
+        with aioresponses() as aio_mock_response:
+            # the response is mocked once, so a second API call would fail.
+            aio_mock_response.get(url, payload={"items": pods, "metadata": {}})
+
+            # when
+            first_result = await cached_k8s_client.execute_get_api_request("api/v1/pods")
+            second_result = await cached_k8s_client.execute_get_api_request("api/v1/pods")
+
+        # then
+        assert first_result == second_result == pods
+        cached_k8s_client.data_sanitizer.sanitize.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_execute_get_api_request_coalesces_concurrent_requests(self, cached_k8s_client):
+        # given
+        url = get_url_for_paged_request("https://api.example.com/api/v1/pods", "")
+        pods = [{"kind": "Pod", "metadata": {"name": "my-pod"}}]
+        concurrent_requests = 5
+
+        with aioresponses() as aio_mock_response:
+            aio_mock_response.get(url, payload={"items": pods, "metadata": {}})
+
+            # when
+            results = await asyncio.gather(
+                *(cached_k8s_client.execute_get_api_request("api/v1/pods") for _ in range(concurrent_requests))
+            )
+
+        # then
+        assert results == [pods] * concurrent_requests
+        cached_k8s_client.data_sanitizer.sanitize.assert_called_once()
+        assert not _in_flight_get_requests
+
+    @pytest.mark.asyncio
+    async def test_execute_get_api_request_caches_per_identity(self, cached_k8s_client):
+        # given
+        url = get_url_for_paged_request("https://api.example.com/api/v1/pods", "")
+        other_k8s_client = K8sClient.__new__(K8sClient)
+        other_k8s_client.k8s_auth_headers = cached_k8s_client.k8s_auth_headers.model_copy(
+            update={"x_k8s_authorization": "other-token"}
+        )
+        other_k8s_client.client_ssl_context = None
+        other_k8s_client.data_sanitizer = cached_k8s_client.data_sanitizer
+
+        with aioresponses() as aio_mock_response:
+            aio_mock_response.get(url, payload={"items": [{"name": "pod-1"}], "metadata": {}})
+            aio_mock_response.get(url, payload={"items": [{"name": "pod-2"}], "metadata": {}})
+
+            # when
+            result = await cached_k8s_client.execute_get_api_request("api/v1/pods")
+            other_result = await other_k8s_client.execute_get_api_request("api/v1/pods")
+
+        # then
+        assert result == [{"name": "pod-1"}]
+        assert other_result == [{"name": "pod-2"}]
+
+    @pytest.mark.asyncio
+    async def test_execute_get_api_request_does_not_cache_errors(self, cached_k8s_client):
+        # given
+        url = get_url_for_paged_request("https://api.example.com/api/v1/pods", "")
+
+        with aioresponses() as aio_mock_response:
+            aio_mock_response.get(url, body="Internal error", status=HTTPStatus.INTERNAL_SERVER_ERROR)
+            aio_mock_response.get(url, payload={"items": [{"name": "pod"}], "metadata": {}})
+
+            # when
+            with pytest.raises(K8sClientError):
+                await cached_k8s_client.execute_get_api_request("api/v1/pods")
+            result = await cached_k8s_client.execute_get_api_request("api/v1/pods")
+
+        # then
+        assert result == [{"name": "pod"}]
+
+    @pytest.mark.asyncio
+    async def test_execute_get_api_request_with_budget_stops_requesting_pages(self, cached_k8s_client):
+        # given
+        pod = {"kind": "Pod", "metadata": {"name": "pod"}}
+        base_url = "https://api.example.com/api/v1/pods"
+
+        with aioresponses() as aio_mock_response:
+            # only two pages are mocked, so requesting the third page would fail.
+            aio_mock_response.get(
+                get_url_for_paged_request(base_url, ""),
+                payload={"items": [pod, pod], "metadata": {"continue": "token-1"}},
+            )
+            aio_mock_response.get(
+                get_url_for_paged_request(base_url, "token-1"),
+                payload={"items": [pod, pod], "metadata": {"continue": "token-2"}},
+            )
+
+            # when
+            result = await cached_k8s_client.execute_get_api_request("api/v1/pods", max_bytes=3 * len(json.dumps(pod)))
+
+        # then
+        assert result["items"] == [pod, pod, pod]
+        assert result["truncated"] is True
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "test_description, items_count, expected_offloaded",
+        [
+            ("should sanitize a full page of pods in the process pool", K8S_API_PAGINATION_LIMIT, True),
+            ("should sanitize a small page in process", 2, False),
+        ],
+    )
+    async def test_execute_get_api_request_sanitizes_large_pages_in_process_pool(
+        self, k8s_client, test_description, items_count, expected_offloaded
+    ):
+        # given
+        DataSanitizer._instances = {}
+        k8s_client.data_sanitizer = DataSanitizer()
+        pods = [sample_k8s_running_pod(i) for i in range(items_count)]
+        url = get_url_for_paged_request("https://api.example.com/api/v1/pods", "")
+
+        # the workers are replaced by threads, which run the same sanitization of the chunks.
+        with (
+            ThreadPoolExecutor(max_workers=2) as executor,
+            patch("services.data_sanitizer.DATA_SANITIZER_PROCESS_POOL_ENABLED", True),
+            patch.object(SanitizerProcessPool, "get_executor", return_value=executor) as mock_get_executor,
+            aioresponses() as aio_mock_response,
+        ):
+            aio_mock_response.get(url, payload={"items": pods, "metadata": {}})
+
+            # when
+            result = await k8s_client.execute_get_api_request("api/v1/pods")
+
+        # then
+        assert mock_get_executor.called is expected_offloaded, test_description
+        k8s_client.data_sanitizer.clear_cache()
+        assert result == k8s_client.data_sanitizer.sanitize(pods), test_description
+
     @pytest.mark.parametrize(
         "test_description, data_sanitizer, raw_data, expected_result",
         [
@@ -834,9 +1252,76 @@ class TestK8sClient:
 
         # then
         if data_sanitizer:
-            data_sanitizer.sanitize.assert_called_once_with(raw_data)
+            data_sanitizer.sanitize.assert_called_once_with(raw_data, k8s_client.get_api_server())
         assert result == expected_result
 
+    @pytest.mark.parametrize(
+        "test_description, method, args, expected_kind, expected_namespace, expected_field_selector",
+        [
+            (
+                "should list the pods which are not running",
+                "list_not_running_pods",
+                ("default",),
+                "Pod",
+                "default",
+                "status.phase!=Running",
+            ),
+            (
+                "should list the warning events",
+                "list_k8s_warning_events",
+                ("",),
+                "Event",
+                "",
+                "type=Warning",
+            ),
+            (
+                "should list the events of the resource",
+                "list_k8s_events_for_resource",
+                ("Deployment", "my-app", "default"),
+                "Event",
+                "default",
+                "involvedObject.kind=Deployment,involvedObject.name=my-app",
+            ),
+            (
+                "should escape the name in the field selector of the events of the resource",
+                "list_k8s_events_for_resource",
+                ("Pod", "pod,type=Normal", "default"),
+                "Event",
+                "default",
+                "involvedObject.kind=Pod,involvedObject.name=pod\\,type\\=Normal",
+            ),
+        ],
+    )
+    def test_list_methods_push_down_field_selectors(
+        self,
+        k8s_client,
+        test_description,
+        method,
+        args,
+        expected_kind,
+        expected_namespace,
+        expected_field_selector,
+    ):
+        # given
+        k8s_client.data_sanitizer = None
+        mock_dynamic_client = Mock()
+        mock_item = Mock()
+        mock_item.to_dict.return_value = {"kind": expected_kind}
+        mock_dynamic_client.resources.get.return_value.get.return_value.items = [mock_item]
+        k8s_client._dynamic_client = mock_dynamic_client
+
+        # when
+        result = getattr(k8s_client, method)(*args)
+
+        # then
+        assert result == [{"kind": expected_kind}], test_description
+        mock_dynamic_client.resources.get.assert_called_once_with(api_version="v1", kind=expected_kind)
+        mock_dynamic_client.resources.get.return_value.get.assert_called_once_with(
+            namespace=expected_namespace,
+            field_selector=expected_field_selector,
+            label_selector=None,
+        )
+
     @pytest.mark.parametrize(
         "test_description, data_sanitizer, raw_data, expected_result",
         [
@@ -867,18 +1352,18 @@ class TestK8sClient:
 
         # then
         if data_sanitizer:
-            data_sanitizer.sanitize.assert_called_once_with(raw_data)
+            data_sanitizer.sanitize.assert_called_once_with(raw_data, k8s_client.get_api_server())
         assert result == expected_result
 
     @pytest.mark.parametrize(
         "test_description, data_sanitizer, raw_data, raw_events, expected_result",
         [
             (
-                "should sanitize data when sanitizer is set",
+                "should not sanitize the already sanitized resource and events again",
                 Mock(sanitize=Mock(return_value={"sanitized": "data", "events": []})),
                 {"raw": "data"},
                 [{"involvedObject": "test", "event": "data"}],
-                {"sanitized": "data", "events": []},
+                {"raw": "data", "events": [{"event": "data"}]},
             ),
             (
                 "should return raw data when sanitizer is not set",
@@ -914,8 +1399,10 @@ class TestK8sClient:
 
         # then
         if data_sanitizer:
-            data_sanitizer.sanitize.assert_called_once()
+            data_sanitizer.sanitize.assert_not_called()
         assert result == expected_result
+        # the events may be shared with other callers, so they must not be modified.
+        assert raw_events == [{"involvedObject": "test", "event": "data"}]
 
     @pytest.mark.parametrize(
         "test_description, data_sanitizer, raw_data, expected_result",
@@ -952,9 +1439,92 @@ class TestK8sClient:
 
         # then
         if data_sanitizer:
-            data_sanitizer.sanitize.assert_called_once_with(raw_data)
+            data_sanitizer.sanitize.assert_called_once_with(raw_data, k8s_client.get_api_server())
         assert result == expected_result
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "async_method, sync_method, args",
+        [
+            ("alist_resources", "list_resources", ("v1", "Pod", "default", "status.phase=Failed", "app=test")),
+            ("aget_resource", "get_resource", ("v1", "Pod", "pod", "default")),
+            ("aget_resource_version", "get_resource_version", ("Function",)),
+            ("alist_not_running_pods", "list_not_running_pods", ("default",)),
+            ("alist_k8s_events", "list_k8s_events", ("default", "type=Warning", None)),
+            ("alist_k8s_warning_events", "list_k8s_warning_events", ("default",)),
+            ("alist_k8s_events_for_resource", "list_k8s_events_for_resource", ("Pod", "pod", "default")),
+        ],
+    )
+    async def test_async_variants_run_in_thread_pool(self, k8s_client, async_method, sync_method, args):
+        # given
+        threads = []
+
+        def blocking_call(*_):
+            threads.append(threading.current_thread().name)
+            return {"kind": "result"}
+
+        with (
+            patch.object(K8sClient, sync_method, side_effect=blocking_call) as mock_sync_method,
+            patch.object(K8sClient, "aget_api_discovery", return_value=None),
+        ):
+            # when
+            result = await getattr(k8s_client, async_method)(*args)
+
+        # then
+        assert result == {"kind": "result"}
+        mock_sync_method.assert_called_once_with(*args)
+        assert threads[0].startswith("k8s-client")
+
+    @pytest.mark.asyncio
+    async def test_adescribe_resource(self, k8s_client):
+        # given
+        k8s_client.data_sanitizer = None
+        event = {"involvedObject": {"kind": "Pod", "name": "pod"}, "reason": "BackOff"}
+
+        with (
+            patch.object(K8sClient, "aget_resource", return_value={"kind": "Pod"}) as mock_get_resource,
+            patch.object(K8sClient, "alist_k8s_events_for_resource", return_value=[event]) as mock_list_events,
+        ):
+            # when
+            result = await k8s_client.adescribe_resource("v1", "Pod", "pod", "default")
+
+        # then
+        assert result == {"kind": "Pod", "events": [{"reason": "BackOff"}]}
+        # the events may be shared with an informer, so they must not be modified.
+        assert "involvedObject" in event
+        mock_get_resource.assert_awaited_once_with("v1", "Pod", "pod", "default")
+        mock_list_events.assert_awaited_once_with("Pod", "pod", "default")
+
+    @pytest.mark.asyncio
+    async def test_async_variants_propagate_errors(self, k8s_client):
+        with (
+            patch.object(K8sClient, "get_resource_version", side_effect=ValueError("not found")),
+            patch.object(K8sClient, "aget_api_discovery", return_value=None),
+            pytest.raises(ValueError, match="not found"),
+        ):
+            await k8s_client.aget_resource_version("Unknown")
+
+    @pytest.mark.asyncio
+    async def test_async_variants_run_concurrently(self, k8s_client):
+        # given
+        conversations = 5
+        k8s_client.data_sanitizer = None
+        # the calls only pass the barrier together, so calls blocking the event loop would time out.
+        barrier = threading.Barrier(conversations, timeout=5)
+
+        def list_events(**_) -> Mock:
+            barrier.wait()
+            return Mock(items=[])
+
+        k8s_client._dynamic_client = Mock()
+        k8s_client._dynamic_client.resources.get.return_value.get.side_effect = list_events
+
+        # when
+        results = await asyncio.gather(*(k8s_client.alist_k8s_events("default") for _ in range(conversations)))
+
+        # then
+        assert results == [[]] * conversations
+
     @patch("services.k8s.K8sClient.__init__", return_value=None)
     @pytest.mark.asyncio
     @pytest.mark.parametrize(
@@ -975,7 +1545,10 @@ class TestK8sClient:
     async def test_get_group_version(self, mock_init, test_description, group_version, expected_uri):
         # given
         k8s_client = K8sClient(k8s_auth_headers=None, data_sanitizer=None)
-        with patch("services.k8s.K8sClient.execute_get_api_request") as mock_execute_get_api_request:
+        with (
+            patch("services.k8s.K8sClient.execute_get_api_request") as mock_execute_get_api_request,
+            patch("services.k8s.K8sClient.aget_api_discovery", return_value=None),
+        ):
             mock_execute_get_api_request.return_value = {}
 
             # when
@@ -1131,3 +1704,78 @@ class TestK8sClient:
 
             # then
             assert result == expected_sanitized_logs
+
+
+@pytest.mark.parametrize(
+    "value, expected_value",
+    [
+        ("my-pod", "my-pod"),
+        ("a,b", "a\\,b"),
+        ("a=b", "a\\=b"),
+        ("a\\b", "a\\\\b"),
+    ],
+)
+def test_escape_field_selector_value(value, expected_value):
+    assert escape_field_selector_value(value) == expected_value
+
+
+async def pages_of(*pages: dict | list[dict]) -> AsyncGenerator[dict | list[dict]]:
+    for page in pages:
+        yield page
+
+
+POD = {"kind": "Pod", "metadata": {"name": "my-pod"}}
+POD_SIZE = len(json.dumps(POD))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "description, pages, max_bytes, expected_result",
+    [
+        (
+            "should return the object of a non-list response",
+            [POD],
+            1,
+            POD,
+        ),
+        (
+            "should return all items within the budget",
+            [[POD, POD], [POD]],
+            3 * POD_SIZE,
+            [POD, POD, POD],
+        ),
+        (
+            "should return the empty list",
+            [[]],
+            POD_SIZE,
+            [],
+        ),
+        (
+            "should truncate the items exceeding the budget",
+            [[POD, POD], [POD, POD]],
+            3 * POD_SIZE,
+            {
+                "items": [POD, POD, POD],
+                "truncated": True,
+                "note": "Only the first 3 items are returned, because the response is too large. "
+                "Refine the query to get the remaining items, "
+                "for example with a namespace, a labelSelector or a fieldSelector.",
+            },
+        ),
+        (
+            "should return at least one item",
+            [[POD, POD]],
+            1,
+            {
+                "items": [POD],
+                "truncated": True,
+                "note": "Only the first 1 items are returned, because the response is too large. "
+                "Refine the query to get the remaining items, "
+                "for example with a namespace, a labelSelector or a fieldSelector.",
+            },
+        ),
+    ],
+)
+async def test_acollect_pages_within_budget(description, pages, max_bytes, expected_result):
+    result = await acollect_pages_within_budget(pages_of(*pages), max_bytes)
+    assert result == expected_result, description
@@ -0,0 +1,318 @@
+import asyncio
+from http import HTTPStatus
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.k8s import K8sAuthHeaders, K8sClient
+from services.k8s_discovery import APIDiscovery, K8sDiscoveryCache, parse_aggregated_discovery
+from services.k8s_resource_discovery import K8sResourceDiscovery
+from services.k8s_sessions import K8sSessionPool
+from services.redis import Redis
+
+
+def discovery_resource(resource: str, kind: str, scope: str = "Namespaced") -> dict:
+    return {
+        "resource": resource,
+        "responseKind": {"kind": kind},
+        "scope": scope,
+        "singularResource": kind.lower(),
+        "verbs": ["get", "list"],
+        "subresources": [{"subresource": "status", "responseKind": {"kind": kind}, "verbs": ["get"]}],
+    }
+
+
+def discovery_document(groups: list[tuple[str, list[tuple[str, list[dict]]]]]) -> dict:
+    return {
+        "kind": "APIGroupDiscoveryList",
+        "apiVersion": "apidiscovery.k8s.io/v2",
+        "items": [
+            {
+                "metadata": {"name": name} if name else {},
+                "versions": [{"version": version, "resources": resources} for version, resources in versions],
+            }
+            for name, versions in groups
+        ],
+    }
+
+
+CORE_DISCOVERY = discovery_document(
+    [("", [("v1", [discovery_resource("pods", "Pod"), discovery_resource("nodes", "Node", "Cluster")])])]
+)
+APIS_DISCOVERY = discovery_document(
+    [
+        ("apps", [("v1", [discovery_resource("deployments", "Deployment")])]),
+        (
+            "autoscaling",
+            [
+                ("v2", [discovery_resource("horizontalpodautoscalers", "HorizontalPodAutoscaler")]),
+                ("v1", [discovery_resource("horizontalpodautoscalers", "HorizontalPodAutoscaler")]),
+            ],
+        ),
+    ]
+)
+FUNCTION_GROUP = ("serverless.kyma-project.io", [("v1alpha2", [discovery_resource("functions", "Function")])])
+
+
+class StubAPIServer:
+    """A local Kubernetes API server stub, which serves the discovery documents with ETags."""
+
+    def __init__(self):
+        self.documents = {"api": ('"core-1"', CORE_DISCOVERY), "apis": ('"apis-1"', APIS_DISCOVERY)}
+        self.requests: list[tuple[str, str]] = []
+        self.accept_headers: list[str] = []
+        self.server: TestServer | None = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.path.strip("/")
+        etag, document = self.documents[path]
+        if_none_match = request.headers.get("If-None-Match", "")
+        self.requests.append((path, if_none_match))
+        self.accept_headers.append(request.headers.get("Accept", ""))
+        if if_none_match and if_none_match == etag:
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers={"ETag": etag})
+        return web.json_response(document, headers={"ETag": etag})
+
+    async def astart(self) -> str:
+        app = web.Application()
+        app.router.add_get("/api", self.handle)
+        app.router.add_get("/apis", self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return str(self.server.make_url("")).rstrip("/")
+
+    async def aclose(self) -> None:
+        if self.server:
+            await self.server.close()
+
+
+def create_k8s_client(cluster_url: str) -> K8sClient:
+    with patch("services.k8s.K8sClient.__init__", return_value=None):
+        k8s_client = K8sClient()
+    k8s_client.k8s_auth_headers = K8sAuthHeaders(
+        x_cluster_url=cluster_url,
+        x_cluster_certificate_authority_data="abc",
+        x_k8s_authorization="test-token",
+    )
+    k8s_client.client_ssl_context = None
+    k8s_client.data_sanitizer = None
+    return k8s_client
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_singletons():
+    K8sDiscoveryCache._reset_for_tests()
+    K8sSessionPool._reset_for_tests()
+    yield
+    await K8sSessionPool().aclose()
+    K8sDiscoveryCache._reset_for_tests()
+    K8sSessionPool._reset_for_tests()
+
+
+@pytest_asyncio.fixture
+async def stub_api_server():
+    server = StubAPIServer()
+    cluster_url = await server.astart()
+    yield server, create_k8s_client(cluster_url)
+    await server.aclose()
+
+
+def test_parse_aggregated_discovery():
+    result = parse_aggregated_discovery(APIS_DISCOVERY)
+
+    assert list(result) == ["apps/v1", "autoscaling/v2", "autoscaling/v1"]
+    assert result["apps/v1"] == [
+        {
+            "name": "deployments",
+            "singularName": "deployment",
+            "namespaced": True,
+            "kind": "Deployment",
+            "verbs": ["get", "list"],
+            "shortNames": [],
+            "categories": [],
+        }
+    ]
+    assert list(parse_aggregated_discovery(CORE_DISCOVERY)) == ["v1"]
+
+
+class TestK8sDiscoveryCache:
+    @pytest.mark.asyncio
+    async def test_aget_indexes_discovery(self, stub_api_server):
+        server, k8s_client = stub_api_server
+
+        discovery = await K8sDiscoveryCache().aget(k8s_client)
+
+        assert discovery is not None
+        assert discovery.get_group_version("Pod") == "v1"
+        assert discovery.get_group_version("Deployment") == "apps/v1"
+        # the first version of a group is the preferred one.
+        assert discovery.get_group_version("HorizontalPodAutoscaler") == "autoscaling/v2"
+        assert discovery.get_group_version("Unknown") is None
+        assert [r["name"] for r in discovery.get_resources("v1") or []] == ["pods", "nodes"]
+        assert discovery.get_resources("apps/v2") is None
+        assert all("as=APIGroupDiscoveryList" in accept for accept in server.accept_headers)
+
+    @pytest.mark.asyncio
+    async def test_aget_serves_discovery_from_memory_within_ttl(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        cache = K8sDiscoveryCache()
+
+        # concurrent calls share the discovery requests.
+        results = await asyncio.gather(*(cache.aget(k8s_client) for _ in range(5)))
+        cached_discovery = await cache.aget(create_k8s_client(k8s_client.get_api_server()))
+
+        assert all(result is results[0] for result in results)
+        assert cached_discovery is results[0]
+        assert sorted(server.requests) == [("api", ""), ("apis", "")]
+
+    @pytest.mark.asyncio
+    async def test_aget_revalidates_discovery_with_etags(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        cache = K8sDiscoveryCache(ttl=0)
+        discovery = await cache.aget(k8s_client)
+
+        # unchanged documents are answered with 304 Not Modified.
+        assert await cache.aget(k8s_client) is discovery
+        assert sorted(server.requests[2:]) == [("api", '"core-1"'), ("apis", '"apis-1"')]
+
+        # a new API group is discovered, when its document changed.
+        server.documents["apis"] = ('"apis-2"', discovery_document([FUNCTION_GROUP]))
+        changed_discovery = await cache.aget(k8s_client)
+
+        assert changed_discovery is not None
+        assert changed_discovery is not discovery
+        assert changed_discovery.get_group_version("Function") == "serverless.kyma-project.io/v1alpha2"
+        assert changed_discovery.get_group_version("Pod") == "v1"
+
+    @pytest.mark.asyncio
+    async def test_aget_remembers_api_servers_without_aggregated_discovery(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        server.documents["apis"] = ("", {"kind": "APIGroupList", "groups": []})
+        cache = K8sDiscoveryCache()
+
+        assert await cache.aget(k8s_client) is None
+        assert await cache.aget(k8s_client) is None
+        assert len(server.requests) == len(server.documents)
+
+    @pytest.mark.asyncio
+    async def test_aget_shares_discovery_in_redis(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        stored: dict[str, str] = {}
+        connection = Mock(
+            get=AsyncMock(side_effect=lambda key: stored.get(key)),
+            set=AsyncMock(side_effect=lambda key, value, ex: stored.__setitem__(key, value)),
+        )
+        Redis._reset_for_tests()
+        Redis(connection_factory=lambda: connection)
+
+        try:
+            await K8sDiscoveryCache(redis_enabled=True).aget(k8s_client)
+            # a new process loads the documents from Redis and only revalidates them.
+            K8sDiscoveryCache._reset_for_tests()
+            discovery = await K8sDiscoveryCache(redis_enabled=True).aget(k8s_client)
+        finally:
+            Redis._reset_for_tests()
+
+        assert discovery is not None
+        assert discovery.get_group_version("Deployment") == "apps/v1"
+        assert len(stored) == 1
+        assert sorted(server.requests[2:]) == [("api", '"core-1"'), ("apis", '"apis-1"')]
+        connection.set.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_aget_raises_on_failed_discovery(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        cache = K8sDiscoveryCache()
+
+        with (
+            patch.object(
+                K8sClient, "aget_aggregated_discovery", side_effect=[("", None), Exception("connection refused")]
+            ),
+            pytest.raises(Exception, match="connection refused"),
+        ):
+            await cache.aget(k8s_client)
+
+        # errors are not cached.
+        assert await cache.aget(k8s_client) is not None
+
+    def test_api_discovery_json_round_trip(self):
+        discovery = APIDiscovery({"apis": ('"apis-1"', parse_aggregated_discovery(APIS_DISCOVERY))})
+
+        result = APIDiscovery.from_json(discovery.to_json())
+
+        assert result.documents == discovery.documents
+        assert result.get_group_version("Deployment") == "apps/v1"
+
+    def test_api_discovery_keeps_resources_by_kind(self):
+        discovery = APIDiscovery({"api": ('"api-1"', parse_aggregated_discovery(CORE_DISCOVERY))})
+        build_index = Mock(side_effect=lambda resources: {r["kind"].lower(): r["name"] for r in resources})
+
+        result = discovery.get_resources_by_kind("v1", build_index)
+
+        assert result == {"pod": "pods", "node": "nodes"}
+        assert discovery.get_resources_by_kind("v1", build_index) is result
+        assert discovery.get_resources_by_kind("apps/v1", build_index) is None
+        build_index.assert_called_once_with(discovery.get_resources("v1"))
+
+
+class TestK8sClientWithDiscovery:
+    @pytest.mark.asyncio
+    async def test_get_resource_kind_dynamic_uses_discovery(self, stub_api_server):
+        _, k8s_client = stub_api_server
+        resource_discovery = K8sResourceDiscovery(k8s_client)
+
+        with (
+            patch.object(K8sClient, "execute_get_api_request") as mock_execute_get_api_request,
+            patch.object(
+                K8sResourceDiscovery,
+                "_index_raw_resource_kinds",
+                wraps=K8sResourceDiscovery._index_raw_resource_kinds,
+            ) as mock_index_raw_resource_kinds,
+        ):
+            deployment = await resource_discovery.get_resource_kind_dynamic("apps/v1", "deployment")
+            assert await resource_discovery.get_resource_kind_dynamic("apps/v1", "Deployment") is deployment
+
+        assert deployment.name == "deployments"
+        # the resources are only validated once per discovery of the cluster.
+        mock_index_raw_resource_kinds.assert_called_once()
+        mock_execute_get_api_request.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_aget_resource_version_uses_discovery(self, stub_api_server):
+        _, k8s_client = stub_api_server
+
+        with patch.object(K8sClient, "get_resource_version") as mock_get_resource_version:
+            assert await k8s_client.aget_resource_version("Deployment") == "apps/v1"
+            with pytest.raises(ValueError, match="Failed to get resource version for kind 'Function'"):
+                await k8s_client.aget_resource_version("Function")
+
+        mock_get_resource_version.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_group_version_uses_discovery(self, stub_api_server):
+        _, k8s_client = stub_api_server
+
+        with patch.object(K8sClient, "execute_get_api_request", return_value={}) as mock_execute_get_api_request:
+            result = await k8s_client.get_group_version("apps/v1")
+            await k8s_client.get_group_version("serverless.kyma-project.io/v1alpha2")
+
+        assert result["groupVersion"] == "apps/v1"
+        assert [r["kind"] for r in result["resources"]] == ["Deployment"]
+        # unknown group versions are requested from the API server.
+        mock_execute_get_api_request.assert_called_once_with("apis/serverless.kyma-project.io/v1alpha2")
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_discovery_fails(self, stub_api_server):
+        _, k8s_client = stub_api_server
+
+        with (
+            patch.object(K8sClient, "aget_aggregated_discovery", side_effect=Exception("connection refused")),
+            patch.object(K8sClient, "get_resource_version", return_value="apps/v1") as mock_get_resource_version,
+        ):
+            assert await k8s_client.aget_api_discovery() is None
+            assert await k8s_client.aget_resource_version("Deployment") == "apps/v1"
+
+        mock_get_resource_version.assert_called_once_with("Deployment")
@@ -0,0 +1,329 @@
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Callable
+from http import HTTPStatus
+from unittest.mock import Mock, patch
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.k8s import K8sAuthHeaders, K8sClient
+from services.k8s_informers import EVENTS, PODS, K8sInformer, K8sInformerRegistry
+from services.k8s_sessions import K8sSessionPool
+
+
+def pod(name: str, phase: str, namespace: str = "default", resource_version: str = "1") -> dict:
+    return {
+        "metadata": {"name": name, "namespace": namespace, "uid": name, "resourceVersion": resource_version},
+        "status": {"phase": phase},
+    }
+
+
+def event(name: str, event_type: str, kind: str, object_name: str, namespace: str = "default") -> dict:
+    return {
+        "metadata": {"name": name, "namespace": namespace, "uid": name, "resourceVersion": "1"},
+        "type": event_type,
+        "involvedObject": {"kind": kind, "name": object_name},
+    }
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 2) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition was not met in time")
+        await asyncio.sleep(0.01)
+
+
+class StubAPIServer:
+    """A local Kubernetes API server stub, which lists a collection and streams the queued watch events."""
+
+    def __init__(self, items: list[dict], resource_version: str = "10"):
+        self.items = items
+        self.resource_version = resource_version
+        self.list_status = HTTPStatus.OK
+        self.list_requests = 0
+        self.watch_resource_versions: list[str] = []
+        self.watch_events: asyncio.Queue[dict | None] = asyncio.Queue()
+        self.server: TestServer | None = None
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        if request.query.get("watch") != "true":
+            self.list_requests += 1
+            if self.list_status != HTTPStatus.OK:
+                return web.json_response({"message": "forbidden"}, status=self.list_status)
+            return web.json_response(
+                {"items": self.items, "metadata": {"resourceVersion": self.resource_version}},
+            )
+
+        self.watch_resource_versions.append(request.query["resourceVersion"])
+        response = web.StreamResponse()
+        await response.prepare(request)
+        # a None event ends the watch, like the API server does after the watch timeout.
+        while (watch_event := await self.watch_events.get()) is not None:
+            await response.write(json.dumps(watch_event).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+    async def astart(self) -> str:
+        app = web.Application()
+        app.router.add_get("/api/v1/{resource}", self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return str(self.server.make_url("")).rstrip("/")
+
+    async def aclose(self) -> None:
+        # end any open watch, so that the server can shut down.
+        self.watch_events.put_nowait(None)
+        if self.server:
+            await self.server.close()
+
+
+def create_k8s_client(cluster_url: str) -> K8sClient:
+    with patch("services.k8s.K8sClient.__init__", return_value=None):
+        k8s_client = K8sClient()
+    k8s_client.k8s_auth_headers = K8sAuthHeaders(
+        x_cluster_url=cluster_url,
+        x_cluster_certificate_authority_data="abc",
+        x_k8s_authorization="test-token",
+    )
+    k8s_client.client_ssl_context = None
+    k8s_client.data_sanitizer = None
+    return k8s_client
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_singletons():
+    K8sInformerRegistry._reset_for_tests()
+    K8sSessionPool._reset_for_tests()
+    yield
+    await K8sInformerRegistry().aclose()
+    await K8sSessionPool().aclose()
+    K8sInformerRegistry._reset_for_tests()
+    K8sSessionPool._reset_for_tests()
+
+
+@pytest_asyncio.fixture
+async def stub_api_server():
+    server = StubAPIServer(
+        items=[pod("pod-1", "Running"), pod("pod-2", "Pending"), pod("pod-3", "Failed", namespace="kyma-system")]
+    )
+    cluster_url = await server.astart()
+    yield server, create_k8s_client(cluster_url)
+    await server.aclose()
+
+
+class TestK8sInformer:
+    @pytest.mark.asyncio
+    async def test_informer_lists_and_indexes_collection(self, stub_api_server):
+        server, k8s_client = stub_api_server
+
+        informer = K8sInformerRegistry().get_informer(k8s_client, PODS)
+        await wait_until(lambda: informer.synced)
+
+        assert sorted(informer.get_index_values("phase")) == ["Failed", "Pending", "Running"]
+        assert informer.get_by_index("phase", ["Pending", "Failed"]) == [server.items[1], server.items[2]]
+        assert informer.get_by_index("phase", ["Pending", "Failed"], "kyma-system") == [server.items[2]]
+        assert informer.get_by_index("phase", ["Unknown"]) == []
+        await wait_until(lambda: server.watch_resource_versions == ["10"])
+
+    @pytest.mark.asyncio
+    async def test_informer_applies_watch_events(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        informer = K8sInformerRegistry().get_informer(k8s_client, PODS)
+        await wait_until(lambda: informer.synced)
+
+        server.watch_events.put_nowait({"type": "ADDED", "object": pod("pod-4", "Pending", resource_version="11")})
+        server.watch_events.put_nowait({"type": "MODIFIED", "object": pod("pod-2", "Running", resource_version="12")})
+        server.watch_events.put_nowait({"type": "DELETED", "object": pod("pod-3", "Failed", resource_version="13")})
+        await wait_until(lambda: "Failed" not in informer.get_index_values("phase"))
+
+        assert [p["metadata"]["name"] for p in informer.get_by_index("phase", ["Pending"])] == ["pod-4"]
+        assert sorted(p["metadata"]["name"] for p in informer.get_by_index("phase", ["Running"])) == [
+            "pod-1",
+            "pod-2",
+        ]
+
+        # when the watch ends, it is resumed from the last seen resource version without listing again.
+        server.watch_events.put_nowait({"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "20"}}})
+        server.watch_events.put_nowait(None)
+        await wait_until(lambda: server.watch_resource_versions == ["10", "20"])
+
+        assert server.list_requests == 1
+
+    @pytest.mark.asyncio
+    async def test_informer_lists_again_when_resource_version_expired(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        informer = K8sInformerRegistry().get_informer(k8s_client, PODS)
+        await wait_until(lambda: informer.synced)
+        server.items = [pod("pod-5", "Pending")]
+        server.resource_version = "30"
+
+        server.watch_events.put_nowait({"type": "ERROR", "object": {"code": 410, "message": "too old"}})
+        await wait_until(lambda: server.watch_resource_versions == ["10", "30"])
+
+        assert server.list_requests == len(server.watch_resource_versions)
+        assert informer.get_by_index("phase", informer.get_index_values("phase")) == server.items
+
+    @pytest.mark.asyncio
+    async def test_informer_stops_when_access_is_denied(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        server.list_status = HTTPStatus.FORBIDDEN
+        registry = K8sInformerRegistry()
+
+        informer = registry.get_informer(k8s_client, PODS)
+        await wait_until(lambda: informer.stopped)
+
+        assert informer.failed
+        assert not informer.synced
+        # the failed informer is kept until the idle timeout, so that it is not restarted on every call.
+        assert registry.get_informer(k8s_client, PODS) is informer
+        assert server.list_requests == 1
+        with patch("services.k8s_informers.time.monotonic", return_value=time.monotonic() + registry.idle_timeout + 1):
+            assert registry.get_informer(k8s_client, PODS) is not informer
+
+    @pytest.mark.asyncio
+    async def test_informer_stops_when_idle(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        registry = K8sInformerRegistry(idle_timeout=0.2)
+        informer = registry.get_informer(k8s_client, PODS)
+        await wait_until(lambda: informer.synced)
+
+        await asyncio.sleep(0.3)
+        server.watch_events.put_nowait(None)
+        await wait_until(lambda: informer.stopped)
+
+        assert not informer.failed
+        assert registry.get_informer(k8s_client, PODS) is not informer
+        assert server.watch_resource_versions == ["10"]
+
+    @pytest.mark.asyncio
+    async def test_informer_sanitizes_lists_with_their_size(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        k8s_client.data_sanitizer = Mock(sanitize=Mock(side_effect=lambda data, cluster: {**data, "sanitized": True}))
+
+        async def sanitize_list(data_sanitizer, data, cluster, size_bytes):
+            return [{**item, "sanitized": True} for item in data]
+
+        with patch("services.k8s_informers.asanitize", side_effect=sanitize_list) as asanitize:
+            informer = K8sInformerRegistry().get_informer(k8s_client, PODS)
+            await wait_until(lambda: informer.synced)
+            server.watch_events.put_nowait({"type": "ADDED", "object": pod("pod-4", "Pending")})
+            await wait_until(lambda: "pod-4" in informer._objects)
+
+        # the listed objects are sanitized at once with the size of the list, and watched objects one by one.
+        asanitize.assert_called_once()
+        assert asanitize.call_args.args[:3] == (k8s_client.data_sanitizer, server.items, k8s_client.get_api_server())
+        assert asanitize.call_args.args[3] > len(json.dumps(server.items))
+        k8s_client.data_sanitizer.sanitize.assert_called_once_with(pod("pod-4", "Pending"), k8s_client.get_api_server())
+        assert all(obj["sanitized"] for obj in informer.get_by_index("phase", informer.get_index_values("phase")))
+
+    @pytest.mark.asyncio
+    async def test_informers_are_shared_per_identity(self, stub_api_server):
+        _, k8s_client = stub_api_server
+        registry = K8sInformerRegistry()
+        other_k8s_client = create_k8s_client(k8s_client.get_api_server())
+        other_k8s_client.k8s_auth_headers.x_k8s_authorization = "other-token"
+
+        informer = registry.get_informer(k8s_client, PODS)
+
+        assert registry.get_informer(create_k8s_client(k8s_client.get_api_server()), PODS) is informer
+        assert registry.get_informer(other_k8s_client, PODS) is not informer
+        assert registry.get_informer(k8s_client, EVENTS) is not informer
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_informers_are_stopped(self, stub_api_server):
+        server, k8s_client = stub_api_server
+        registry = K8sInformerRegistry(max_count=2)
+        pods_informer = registry.get_informer(k8s_client, PODS)
+        events_informer = registry.get_informer(k8s_client, EVENTS)
+        # using the pods informer makes the events informer the least recently used one.
+        assert registry.get_informer(k8s_client, PODS) is pods_informer
+
+        other_k8s_client = create_k8s_client(k8s_client.get_api_server())
+        other_k8s_client.k8s_auth_headers.x_k8s_authorization = "other-token"
+        other_informer = registry.get_informer(other_k8s_client, PODS)
+        await wait_until(lambda: events_informer.stopped)
+
+        assert list(registry._informers.values()) == [pods_informer, other_informer]
+        assert not pods_informer.stopped
+        # end the watches of the remaining informers, so that the stub API server can shut down.
+        server.watch_events.put_nowait(None)
+
+    @pytest.mark.asyncio
+    async def test_informer_of_other_event_loop_is_stopped_when_replaced(self, stub_api_server):
+        _, k8s_client = stub_api_server
+        registry = K8sInformerRegistry()
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever)
+        thread.start()
+        try:
+
+            async def get_informer() -> K8sInformer:
+                return registry.get_informer(k8s_client, PODS)
+
+            other_informer = asyncio.run_coroutine_threadsafe(get_informer(), other_loop).result()
+
+            informer = registry.get_informer(k8s_client, PODS)
+            await wait_until(lambda: other_informer.stopped)
+
+            assert informer is not other_informer
+            assert list(registry._informers.values()) == [informer]
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+
+class TestK8sClientWithInformers:
+    @pytest_asyncio.fixture
+    async def stub_events_api_server(self):
+        server = StubAPIServer(
+            items=[
+                event("event-1", "Warning", "Pod", "pod-1"),
+                event("event-2", "Normal", "Pod", "pod-1"),
+                event("event-3", "Warning", "Deployment", "app", namespace="kyma-system"),
+            ]
+        )
+        cluster_url = await server.astart()
+        yield server, create_k8s_client(cluster_url)
+        await server.aclose()
+
+    @pytest.mark.asyncio
+    async def test_events_are_served_from_informer_once_synced(self, stub_events_api_server):
+        server, k8s_client = stub_events_api_server
+
+        with (
+            patch("services.k8s.K8S_INFORMERS_ENABLED", True),
+            patch.object(K8sClient, "list_k8s_warning_events", return_value=["from-api"]) as mock_list_warnings,
+            patch.object(K8sClient, "list_k8s_events_for_resource", return_value=["from-api"]),
+        ):
+            # the informer is started by the first call, which falls back to the API server.
+            assert await k8s_client.alist_k8s_warning_events("") == ["from-api"]
+            informer = K8sInformerRegistry().get_informer(k8s_client, EVENTS)
+            await wait_until(lambda: informer.synced)
+
+            warning_events = await k8s_client.alist_k8s_warning_events("")
+            namespace_warning_events = await k8s_client.alist_k8s_warning_events("kyma-system")
+            pod_events = await k8s_client.alist_k8s_events_for_resource("Pod", "pod-1", "default")
+
+        mock_list_warnings.assert_called_once_with("")
+        assert warning_events == [server.items[0], server.items[2]]
+        assert namespace_warning_events == [server.items[2]]
+        assert pod_events == [server.items[0], server.items[1]]
+
+    @pytest.mark.asyncio
+    async def test_informers_are_not_used_when_disabled(self, stub_events_api_server):
+        _, k8s_client = stub_events_api_server
+
+        with (
+            patch("services.k8s.K8S_INFORMERS_ENABLED", False),
+            patch.object(K8sClient, "list_k8s_warning_events", return_value=["from-api"]),
+        ):
+            assert await k8s_client.alist_k8s_warning_events("") == ["from-api"]
+
+        assert K8sInformerRegistry()._informers == {}
@@ -1,9 +1,10 @@
+import re
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
 from services.k8s import IK8sClient
-from services.k8s_resource_discovery import K8sResourceDiscovery, ResourceKind
+from services.k8s_resource_discovery import K8sResourceDiscovery, K8sResourceRelation, ResourceKind
 
 
 class TestResourceKind:
@@ -106,6 +107,86 @@ class TestK8sResourceDiscovery:
         # Check if the resource relations are initialized correctly
         assert len(K8sResourceDiscovery.resource_relations) > 0
         assert len(K8sResourceDiscovery.api_resources) > 0
+        assert len(K8sResourceDiscovery.resource_kinds_index) > 0
+        assert K8sResourceDiscovery.resource_relations_matcher is not None
+
+    def test_resource_kinds_index_matches_linear_scan(self):
+        K8sResourceDiscovery.initialize()
+
+        for group in K8sResourceDiscovery.api_resources:
+            for version in group.versions:
+                for resource in version.resources:
+                    expected = K8sResourceDiscovery._find_resource_kind(resource.kind, version.resources)
+                    key = (version.group_version, resource.kind.lower())
+                    assert K8sResourceDiscovery.resource_kinds_index[key] == expected
+
+    @pytest.mark.parametrize(
+        "group_version, kind, expected_result",
+        [
+            ("serverless.kyma-project.io/v1alpha2", "Function", "Serverless"),
+            ("serverless.kyma-project.io/v1alpha2", "GitRepository", "Kyma"),
+            ("apps/v1", "Deployment", None),
+        ],
+    )
+    def test_compile_resource_relations_matches_first_relation(self, group_version, kind, expected_result):
+        relations = [
+            K8sResourceRelation.model_validate(relation)
+            for relation in [
+                {
+                    "groupVersionPattern": r"serverless\.kyma-project\.io/.*",
+                    "kindPattern": "Function",
+                    "relatedTo": "Serverless",
+                },
+                {"groupVersionPattern": r".*kyma-project\.io/.*", "kindPattern": ".*", "relatedTo": "Kyma"},
+            ]
+        ]
+
+        match = K8sResourceDiscovery._compile_resource_relations(relations).fullmatch(f"{group_version}\x00{kind}")
+
+        result = relations[int(match.lastgroup.removeprefix("relation"))].related_to if match else None
+        assert result == expected_result
+
+    def test_compile_resource_relations_without_relations(self):
+        assert K8sResourceDiscovery._compile_resource_relations([]).fullmatch("\x00") is None
+
+    def test_static_lookups_match_linear_scans(self):
+        K8sResourceDiscovery.initialize()
+        discovery = K8sResourceDiscovery(Mock(spec=IK8sClient))
+        lookups = [
+            (version.group_version, resource.kind)
+            for group in K8sResourceDiscovery.api_resources
+            for version in group.versions
+            for resource in version.resources
+        ]
+
+        def linear_scan(group_version: str, kind: str) -> tuple[ResourceKind | None, str]:
+            resource_kind = None
+            for group in K8sResourceDiscovery.api_resources:
+                for version in group.versions:
+                    if version.group_version == group_version:
+                        resource_kind = K8sResourceDiscovery._find_resource_kind(kind, version.resources)
+            related_to = next(
+                (
+                    relation.related_to
+                    for relation in K8sResourceDiscovery.resource_relations
+                    if re.fullmatch(relation.group_version_pattern, group_version)
+                    and re.fullmatch(relation.kind_pattern, kind)
+                ),
+                "Kubernetes",
+            )
+            return resource_kind, related_to
+
+        def indexed(group_version: str, kind: str) -> tuple[ResourceKind | None, str]:
+            return (
+                discovery.get_resource_kind_static(group_version, kind),
+                K8sResourceDiscovery.get_resource_related_to(group_version, kind),
+            )
+
+        expected = [linear_scan(*lookup) for lookup in lookups]
+
+        result = [indexed(*lookup) for lookup in lookups]
+
+        assert result == expected
 
     @pytest.mark.parametrize(
         "description, resource_kind, resources, expected_name",
@@ -316,6 +397,7 @@ class TestK8sResourceDiscovery:
         expect_error,
     ):
         k8s_client = Mock()
+        k8s_client.aget_api_discovery = AsyncMock(return_value=None)
         k8s_client.get_group_version = AsyncMock()
         k8s_client.get_group_version.return_value = api_response
         discovery = K8sResourceDiscovery(k8s_client)
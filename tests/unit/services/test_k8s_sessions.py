@@ -0,0 +1,229 @@
+import asyncio
+import base64
+import datetime
+import ipaddress
+import ssl
+import threading
+import time
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+from services.k8s import K8sAuthHeaders, K8sClient
+from services.k8s_sessions import K8sSessionPool
+
+
+@pytest.fixture(autouse=True)
+def reset_session_pool():
+    K8sSessionPool._reset_for_tests()
+    yield
+    K8sSessionPool._reset_for_tests()
+
+
+class TestK8sSessionPool:
+    @pytest.mark.asyncio
+    async def test_aget_session_reuses_session_per_cluster(self):
+        pool = K8sSessionPool()
+
+        session1 = await pool.aget_session("https://api.cluster1.example.com")
+        session2 = await pool.aget_session("https://api.cluster1.example.com")
+        other_session = await pool.aget_session("https://api.cluster2.example.com")
+
+        assert session1 is session2
+        assert other_session is not session1
+        await pool.aclose()
+        assert session1.closed
+        assert other_session.closed
+
+    @pytest.mark.asyncio
+    async def test_aget_session_replaces_closed_session(self):
+        pool = K8sSessionPool()
+        session = await pool.aget_session("https://api.cluster1.example.com")
+        await session.close()
+
+        new_session = await pool.aget_session("https://api.cluster1.example.com")
+
+        assert new_session is not session
+        assert not new_session.closed
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_idle_sessions_are_evicted(self):
+        pool = K8sSessionPool(idle_timeout=10)
+        idle_session = await pool.aget_session("https://api.cluster1.example.com")
+
+        with patch("services.k8s_sessions.time.monotonic", return_value=time.monotonic() + 11):
+            active_session = await pool.aget_session("https://api.cluster2.example.com")
+
+        assert idle_session.closed
+        assert not active_session.closed
+        assert await pool.aget_session("https://api.cluster1.example.com") is not idle_session
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_sessions_do_not_keep_cookies(self):
+        pool = K8sSessionPool()
+
+        session = await pool.aget_session("https://api.cluster1.example.com")
+
+        assert isinstance(session.cookie_jar, aiohttp.DummyCookieJar)
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_aget_session_closes_session_of_other_event_loop(self):
+        pool = K8sSessionPool()
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            old_session = asyncio.run_coroutine_threadsafe(
+                pool.aget_session("https://api.cluster1.example.com"), other_loop
+            ).result()
+
+            new_session = await pool.aget_session("https://api.cluster1.example.com")
+            # wait until the other event loop processed the close.
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop))
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+        assert new_session is not old_session
+        assert old_session.closed
+        await pool.aclose()
+
+    def test_aget_session_aborts_session_of_closed_event_loop(self):
+        pool = K8sSessionPool()
+        old_session = asyncio.run(pool.aget_session("https://api.cluster1.example.com"))
+
+        async def aget_new_session() -> None:
+            await pool.aget_session("https://api.cluster1.example.com")
+            await pool.aclose()
+
+        asyncio.run(aget_new_session())
+
+        assert old_session.closed
+
+    @pytest.mark.asyncio
+    async def test_connection_limits(self):
+        limit_per_host = 3
+        pool = K8sSessionPool(limit_per_host=limit_per_host, keepalive_timeout=15)
+
+        session = await pool.aget_session("https://api.cluster1.example.com")
+
+        assert isinstance(session.connector, aiohttp.TCPConnector)
+        assert session.connector.limit_per_host == limit_per_host
+        await pool.aclose()
+
+
+class TestK8sClientConnectionReuse:
+    @pytest_asyncio.fixture
+    async def stub_api_server(self, tmp_path):
+        """A local Kubernetes API server stub over TLS, which counts the accepted TCP connections."""
+        connections = set()
+
+        async def list_pods(request: web.Request) -> web.Response:
+            connections.add(request.transport.get_extra_info("peername"))
+            return web.json_response({"kind": "PodList", "items": [{"metadata": {"name": "pod"}}], "metadata": {}})
+
+        ca_cert_pem, server_cert_pem, server_key_pem = generate_server_certificates()
+        cert_file, key_file = tmp_path / "server.crt", tmp_path / "server.key"
+        cert_file.write_bytes(server_cert_pem)
+        key_file.write_bytes(server_key_pem)
+        server_ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ssl_context.load_cert_chain(cert_file, key_file)
+
+        app = web.Application()
+        app.router.add_get("/api/v1/pods", list_pods)
+        server = TestServer(app, ssl=server_ssl_context)
+        await server.start_server()
+        yield server, base64.b64encode(ca_cert_pem).decode(), connections
+        await server.close()
+
+    @pytest.mark.asyncio
+    async def test_k8s_clients_share_connection(self, stub_api_server):
+        server, ca_data, connections = stub_api_server
+        cluster_url = str(server.make_url("")).rstrip("/")
+        tool_calls = 20
+
+        # every request uses a new K8sClient with its own token, like the requests of different users. They
+        # share the SSL context of the cluster, so their requests also share the pooled connection of the session.
+        # the response cache is bypassed, so that every tool call reaches the API server.
+        for index in range(tool_calls):
+            k8s_client = K8sClient(
+                K8sAuthHeaders(
+                    x_cluster_url=cluster_url,
+                    x_cluster_certificate_authority_data=ca_data,
+                    x_k8s_authorization=f"token-{index}",
+                )
+            )
+            with patch("services.k8s._get_response_cache.get", return_value=None):
+                result = await k8s_client.execute_get_api_request("api/v1/pods")
+            assert result == [{"metadata": {"name": "pod"}}]
+        await K8sSessionPool().aclose()
+
+        assert len(connections) == 1
+
+
+def generate_server_certificates() -> tuple[bytes, bytes, bytes]:
+    """Generate the PEM encoded certificate of a CA, and a server certificate for 127.0.0.1 with its key."""
+    now = datetime.datetime.now(datetime.UTC)
+    ca_key = ec.generate_private_key(ec.SECP256R1())
+    ca_name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test-ca")])
+    ca_cert = (
+        x509.CertificateBuilder()
+        .subject_name(ca_name)
+        .issuer_name(ca_name)
+        .public_key(ca_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(
+            x509.KeyUsage(
+                digital_signature=False,
+                content_commitment=False,
+                key_encipherment=False,
+                data_encipherment=False,
+                key_agreement=False,
+                key_cert_sign=True,
+                crl_sign=True,
+                encipher_only=False,
+                decipher_only=False,
+            ),
+            critical=True,
+        )
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(ca_key.public_key()), critical=False)
+        .sign(ca_key, hashes.SHA256())
+    )
+    server_key = ec.generate_private_key(ec.SECP256R1())
+    server_cert = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")]))
+        .issuer_name(ca_name)
+        .public_key(server_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.IPAddress(ipaddress.IPv4Address("127.0.0.1"))]), critical=False
+        )
+        .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.SERVER_AUTH]), critical=False)
+        .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(ca_key.public_key()), critical=False)
+        .sign(ca_key, hashes.SHA256())
+    )
+    return (
+        ca_cert.public_bytes(serialization.Encoding.PEM),
+        server_cert.public_bytes(serialization.Encoding.PEM),
+        server_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ),
+    )
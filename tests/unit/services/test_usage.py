@@ -1,19 +1,25 @@
+import asyncio
 import time
 from unittest.mock import AsyncMock, Mock
 from uuid import uuid4
 
+import fakeredis
 import pytest
+import pytest_asyncio
 from langchain_core.outputs import ChatGeneration, LLMResult
 
+from agents.memory.async_redis_checkpointer import AsyncRedisSaver
 from routers.probes import IUsageTrackerProbe
 from services.metrics import (
     LANGGRAPH_ERROR_METRIC_KEY,
     LLM_LATENCY_METRIC_KEY,
+    USAGE_CACHE_DRIFT_METRIC_KEY,
     USAGE_TRACKER_PUBLISH_FAILURE_METRIC_KEY,
     CustomMetrics,
     LangGraphErrorType,
 )
 from services.usage import (
+    UsageCache,
     UsageExceedReport,
     UsageTracker,
     UsageTrackerCallback,
@@ -292,6 +298,186 @@ class TestUsageTracker:
         assert abs(report.reset_seconds_left - expected_reset_seconds_left) <= accepted_offset
 
 
+class TestUsageCache:
+    reset_interval_sec = 3600
+
+    @pytest_asyncio.fixture
+    async def redis_memory(self):
+        async with fakeredis.FakeAsyncRedis() as client:
+            yield AsyncRedisSaver(conn=client)
+
+    def create_cache(self, memory, sync_interval_sec=60, max_staleness_sec=300):
+        return UsageCache(
+            memory,
+            self.reset_interval_sec,
+            sync_interval_sec=sync_interval_sec,
+            max_staleness_sec=max_staleness_sec,
+            probe=Mock(spec=IUsageTrackerProbe),
+        )
+
+    @pytest.mark.asyncio
+    async def test_awrite_llm_usage_is_accumulated_locally(self, redis_memory):
+        # given
+        cache = self.create_cache(redis_memory)
+        await cache.aget_usage("cluster1")
+
+        # when
+        await cache.awrite_llm_usage("cluster1", {"input": 100, "output": 50, "total": 150}, self.reset_interval_sec)
+        await cache.awrite_llm_usage("cluster1", {"input": 10, "output": 5, "total": 15}, self.reset_interval_sec)
+
+        # then: the usage is counted, but not written to Redis yet.
+        usage = await cache.aget_usage("cluster1")
+        expected_total = 165
+        assert usage.total_tokens == expected_total
+        assert usage.latest_epoch > time.time() - 10
+        assert await redis_memory.alist_llm_usage_records("cluster1", self.reset_interval_sec) == []
+
+        # when: the sync interval passes.
+        await cache.areconcile("cluster1")
+
+        # then
+        records = await redis_memory.alist_llm_usage_records("cluster1", self.reset_interval_sec)
+        assert sum(record["total"] for record in records) == expected_total
+        assert usage.pending == {}
+        cache._sync_tasks["cluster1"].cancel()
+
+    @pytest.mark.asyncio
+    async def test_usage_is_flushed_in_background(self, redis_memory):
+        cache = self.create_cache(redis_memory, sync_interval_sec=0.01)
+
+        await cache.awrite_llm_usage("cluster1", {"input": 1, "output": 2, "total": 3})
+        await asyncio.gather(*cache._sync_tasks.values())
+
+        records = await redis_memory.alist_llm_usage_records("cluster1", self.reset_interval_sec)
+        assert [record["total"] for record in records] == [3]
+        assert not cache._sync_tasks
+
+    @pytest.mark.asyncio
+    async def test_aget_usage_does_not_read_memory_when_fresh(self):
+        memory = Mock()
+        memory.alist_llm_usage_records = AsyncMock(return_value=[])
+        memory.adelete_expired_llm_usage_records = AsyncMock()
+        cache = self.create_cache(memory)
+        await cache.aget_usage("cluster1")
+        memory.alist_llm_usage_records.reset_mock()
+
+        for _ in range(10):
+            await cache.aget_usage("cluster1")
+
+        memory.alist_llm_usage_records.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_aget_usage_reconciles_usage_of_other_replicas(self, redis_memory, mocker):
+        # given: two replicas sharing the same Redis.
+        cache = self.create_cache(redis_memory, sync_interval_sec=0.01, max_staleness_sec=300)
+        other_replica_cache = self.create_cache(redis_memory)
+        await cache.aget_usage("cluster1")
+        await other_replica_cache.awrite_llm_usage("cluster1", {"input": 500, "output": 500, "total": 1000})
+        await other_replica_cache.areconcile("cluster1")
+        drift_metric_name = f"{USAGE_CACHE_DRIFT_METRIC_KEY}_sum"
+        before_drift = CustomMetrics().registry.get_sample_value(drift_metric_name)
+        mocker.patch("services.usage.time.monotonic", return_value=time.monotonic() + 1)
+
+        # when: the totals are older than the sync interval.
+        usage = await cache.aget_usage("cluster1")
+
+        # then: the stale totals are returned and refreshed in the background.
+        assert usage.total_tokens == 0
+        await asyncio.gather(*cache._sync_tasks.values())
+        expected_total = 1000
+        assert usage.total_tokens == expected_total
+        assert CustomMetrics().registry.get_sample_value(drift_metric_name) - before_drift == expected_total
+
+    @pytest.mark.asyncio
+    async def test_aget_usage_reconciles_stale_usage_before_returning(self, redis_memory, mocker):
+        cache = self.create_cache(redis_memory, sync_interval_sec=1, max_staleness_sec=10)
+        other_replica_cache = self.create_cache(redis_memory)
+        await cache.aget_usage("cluster1")
+        await other_replica_cache.awrite_llm_usage("cluster1", {"input": 5, "output": 5, "total": 10})
+        await other_replica_cache.areconcile("cluster1")
+        mocker.patch("services.usage.time.monotonic", return_value=time.monotonic() + 11)
+
+        usage = await cache.aget_usage("cluster1")
+
+        expected_total = 10
+        assert usage.total_tokens == expected_total
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_keeps_usage(self):
+        # given
+        memory = Mock()
+        memory.awrite_llm_usage = AsyncMock(side_effect=Exception("connection error"))
+        cache = self.create_cache(memory)
+        await cache.awrite_llm_usage("cluster1", {"input": 1, "output": 2, "total": 3})
+        cache._sync_tasks["cluster1"].cancel()
+        failure_metric_name = f"{USAGE_TRACKER_PUBLISH_FAILURE_METRIC_KEY}_total"
+        before_failure_metric_value = CustomMetrics().registry.get_sample_value(failure_metric_name)
+
+        # when
+        with pytest.raises(Exception, match="connection error"):
+            await cache.areconcile("cluster1")
+
+        # then: the usage is kept for the next flush.
+        assert cache._usage["cluster1"].pending == {"input": 1, "output": 2, "total": 3}
+        assert CustomMetrics().registry.get_sample_value(failure_metric_name) > before_failure_metric_value
+        cache._probe.increase_failure_count.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_aflush_all_writes_pending_usage(self, redis_memory):
+        # given
+        cache = self.create_cache(redis_memory)
+        await cache.awrite_llm_usage("cluster1", {"input": 1, "output": 2, "total": 3})
+        await cache.awrite_llm_usage("cluster2", {"input": 4, "output": 5, "total": 9})
+        sync_tasks = list(cache._sync_tasks.values())
+
+        # when
+        await cache.aflush_all()
+        await asyncio.gather(*sync_tasks, return_exceptions=True)
+
+        # then
+        for cluster_id, expected_total in (("cluster1", 3), ("cluster2", 9)):
+            records = await redis_memory.alist_llm_usage_records(cluster_id, self.reset_interval_sec)
+            assert [record["total"] for record in records] == [expected_total]
+        assert all(task.cancelled() for task in sync_tasks)
+        assert not cache._sync_tasks
+
+    @pytest.mark.asyncio
+    async def test_idle_clusters_are_evicted(self, redis_memory):
+        cache = self.create_cache(redis_memory, sync_interval_sec=0.01, max_staleness_sec=0.05)
+        await cache.awrite_llm_usage("cluster1", {"input": 1, "output": 2, "total": 3})
+        await asyncio.gather(*cache._sync_tasks.values())
+        await cache.aget_usage("cluster2")
+
+        await asyncio.sleep(0.1)
+
+        assert cache._usage == {}
+        assert not cache._locks
+        # evicted clusters are reloaded from the memory.
+        expected_total = 3
+        assert (await cache.aget_usage("cluster1")).total_tokens == expected_total
+
+    @pytest.mark.asyncio
+    async def test_usage_tracker_with_cache(self, redis_memory):
+        # given
+        token_limit = 100
+        cache = self.create_cache(redis_memory)
+        usage_tracker = UsageTracker(redis_memory, token_limit, self.reset_interval_sec, usage_cache=cache)
+        assert await usage_tracker.ais_usage_limit_exceeded("cluster1") is None
+
+        # when
+        await cache.awrite_llm_usage("cluster1", {"input": 100, "output": 50, "total": 150})
+        report = await usage_tracker.ais_usage_limit_exceeded("cluster1")
+
+        # then
+        expected_total = 150
+        assert report.total_tokens_used == expected_total
+        assert report.token_limit == token_limit
+        # reset_seconds_left can be off by 5 second due to dynamic time.time().
+        accepted_offset = 5
+        assert abs(report.reset_seconds_left - self.reset_interval_sec) <= accepted_offset
+        cache._sync_tasks["cluster1"].cancel()
+
+
 @pytest.mark.parametrize(
     "test_description, input_data, expected_output",
     [
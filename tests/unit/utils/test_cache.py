@@ -0,0 +1,61 @@
+import time
+from unittest.mock import patch
+
+from utils.cache import TTLCache
+
+
+class TestTTLCache:
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+
+        cache.set("key", "value")
+
+        assert cache.get("key") == "value"
+        assert cache.get("missing") is None
+        assert len(cache) == 1
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", "value")
+
+        with patch("utils.cache.time.monotonic", return_value=time.monotonic() + 61):
+            assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # access "a", so that "b" is the least recently used entry.
+        assert cache.get("a") == 1
+
+        cache.set("c", "latest")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == "latest"
+
+    def test_pop_and_clear(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.pop("a") == 1
+        assert cache.pop("a") is None
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_on_evict_is_called_for_expired_and_evicted_entries(self):
+        evicted = []
+        cache = TTLCache(maxsize=2, ttl=60, on_evict=lambda key, value: evicted.append((key, value)))
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+
+        with patch("utils.cache.time.monotonic", return_value=time.monotonic() + 61):
+            assert cache.get("b") is None
+        cache.pop("c")
+        cache.set("d", 4)
+        cache.clear()
+
+        assert evicted == [("a", 1), ("b", 2)]